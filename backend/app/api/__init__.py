@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from . import config, health, logs, remitos, telefonos, webhook
+from . import admin, catalogo, config, health, logs, metrics, probes, remitos, telefonos, webhook
 
 router = APIRouter()
 
@@ -9,4 +9,8 @@ router.include_router(remitos.router, prefix="/remitos", tags=["remitos"])
 router.include_router(config.router, prefix="/config", tags=["config"])
 router.include_router(logs.router, prefix="/logs", tags=["logs"])
 router.include_router(telefonos.router, prefix="/telefonos", tags=["telefonos"])
+router.include_router(catalogo.router, prefix="/catalogo", tags=["catalogo"])
 router.include_router(health.router, prefix="/health", tags=["health"])
+router.include_router(admin.router, prefix="/admin", tags=["admin"])
+router.include_router(metrics.router, tags=["metrics"])
+router.include_router(probes.router, tags=["health"])
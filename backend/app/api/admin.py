@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+import hmac
+import math
+import os
+import traceback
+from importlib import metadata
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+
+from app.core.executors import get_executors
+from app.core.settings import Settings, get_settings
+from app.core.tracing import get_tracer
+
+router = APIRouter()
+
+ENV_VARS = (
+    "SUPABASE_URL",
+    "SUPABASE_ANON_KEY",
+    "SUPABASE_SERVICE_ROLE_KEY",
+    "OPENAI_API_KEY",
+    "CLAUDE_API_KEY",
+    "WHATSAPP_TOKEN",
+    "WHATSAPP_PHONE_ID",
+)
+DIAGNOSTIC_TABLES = ("logs", "telefonos_empresa", "empresas", "remitos")
+
+
+def require_admin(
+    x_admin_token: Optional[str] = Header(None),
+    settings: Settings = Depends(get_settings),
+) -> Settings:
+    if not settings.admin_token:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Diagnóstico deshabilitado: falta ADMIN_TOKEN")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="X-Admin-Token inválido")
+    return settings
+
+
+async def _check_table(settings: Settings, table: str) -> Dict[str, Any]:
+    try:
+        response = await settings.data_access.execute(lambda client: client.table(table).select("*").limit(1))
+    except Exception as e:
+        return {"exists": False, "error": str(e)}
+    return {"exists": True, "count": len(response.data) if response.data else 0}
+
+
+@router.get("/diagnostics")
+async def diagnostics(
+    escribir_log: bool = Query(False, description="Además escribe un log HEALTH_CHECK de prueba"),
+    settings: Settings = Depends(require_admin),
+):
+    """
+    Diagnóstico completo: variables de entorno, servicios construidos, una
+    consulta a cada tabla principal y, opcionalmente, una escritura en logs.
+
+    Consulta Supabase en cada llamada, por eso requiere X-Admin-Token y corre
+    a lo sumo una vez cada ADMIN_DIAGNOSTICS_MIN_INTERVAL_SECONDS; para load
+    balancers y health checks están /livez y /readyz.
+    """
+    wait = settings.diagnostics_gate.acquire()
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Diagnóstico ejecutado hace poco; reintentar en {math.ceil(wait)} s",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
+    try:
+        supabase_version = metadata.version("supabase")
+    except metadata.PackageNotFoundError:
+        supabase_version = "not installed"
+
+    results: Dict[str, Any] = {
+        "environment": os.getenv("ENVIRONMENT", "not set"),
+        "environment_variables": {name: "set" if os.getenv(name) else "missing" for name in ENV_VARS},
+        "supabase_version": supabase_version,
+        # Servicios que ya se construyeron (el resto se crea con el primer uso)
+        "services": sorted(
+            name for name in vars(settings) if name not in type(settings).model_fields and not name.startswith("_")
+        ),
+        "tables": {},
+        "errors": [],
+    }
+
+    tables = await asyncio.gather(*(_check_table(settings, table) for table in DIAGNOSTIC_TABLES))
+    for table, result in zip(DIAGNOSTIC_TABLES, tables):
+        results["tables"][table] = result
+        if not result["exists"]:
+            results["errors"].append(f"{table} table error: {result['error']}")
+
+    if escribir_log:
+        try:
+            await settings.log_service.write_log(
+                tipo="HEALTH_CHECK",
+                detalle="Test de conexión desde endpoint de diagnóstico",
+                payload={"test": True},
+            )
+            results["log_service"] = "working"
+        except Exception as e:
+            results["log_service"] = f"error: {str(e)}"
+            results["errors"].append(f"log_service error: {str(e)}")
+            results["traceback"] = traceback.format_exc()
+
+    ready, checks = settings.health_prober.readiness()
+    results["readiness"] = {"ready": ready, "checks": checks}
+    results["executors"] = get_executors().stats()
+    admission = settings.admission_controller
+    results["admission"] = admission.stats() if admission is not None else None
+    results["connection"] = "healthy" if not results["errors"] else "partial"
+    return results
+
+
+@router.get("/traces")
+async def list_slow_traces(
+    min_ms: Optional[float] = Query(None, ge=0, description="Duración mínima; por defecto TRACING_SLOW_MS"),
+    limit: int = Query(20, ge=1, le=200),
+    settings: Settings = Depends(require_admin),
+):
+    """
+    Trazas recientes más lentas que min_ms, en formato cascada (offset y duración por span).
+
+    Los spans llevan el teléfono del chofer y el id del mensaje: requiere X-Admin-Token.
+    """
+    threshold = settings.tracing_slow_ms if min_ms is None else min_ms
+    traces = get_tracer().recent_traces(min_duration_ms=threshold, limit=limit)
+    return {"status": "ok", "min_ms": threshold, "count": len(traces), "traces": traces}
+
+
+@router.get("/traces/{trace_id}")
+async def get_trace(trace_id: str, settings: Settings = Depends(require_admin)):
+    """
+    Una traza puntual del buffer en memoria (por ejemplo, el trace_id de un log WEBHOOK).
+    """
+    trace = get_tracer().get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Traza no encontrada en el buffer")
+    return trace
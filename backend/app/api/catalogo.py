@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Tuple
+
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel
+
+from app.core.name_index import CatalogNameResolver
+from app.core.settings import get_settings
+
+router = APIRouter()
+
+_ID_FIELDS = {
+    "establecimientos": ("id_establecimiento", "nombre"),
+    "chacras": ("id_chacra", "nombre_chacra"),
+    "destinos": ("id_destino", "nombre"),
+}
+
+
+class DuplicadoItem(BaseModel):
+    id: str
+    nombre: str
+    similitud: float
+    id_establecimiento: str | None = None
+
+
+class GrupoDuplicados(BaseModel):
+    canonico: DuplicadoItem
+    duplicados: List[DuplicadoItem]
+
+
+class DuplicadosResponse(BaseModel):
+    empresa_id: str
+    umbral: float
+    establecimientos: List[GrupoDuplicados]
+    chacras: List[GrupoDuplicados]
+    destinos: List[GrupoDuplicados]
+
+
+def _item(table: str, row: Dict[str, Any], score: float) -> DuplicadoItem:
+    id_field, name_field = _ID_FIELDS[table]
+    return DuplicadoItem(
+        id=str(row[id_field]),
+        nombre=row[name_field],
+        similitud=score,
+        id_establecimiento=row.get("id_establecimiento") if table == "chacras" else None,
+    )
+
+
+def _groups(table: str, groups: List[List[Tuple[Dict[str, Any], float]]]) -> List[GrupoDuplicados]:
+    return [
+        GrupoDuplicados(
+            canonico=_item(table, group[0][0], group[0][1]),
+            duplicados=[_item(table, row, score) for row, score in group[1:]],
+        )
+        for group in groups
+    ]
+
+
+@router.get("/{empresa_id}/duplicados", response_model=DuplicadosResponse)
+async def list_duplicados(
+    empresa_id: str,
+    umbral: float | None = Query(None, ge=0.0, le=1.0, description="Similitud mínima (por defecto CATALOG_MATCH_THRESHOLD)"),
+    settings=Depends(get_settings),  # type: ignore[no-untyped-def]
+) -> DuplicadosResponse:
+    """
+    Reporte de posibles duplicados en el catálogo de una empresa.
+
+    Agrupa establecimientos, chacras (dentro de cada establecimiento) y
+    destinos cuyos nombres coinciden sin acentos ni mayúsculas o superan el
+    umbral de similitud. El canónico es el que resuelve el índice: el primero
+    del grupo en el orden del catálogo (alfabético).
+    """
+    resolver = settings.catalog_service.name_resolver or CatalogNameResolver(
+        settings.empresa_context_service,
+        settings.data_access,
+        threshold=settings.catalog_match_threshold,
+    )
+    threshold = settings.catalog_match_threshold if umbral is None else umbral
+    report = await resolver.duplicates(empresa_id, threshold)
+    return DuplicadosResponse(
+        empresa_id=empresa_id,
+        umbral=threshold,
+        **{table: _groups(table, groups) for table, groups in report.items()},
+    )
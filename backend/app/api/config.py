@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 
-from app.core.remito_flow_v2 import SYSTEM_PROMPT
+from app.core.http_cache import conditional_response, etag_for
 from app.core.settings import get_settings
 from app.models.config import AppConfig, AppConfigUpdate
 
@@ -8,12 +8,17 @@ router = APIRouter()
 
 
 @router.get("/", response_model=AppConfig)
-async def read_config(settings=Depends(get_settings)) -> AppConfig:  # type: ignore[no-untyped-def]
-    config = await settings.config_store.read()
+async def read_config(request: Request, settings=Depends(get_settings)) -> Response:  # type: ignore[no-untyped-def]
+    config, updated_at = await settings.config_store.read_versioned()
     # Si no hay prompt configurado, usar el default
     if not config.llm_prompt:
+        from app.core.remito_flow_v2 import SYSTEM_PROMPT
+
         config.llm_prompt = SYSTEM_PROMPT
-    return config
+    body = config.model_dump_json().encode()
+    # Las claves salen enmascaradas: updated_at entra en el ETag para que cambiar una clave lo cambie
+    etag = etag_for(body, salt=updated_at.isoformat() if updated_at else "")
+    return conditional_response(request, body, etag, endpoint="config.read", last_modified=updated_at)
 
 
 @router.post(
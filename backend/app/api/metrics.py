@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.core.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """
+    Métricas del pipeline en formato Prometheus/OpenMetrics (texto).
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import JSONResponse
+
+from app.core.settings import get_settings
+
+router = APIRouter()
+
+
+@router.get("/livez")
+async def livez(settings=Depends(get_settings)):  # type: ignore[no-untyped-def]
+    """
+    Liveness: responde sin consultar dependencias. Da 503 solo si el prober de
+    fondo se cayó o dejó de avanzar (loop trabado): reiniciar ayuda.
+    """
+    alive, detail = settings.health_prober.liveness()
+    return JSONResponse({"status": "ok" if alive else "error", **detail}, status_code=200 if alive else 503)
+
+
+@router.get("/readyz")
+async def readyz(request: Request, settings=Depends(get_settings)):  # type: ignore[no-untyped-def]
+    """
+    Readiness: último resultado del prober de fondo (Supabase) y fin del
+    precalentamiento del arranque. No genera consultas: se puede pedir seguido.
+    """
+    ready, checks = settings.health_prober.readiness()
+    warmup = getattr(request.app.state, "warmup", None)
+    if warmup is not None and not warmup.done():
+        ready = False
+        checks["warmup"] = {"status": "running"}
+    return JSONResponse(
+        {"status": "ready" if ready else "not_ready", "checks": checks},
+        status_code=200 if ready else 503,
+    )
@@ -1,15 +1,50 @@
+from datetime import date
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 
+from app.core.http_cache import cache_key, conditional_response, etag_for
+from app.core.metrics import REMITO_EVENTS
+from app.core.remito_events import RESYNC, TooManySubscribers
+from app.core.remito_summary import SUMMARY_DIMENSIONS
 from app.core.settings import get_settings
-from app.models.remito import Remito, RemitoCreate, RemitoUpdate
+from app.core.time_window import DEFAULT_TIMEZONE, parse_instant
+from app.models.remito import Remito, RemitoBulkResponse, RemitoCreate, RemitoResumen, RemitoUpdate
 
 router = APIRouter()
 
 
+_REMITO_LIST = TypeAdapter(List[Remito])
+
+
+async def _cached_read(request: Request, settings, endpoint: str, load) -> Response:  # type: ignore[no-untyped-def]
+    """
+    Lectura con ETag y cache de respuestas: un acierto no consulta Supabase ni
+    serializa, y si el cliente ya tiene esa versión se responde 304 sin cuerpo.
+    """
+    cache = settings.response_cache
+    key = cache_key(request)
+    generation = 0
+    if cache is not None:
+        # Escrituras hechas en otras réplicas (no-op en un solo proceso)
+        await settings.shared_state.sync_invalidations()
+        cached = cache.get(key)
+        if cached is not None:
+            return conditional_response(request, cached.body, cached.etag, endpoint=endpoint)
+        generation = cache.generation
+
+    body = await load()
+    etag = etag_for(body)
+    if cache is not None:
+        cache.put(key, body, etag, generation)
+    return conditional_response(request, body, etag, endpoint=endpoint)
+
+
 @router.get("/", response_model=List[Remito], summary="List remitos")
 async def list_remitos(  # type: ignore[no-untyped-def]
+    request: Request,
     activo: bool | None = Query(None, description="Filtrar por remitos activos"),
     destino: str | None = Query(None, description="Filtrar por destino"),
     establecimiento: str | None = Query(None, description="Filtrar por establecimiento de origen"),
@@ -20,31 +55,169 @@ async def list_remitos(  # type: ignore[no-untyped-def]
     year: int | None = Query(None, description="Filtrar por año", ge=2020, le=2100),
     month: int | None = Query(None, description="Filtrar por mes", ge=1, le=12),
     day: int | None = Query(None, description="Filtrar por día", ge=1, le=31),
+    q: str | None = Query(
+        None,
+        max_length=100,
+        description="Búsqueda en destino, establecimiento, chacra, conductor, matrículas, cédula e ID; ordena por relevancia",
+    ),
+    desde: str | None = Query(
+        None,
+        alias="from",
+        description="Inicio del rango, incluido: fecha (desde el comienzo de ese día en tz) u hora ISO 8601",
+    ),
+    hasta: str | None = Query(
+        None,
+        alias="to",
+        description="Fin del rango: una fecha incluye ese día completo en tz; una hora ISO 8601 queda excluida",
+    ),
+    tz: str = Query(DEFAULT_TIMEZONE, description="Zona horaria de las fechas y de year/month/day"),
+    settings=Depends(get_settings),
+) -> Response:
+    """
+    year/month/day se mantienen por compatibilidad; se combinan con from/to en un solo rango.
+    Responde con ETag; con If-None-Match de la versión vigente responde 304.
+    """
+    try:
+        window = {
+            "desde": parse_instant(desde) if desde else None,
+            "hasta": parse_instant(hasta) if hasta else None,
+        }
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    async def _load() -> bytes:
+        try:
+            remitos = await settings.remito_service.list_remitos(
+                activo=activo,
+                destino=destino,
+                establecimiento=establecimiento,
+                chacra=chacra,
+                matricula_camion=matricula_camion,
+                matricula_zorra=matricula_zorra,
+                cedula_conductor=cedula_conductor,
+                year=year,
+                month=month,
+                day=day,
+                q=q,
+                tz=tz,
+                **window,
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+        return _REMITO_LIST.dump_json(remitos)
+
+    return await _cached_read(request, settings, "remitos.list", _load)
+
+
+# Declarada antes de /{remito_id} para que "summary" no se tome como un id
+@router.get(
+    "/summary",
+    response_model=RemitoResumen,
+    response_model_exclude_none=True,
+    summary="Totales de remitos activos",
+)
+async def summarize_remitos(  # type: ignore[no-untyped-def]
+    agrupar: List[str] = Query(
+        [],
+        description=f"Dimensiones del agrupamiento, combinables: {', '.join(SUMMARY_DIMENSIONS)}",
+    ),
+    desde: date | None = Query(None, description="Primer día incluido (día de Montevideo)"),
+    hasta: date | None = Query(None, description="Último día incluido"),
+    empresa: str | None = Query(None, description="ID de empresa"),
+    establecimiento: str | None = Query(None, description="ID de establecimiento"),
+    chacra: str | None = Query(None, description="ID de chacra"),
+    destino: str | None = Query(None, description="ID de destino"),
     settings=Depends(get_settings),
-) -> List[Remito]:
-    return await settings.remito_service.list_remitos(
-        activo=activo,
-        destino=destino,
-        establecimiento=establecimiento,
-        chacra=chacra,
-        matricula_camion=matricula_camion,
-        matricula_zorra=matricula_zorra,
-        cedula_conductor=cedula_conductor,
-        year=year,
-        month=month,
-        day=day,
+) -> RemitoResumen:
+    """Cantidad y toneladas por las dimensiones pedidas, desde los totales diarios precalculados."""
+    if desde and hasta and desde > hasta:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'desde' es posterior a 'hasta'")
+    try:
+        resumen = await settings.remito_summary_service.summarize(
+            # Acepta agrupar=destino&agrupar=dia y agrupar=destino,dia
+            agrupar=[name.strip() for value in agrupar for name in value.split(",") if name.strip()],
+            desde=desde,
+            hasta=hasta,
+            empresa=empresa,
+            establecimiento=establecimiento,
+            chacra=chacra,
+            destino=destino,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return RemitoResumen(**resumen)
+
+
+# Declarada antes de /{remito_id} para que "events" no se tome como un id
+@router.get("/events", summary="Stream (SSE) de remitos creados y actualizados")
+async def stream_remito_events(  # type: ignore[no-untyped-def]
+    request: Request,
+    empresa: str | None = Query(None, description="Solo remitos de esta empresa (ID)"),
+    destino: str | None = Query(None, description="Solo remitos con este destino (ID)"),
+    settings=Depends(get_settings),
+) -> StreamingResponse:
+    """
+    Server-sent events: `event: remito` con `{"tipo": "creado"|"actualizado", "remito": {...}}`.
+
+    Un comentario cada REMITO_EVENTS_HEARTBEAT_SECONDS mantiene viva la
+    conexión a través de proxies. `event: resync` indica que el cliente se
+    atrasó o se reconectó sin poder recuperar lo perdido (Last-Event-ID) y
+    tiene que volver a pedir GET /remitos.
+    """
+    try:
+        subscription = await settings.remito_events.subscribe(
+            empresa=empresa,
+            destino=destino,
+            last_event_id=request.headers.get("last-event-id"),
+        )
+    except TooManySubscribers as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Stream de eventos no disponible: {exc}",
+        ) from exc
+
+    heartbeat = settings.remito_events_heartbeat_seconds
+
+    async def _stream():  # type: ignore[no-untyped-def]
+        try:
+            # El navegador reintenta a los 3 s si se corta la conexión
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                event = await subscription.next_event(heartbeat)
+                if event is None:
+                    yield ": ping\n\n"
+                elif event is RESYNC:
+                    REMITO_EVENTS.labels(outcome="resync").inc()
+                    yield "event: resync\ndata: {}\n\n"
+                else:
+                    REMITO_EVENTS.labels(outcome="delivered").inc()
+                    yield event.to_sse()
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        # Sin buffering de proxies (nginx) para que cada evento salga al momento
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
 @router.get("/{remito_id}", response_model=Remito)
 async def get_remito(  # type: ignore[no-untyped-def]
+    request: Request,
     remito_id: str = Path(..., description="ID del remito"),
     settings=Depends(get_settings),
-) -> Remito:
-    remito = await settings.remito_service.get_remito(remito_id)
-    if not remito:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Remito no encontrado")
-    return remito
+) -> Response:
+    async def _load() -> bytes:
+        remito = await settings.remito_service.get_remito(remito_id)
+        if not remito:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Remito no encontrado")
+        return remito.model_dump_json().encode()
+
+    return await _cached_read(request, settings, "remitos.get", _load)
 
 
 @router.post("/", response_model=Remito, status_code=status.HTTP_201_CREATED)
@@ -55,6 +228,27 @@ async def create_remito(  # type: ignore[no-untyped-def]
     return await settings.remito_service.create_remito(payload)
 
 
+@router.post("/bulk", response_model=RemitoBulkResponse)
+async def create_remitos_bulk(  # type: ignore[no-untyped-def]
+    payload: List[RemitoCreate],
+    settings=Depends(get_settings),
+) -> RemitoBulkResponse:
+    """Crea varios remitos en un pedido; cada resultado indica si ese remito se creó."""
+    if not payload:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="La lista de remitos está vacía")
+    if len(payload) > settings.remitos_bulk_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Máximo {settings.remitos_bulk_max_items} remitos por pedido",
+        )
+    resultados = await settings.remito_service.create_remitos_bulk(
+        payload,
+        upload_concurrency=settings.remitos_bulk_upload_concurrency,
+    )
+    creados = sum(1 for item in resultados if item.ok)
+    return RemitoBulkResponse(creados=creados, fallidos=len(resultados) - creados, resultados=resultados)
+
+
 @router.patch("/{remito_id}", response_model=Remito)
 async def update_remito(  # type: ignore[no-untyped-def]
     remito_id: str,
@@ -42,7 +42,7 @@ async def add_telefono(
 ) -> dict:
     """Agrega un número de teléfono a una empresa."""
     try:
-        return await settings.phone_service.add_phone_to_empresa(
+        telefono = await settings.phone_service.add_phone_to_empresa(
             phone=payload.numero_telefono,
             empresa_id=payload.id_empresa,
             notas=payload.notas,
@@ -53,6 +53,10 @@ async def add_telefono(
             detail=f"Error al agregar teléfono: {str(exc)}",
         ) from exc
 
+    # El cache teléfono -> empresas vive en cada réplica
+    await settings.shared_state.publish_invalidation("phone_empresas")
+    return telefono
+
 
 @router.delete("/{telefono_id}")
 async def remove_telefono(
@@ -66,6 +70,7 @@ async def remove_telefono(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Teléfono no encontrado",
         )
+    await settings.shared_state.publish_invalidation("phone_empresas")
     return {"message": "Teléfono desactivado exitosamente"}
 
 
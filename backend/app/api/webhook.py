@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import time
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from fastapi.responses import PlainTextResponse
 
+from app.core.admission import is_overload_error
+from app.core.metrics import WEBHOOK_DURATION, WEBHOOK_MESSAGES, WEBHOOK_SHED
+from app.core.prompts import load_reply_template
 from app.core.settings import get_settings
+from app.core.tracing import get_tracer
 from app.models.webhook import WhatsAppWebhookPayload, WhatsAppWebhookResponse
 
 router = APIRouter()
@@ -37,6 +44,8 @@ async def handle_whatsapp_webhook(
     Webhook para recibir mensajes de WhatsApp.
     Usa flujo conversacional V2 con contexto personalizado por empresa.
     """
+    started = time.perf_counter()
+    outcome = "ok"
     try:
         # Obtener el payload raw de WhatsApp
         raw_payload = await request.json()
@@ -67,48 +76,20 @@ async def handle_whatsapp_webhook(
                 messages = value.get("messages", [])
                 
                 for message in messages:
-                    message_id = message.get("id")
-                    from_number = message.get("from")
-                    message_type = message.get("type")
-                    
-                    # Solo procesar mensajes de texto
-                    if message_type != "text":
-                        continue
-                    
-                    body = message.get("text", {}).get("body", "")
-                    
-                    if not body.strip():
-                        continue
-                    
-                    # Crear payload en el formato esperado
-                    webhook_payload = WhatsAppWebhookPayload(
-                        message_id=message_id,
-                        from_number=from_number,
-                        body=body,
-                        raw_event=raw_payload,
-                    )
-                    
-                    # Procesar el mensaje con el nuevo sistema refacturado
-                    response = await settings.remito_flow_v2_refactored.handle_message(webhook_payload)
-                    
-                    try:
-                        await settings.log_service.write_log(
-                            tipo="WEBHOOK",
-                            detalle="Respuesta enviada al contacto",
-                            payload={
-                                "from": from_number,
-                                "message_id": message_id,
-                                "reply": response.reply,
-                                "metadata": response.metadata,
-                            },
-                        )
-                    except Exception:
-                        pass  # No fallar si el log falla
+                    # Cada mensaje es una traza independiente
+                    with get_tracer().start_trace(
+                        "whatsapp.message",
+                        message_id=message.get("id"),
+                        contact=message.get("from"),
+                        type=message.get("type"),
+                    ):
+                        await _handle_incoming_message(message, raw_payload, settings)
         
         return {"status": "ok"}
         
     except Exception as e:
         import traceback
+        outcome = "error"
         try:
             await settings.log_service.write_log(
                 tipo="WEBHOOK",
@@ -119,3 +100,110 @@ async def handle_whatsapp_webhook(
             pass
         # Devolver 200 para que WhatsApp no reintente
         return {"status": "error", "message": str(e)}
+    finally:
+        WEBHOOK_DURATION.labels(status=outcome).observe(time.perf_counter() - started)
+
+
+async def _handle_incoming_message(message: dict, raw_payload: dict, settings) -> None:
+    """Procesa un mensaje individual del payload de WhatsApp."""
+    message_id = message.get("id")
+    from_number = message.get("from")
+    message_type = message.get("type")
+
+    # WhatsApp reentrega mensajes si no recibe el 200 a tiempo
+    if message_id and not await settings.shared_state.mark_seen(f"whatsapp:{message_id}"):
+        WEBHOOK_MESSAGES.labels(result="duplicate").inc()
+        return
+
+    # Solo procesar mensajes de texto
+    if message_type != "text":
+        WEBHOOK_MESSAGES.labels(result="unsupported_type").inc()
+        return
+
+    body = message.get("text", {}).get("body", "")
+
+    if not body.strip():
+        WEBHOOK_MESSAGES.labels(result="empty").inc()
+        return
+
+    # Crear payload en el formato esperado
+    webhook_payload = WhatsAppWebhookPayload(
+        message_id=message_id,
+        from_number=from_number,
+        body=body,
+        raw_event=raw_payload,
+    )
+
+    # Chofer o empresa por encima de su límite de mensajes: aviso fijo, sin LLM
+    scope = await _rate_limited_scope(settings, from_number)
+    if scope:
+        WEBHOOK_MESSAGES.labels(result="rate_limited").inc()
+        await _send_auto_reply(settings, from_number, "limite", reason=f"rate_limit_{scope}")
+        return
+
+    # Con el límite de turnos alcanzado se avisa la demora en vez de sumar otra llamada al LLM
+    admission = settings.admission_controller
+    if admission is not None and not admission.try_acquire():
+        WEBHOOK_MESSAGES.labels(result="shed").inc()
+        await _send_auto_reply(settings, from_number, "demora", reason="saturated")
+        return
+
+    # Procesar el mensaje con el nuevo sistema refacturado
+    turn_started = time.perf_counter()
+    # Solo la saturación aguas abajo achica el límite; la otra señal es la latencia
+    overloaded = False
+    try:
+        response = await settings.remito_flow_v2_refactored.handle_message(webhook_payload)
+        overloaded = bool(response.metadata.get("overloaded"))
+    except Exception as exc:
+        overloaded = is_overload_error(exc)
+        raise
+    finally:
+        if admission is not None:
+            admission.release(time.perf_counter() - turn_started, overloaded=overloaded)
+    WEBHOOK_MESSAGES.labels(result="processed").inc()
+
+    try:
+        await settings.log_service.write_log(
+            tipo="WEBHOOK",
+            detalle="Respuesta enviada al contacto",
+            payload={
+                "from": from_number,
+                "message_id": message_id,
+                "trace_id": get_tracer().current_trace_id(),
+                "reply": response.reply,
+                "metadata": response.metadata,
+            },
+        )
+    except Exception:
+        pass  # No fallar si el log falla
+
+
+async def _rate_limited_scope(settings, from_number: str) -> Optional[str]:
+    """Alcance del límite de mensajes superado (telefono o empresa), o None."""
+    limiter = settings.inbound_rate_limiter
+    if limiter is None or not from_number:
+        return None
+    try:
+        # Cache del flujo: el mismo lookup que después arma el prompt
+        empresa_ids = await settings.remito_flow_v2_refactored.get_empresas_for_phone(from_number)
+        return await limiter.check(from_number, empresa_ids)
+    except Exception:
+        # Si no se puede contar (Postgres caído con RATE_LIMIT_SHARED) el mensaje sigue
+        return None
+
+
+async def _send_auto_reply(settings, to: str, template: str, *, reason: str) -> None:
+    """Respuesta fija sin LLM, a lo sumo una por chofer cada AUTO_REPLY_INTERVAL_SECONDS."""
+    if not settings.whatsapp_service or not to:
+        WEBHOOK_SHED.labels(reason=reason, reply="unavailable").inc()
+        return
+    if not settings.auto_reply_throttle.should_send(to):
+        WEBHOOK_SHED.labels(reason=reason, reply="suppressed").inc()
+        return
+    try:
+        await settings.whatsapp_service.send_text(to=to, text=load_reply_template(template))
+    except Exception:
+        WEBHOOK_SHED.labels(reason=reason, reply="failed").inc()
+        return
+    WEBHOOK_SHED.labels(reason=reason, reply="sent").inc()
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import httpx
+from postgrest.exceptions import APIError
+
+from app.core.metrics import ADMISSION_IN_FLIGHT, ADMISSION_LIMIT
+
+# Códigos de PostgREST que indican base saturada: statement_timeout de
+# Postgres y espera agotada por una conexión del pool
+_POSTGREST_TIMEOUT_CODES = frozenset({"57014", "PGRST003"})
+
+
+def is_overload_error(exc: Optional[BaseException]) -> bool:
+    """
+    True si el error (o alguno de los que lo causaron) es saturación aguas
+    abajo: 429 o 5xx del LLM, timeouts de httpx o de PostgREST y
+    asyncio.TimeoutError. Los errores de negocio y de validación no cuentan.
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, (asyncio.TimeoutError, httpx.TimeoutException)):
+            return True
+        if isinstance(exc, httpx.HTTPStatusError):
+            status = exc.response.status_code
+            if status == 429 or status >= 500:
+                return True
+        if isinstance(exc, APIError) and getattr(exc, "code", None) in _POSTGREST_TIMEOUT_CODES:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+class AdmissionController:
+    """
+    Límite adaptativo de turnos simultáneos del webhook (AIMD).
+
+    Cada turno que termina informa cuánto tardó y si falló por saturación aguas
+    abajo (el flujo lo marca en metadata["overloaded"] según
+    is_overload_error; un remito inválido no cuenta). Si tardó
+    más que target_latency_seconds o falló, el límite se multiplica por
+    backoff_ratio, a lo sumo una vez por ventana de target_latency_seconds: los
+    turnos que terminan juntos vieron la misma congestión. Si no, sube de a
+    1/límite por turno (un turno más por "ronda" completa) mientras el límite
+    se esté usando. Con el límite alcanzado try_acquire devuelve False y el
+    mensaje no llega al LLM.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial_limit: int = 20,
+        min_limit: int = 2,
+        max_limit: int = 100,
+        target_latency_seconds: float = 8.0,
+        backoff_ratio: float = 0.7,
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency_seconds = target_latency_seconds
+        self.backoff_ratio = backoff_ratio
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.in_flight = 0
+        self._last_decrease = float("-inf")
+        ADMISSION_LIMIT.set(int(self.limit))
+        ADMISSION_IN_FLIGHT.set(0)
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        return True
+
+    def release(self, latency_seconds: float, *, overloaded: bool = False) -> None:
+        # Ocupación al momento de terminar, contando este turno
+        busy = self.in_flight
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+
+        if overloaded or latency_seconds > self.target_latency_seconds:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.target_latency_seconds:
+                self._last_decrease = now
+                self.limit = max(float(self.min_limit), self.limit * self.backoff_ratio)
+        elif busy * 2 >= self.limit:
+            # Sin uso del límite no hay evidencia de que aguante más: no crece en reposo
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        ADMISSION_LIMIT.set(int(self.limit))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "target_latency_seconds": self.target_latency_seconds,
+        }
+
+
+class ReplyThrottle:
+    """
+    Recuerda a quién se le mandó una respuesta automática para no repetirla
+    antes de interval_seconds (un chofer que insiste recibe un solo aviso).
+    """
+
+    def __init__(self, interval_seconds: float = 60.0, max_entries: int = 10000) -> None:
+        self.interval_seconds = interval_seconds
+        self.max_entries = max_entries
+        self._sent: "OrderedDict[str, float]" = OrderedDict()
+
+    def should_send(self, key: str) -> bool:
+        now = time.monotonic()
+        sent_at = self._sent.get(key)
+        if sent_at is not None and now - sent_at < self.interval_seconds:
+            return False
+        self._sent[key] = now
+        self._sent.move_to_end(key)
+        while len(self._sent) > self.max_entries:
+            self._sent.popitem(last=False)
+        return True
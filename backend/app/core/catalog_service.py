@@ -1,61 +1,81 @@
 from __future__ import annotations
 
-import asyncio
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Sequence
 
 from supabase import Client
 
+from app.core.data_access import DataAccess
+from app.core.name_index import CatalogNameResolver, name_key
+from app.core.shared_state import SharedState
+
 
 class CatalogService:
     """Acceso simplificado a catálogos (empresas, establecimientos, chacras, destinos)."""
 
-    def __init__(self, supabase_client: Client) -> None:
+    def __init__(
+        self,
+        supabase_client: Client,
+        shared_state: Optional[SharedState] = None,
+        data_access: Optional[DataAccess] = None,
+        name_resolver: Optional[CatalogNameResolver] = None,
+    ) -> None:
         self.supabase = supabase_client
+        self.shared_state = shared_state
+        self.db = data_access or DataAccess(supabase_client)
+        # Resuelve variantes de un nombre existente ("la esperanza ", "Esperanza")
+        # antes de la búsqueda exacta, para no crear duplicados
+        self.name_resolver = name_resolver
 
     async def get_or_create_empresa(self, nombre: str) -> Dict[str, Any]:
         nombre = self._normalize(nombre)
         if not nombre:
             raise ValueError("El nombre de la empresa no puede estar vacío")
 
-        def _sync() -> Dict[str, Any]:
-            response = (
-                self.supabase.table("empresas")
-                .select("*")
-                .eq("nombre", nombre)
-                .limit(1)
-                .execute()
-            )
-            if response.data:
-                return response.data[0]
-            created = self.supabase.table("empresas").insert({"nombre": nombre}).execute()
-            return created.data[0]
-
-        return await asyncio.to_thread(_sync)
+        response = await self.db.execute(
+            lambda c: c.table("empresas").select("*").eq("nombre", nombre).limit(1)
+        )
+        if response.data:
+            return response.data[0]
+        created = await self.db.execute(lambda c: c.table("empresas").insert({"nombre": nombre}))
+        return created.data[0]
+
+    async def find_empresa(self, nombre: str, empresa_ids: Sequence[str]) -> Optional[Dict[str, Any]]:
+        """Empresa de empresa_ids con ese nombre (misma clave de name_key); nunca crea."""
+        key = name_key(nombre)
+        if not key or not empresa_ids:
+            return None
+
+        ids = list(empresa_ids)
+        response = await self.db.execute(lambda c: c.table("empresas").select("*").in_("id_empresa", ids))
+        for row in response.data or []:
+            if name_key(row.get("nombre") or "") == key:
+                return row
+        return None
 
     async def get_or_create_establecimiento(self, nombre: str, empresa_id: str) -> Dict[str, Any]:
         nombre = self._normalize(nombre)
         if not nombre:
             raise ValueError("El nombre del establecimiento no puede estar vacío")
 
-        def _sync() -> Dict[str, Any]:
-            response = (
-                self.supabase.table("establecimientos")
-                .select("*")
-                .eq("nombre", nombre)
-                .eq("id_empresa", empresa_id)
-                .limit(1)
-                .execute()
-            )
-            if response.data:
-                return response.data[0]
-            created = (
-                self.supabase.table("establecimientos")
-                .insert({"nombre": nombre, "id_empresa": empresa_id})
-                .execute()
-            )
-            return created.data[0]
-
-        return await asyncio.to_thread(_sync)
+        if self.name_resolver:
+            match = await self.name_resolver.establecimiento(empresa_id, nombre)
+            if match:
+                return match.row
+
+        response = await self.db.execute(
+            lambda c: c.table("establecimientos")
+            .select("*")
+            .eq("nombre", nombre)
+            .eq("id_empresa", empresa_id)
+            .limit(1)
+        )
+        if response.data:
+            return response.data[0]
+        created = await self.db.execute(
+            lambda c: c.table("establecimientos").insert({"nombre": nombre, "id_empresa": empresa_id})
+        )
+        await self._notify_catalog_change(empresa_id)
+        return created.data[0]
 
     async def get_or_create_chacra(
         self,
@@ -67,51 +87,56 @@ class CatalogService:
         if not nombre_chacra:
             raise ValueError("El nombre de la chacra no puede estar vacío")
 
-        def _sync() -> Dict[str, Any]:
-            response = (
-                self.supabase.table("chacras")
-                .select("*")
-                .eq("nombre_chacra", nombre_chacra)
-                .eq("id_establecimiento", establecimiento_id)
-                .limit(1)
-                .execute()
-            )
-            if response.data:
-                return response.data[0]
-            created = (
-                self.supabase.table("chacras")
-                .insert(
-                    {
-                        "nombre_chacra": nombre_chacra,
-                        "id_establecimiento": establecimiento_id,
-                        "id_empresa": empresa_id,
-                    }
-                )
-                .execute()
+        if self.name_resolver:
+            match = await self.name_resolver.chacra(empresa_id, establecimiento_id, nombre_chacra)
+            if match:
+                return match.row
+
+        response = await self.db.execute(
+            lambda c: c.table("chacras")
+            .select("*")
+            .eq("nombre_chacra", nombre_chacra)
+            .eq("id_establecimiento", establecimiento_id)
+            .limit(1)
+        )
+        if response.data:
+            return response.data[0]
+        created = await self.db.execute(
+            lambda c: c.table("chacras").insert(
+                {
+                    "nombre_chacra": nombre_chacra,
+                    "id_establecimiento": establecimiento_id,
+                    "id_empresa": empresa_id,
+                }
             )
-            return created.data[0]
-
-        return await asyncio.to_thread(_sync)
+        )
+        await self._notify_catalog_change(empresa_id)
+        return created.data[0]
 
     async def get_or_create_destino(self, nombre: str) -> Dict[str, Any]:
         nombre = self._normalize(nombre)
         if not nombre:
             raise ValueError("El nombre del destino no puede estar vacío")
 
-        def _sync() -> Dict[str, Any]:
-            response = (
-                self.supabase.table("destinos")
-                .select("*")
-                .eq("nombre", nombre)
-                .limit(1)
-                .execute()
-            )
-            if response.data:
-                return response.data[0]
-            created = self.supabase.table("destinos").insert({"nombre": nombre}).execute()
-            return created.data[0]
-
-        return await asyncio.to_thread(_sync)
+        if self.name_resolver:
+            match = await self.name_resolver.destino(nombre)
+            if match:
+                return match.row
+
+        response = await self.db.execute(
+            lambda c: c.table("destinos").select("*").eq("nombre", nombre).limit(1)
+        )
+        if response.data:
+            return response.data[0]
+        created = await self.db.execute(lambda c: c.table("destinos").insert({"nombre": nombre}))
+        if self.name_resolver:
+            self.name_resolver.note_destino(created.data[0])
+        return created.data[0]
+
+    async def _notify_catalog_change(self, empresa_id: str) -> None:
+        """Invalida el contexto de empresa cacheado cuando se creó una entidad nueva."""
+        if self.shared_state:
+            await self.shared_state.publish_invalidation("empresa_context", empresa_id)
 
     @staticmethod
     def _normalize(value: str) -> str:
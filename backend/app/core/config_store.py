@@ -1,12 +1,12 @@
 from __future__ import annotations
 
-import asyncio
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Optional, Tuple
 
 from pydantic import SecretStr
 from supabase import Client
 
+from app.core.data_access import DataAccess
 from app.core.log_service import LogService
 from app.models.config import AppConfig, AppConfigUpdate
 
@@ -17,40 +17,40 @@ class ConfigStore:
     TABLE_NAME = "configuraciones"
     CONFIG_ID = 1
 
-    def __init__(self, supabase: Client, log_service: Optional[LogService] = None) -> None:
+    def __init__(
+        self,
+        supabase: Client,
+        log_service: Optional[LogService] = None,
+        data_access: Optional[DataAccess] = None,
+    ) -> None:
         self.supabase = supabase
         self.log_service = log_service
+        self.db = data_access or DataAccess(supabase)
 
     async def read(self) -> AppConfig:
-        def _read_sync() -> AppConfig:
-            response = (
-                self.supabase.table(self.TABLE_NAME)
-                .select("*")
-                .eq("id", self.CONFIG_ID)
-                .limit(1)
-                .execute()
-            )
-            record = response.data[0] if response.data else None
-            return self._record_to_model(record)
+        config, _ = await self.read_versioned()
+        return config
 
-        return await asyncio.to_thread(_read_sync)
+    async def read_versioned(self) -> Tuple[AppConfig, Optional[datetime]]:
+        """Configuración y su updated_at (None si todavía no se guardó), para ETag/Last-Modified."""
+        response = await self.db.execute(
+            lambda c: c.table(self.TABLE_NAME).select("*").eq("id", self.CONFIG_ID).limit(1)
+        )
+        record = response.data[0] if response.data else None
+        updated_at = record.get("updated_at") if record else None
+        if isinstance(updated_at, str):
+            updated_at = datetime.fromisoformat(updated_at.replace("Z", "+00:00"))
+        return self._record_to_model(record), updated_at
 
     async def write(self, payload: AppConfigUpdate) -> AppConfig:
         update_data = payload.model_dump(exclude_unset=True, mode="python")
         if not update_data:
             return await self.read()
 
-        def _write_sync() -> AppConfig:
-            data = {**update_data, "id": self.CONFIG_ID, "updated_at": datetime.now(timezone.utc).isoformat()}
-            response = (
-                self.supabase.table(self.TABLE_NAME)
-                .upsert(data, on_conflict="id")
-                .execute()
-            )
-            record = response.data[0] if response.data else data
-            return self._record_to_model(record)
-
-        new_config = await asyncio.to_thread(_write_sync)
+        data = {**update_data, "id": self.CONFIG_ID, "updated_at": datetime.now(timezone.utc).isoformat()}
+        response = await self.db.execute(lambda c: c.table(self.TABLE_NAME).upsert(data, on_conflict="id"))
+        record = response.data[0] if response.data else data
+        new_config = self._record_to_model(record)
 
         if self.log_service:
             await self.log_service.write_log(
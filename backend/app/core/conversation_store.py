@@ -1,39 +1,165 @@
 from __future__ import annotations
 
-from collections import deque
+import sys
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
 from dataclasses import dataclass
-from typing import Deque, Dict, Iterable, List
+from typing import Deque, Dict, Iterable, List, Optional
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ConversationTurn:
     role: str
     message: str
 
 
-class ConversationStore:
-    """Almacena en memoria las últimas interacciones por contacto."""
+class ConversationBackend(ABC):
+    """Interfaz común para los almacenes de historial de conversación."""
 
-    def __init__(self, max_turns: int = 10) -> None:
-        self.max_turns = max_turns
-        self._store: Dict[str, Deque[ConversationTurn]] = {}
+    max_turns: int
 
+    @abstractmethod
     def append(self, contact: str, role: str, message: str) -> None:
-        history = self._store.setdefault(contact, deque(maxlen=self.max_turns))
-        history.append(ConversationTurn(role=role, message=message))
+        ...
 
+    @abstractmethod
     def history(self, contact: str) -> List[ConversationTurn]:
-        return list(self._store.get(contact, []))
+        ...
+
+    @abstractmethod
+    def clear(self, contact: str) -> None:
+        ...
+
+    @abstractmethod
+    def contacts(self) -> List[str]:
+        ...
+
+    @abstractmethod
+    def memory_usage(self, contact: str) -> int:
+        """Bytes aproximados que ocupa el historial de un contacto."""
 
     def get_recent(self, contact: str, limit: int = 10) -> List[Dict[str, str]]:
         """Retorna historial en formato compatible con LLM APIs."""
-        turns = self._store.get(contact, [])
-        recent = list(turns)[-limit:] if len(turns) > limit else list(turns)
+        turns = self.history(contact)
+        recent = turns[-limit:] if len(turns) > limit else turns
         return [{"role": turn.role, "content": turn.message} for turn in recent]
 
+    def items(self) -> Iterable[tuple[str, List[ConversationTurn]]]:
+        for contact in self.contacts():
+            yield contact, self.history(contact)
+
+    def memory_report(self) -> Dict[str, int]:
+        """Memoria aproximada por contacto, en bytes."""
+        return {contact: self.memory_usage(contact) for contact in self.contacts()}
+
+    def is_hydrated(self, contact: str) -> bool:
+        """False si el próximo acceso al contacto tendría que leer del almacenamiento."""
+        return True
+
+    def hydrate(self, contact: str) -> None:
+        """Trae el contacto a la copia local (bloqueante: llamar fuera del event loop)."""
+
+    def reload(self, contact: str) -> None:
+        """Descarta copias locales del contacto para releerlo del almacenamiento compartido."""
+
+    def flush(self) -> None:
+        """Persiste escrituras pendientes, si el backend las acumula."""
+
+    def close(self) -> None:
+        """Libera recursos del backend (conexiones, hilos de flush)."""
+
+
+class _ContactHistory:
+    __slots__ = ("turns", "last_seen")
+
+    def __init__(self, max_turns: int) -> None:
+        self.turns: Deque[ConversationTurn] = deque(maxlen=max_turns)
+        self.last_seen = time.monotonic()
+
+
+class ConversationStore(ConversationBackend):
+    """
+    Almacena en memoria las últimas interacciones por contacto.
+
+    Los contactos inactivos por más de idle_ttl_seconds se descartan y, si se
+    supera max_contacts, se expulsa el contacto usado hace más tiempo (LRU).
+    """
+
+    def __init__(
+        self,
+        max_turns: int = 10,
+        idle_ttl_seconds: Optional[float] = 6 * 3600,
+        max_contacts: Optional[int] = 5000,
+    ) -> None:
+        self.max_turns = max_turns
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_contacts = max_contacts
+        # Ordenado por última actividad: el primero es el más antiguo
+        self._store: "OrderedDict[str, _ContactHistory]" = OrderedDict()
+
+    def append(self, contact: str, role: str, message: str) -> None:
+        self._evict()
+        entry = self._store.get(contact)
+        if entry is None:
+            entry = _ContactHistory(self.max_turns)
+            self._store[contact] = entry
+        entry.turns.append(ConversationTurn(role=role, message=message))
+        self._touch(contact, entry)
+
+        if self.max_contacts is not None:
+            while len(self._store) > self.max_contacts:
+                self._store.popitem(last=False)
+
+    def history(self, contact: str) -> List[ConversationTurn]:
+        entry = self._get_alive(contact)
+        if entry is None:
+            return []
+        self._touch(contact, entry)
+        return list(entry.turns)
+
     def clear(self, contact: str) -> None:
         self._store.pop(contact, None)
 
-    def items(self) -> Iterable[tuple[str, List[ConversationTurn]]]:
-        for contact, turns in self._store.items():
-            yield contact, list(turns)
+    def __contains__(self, contact: object) -> bool:
+        return isinstance(contact, str) and self._get_alive(contact) is not None
+
+    def contacts(self) -> List[str]:
+        self._evict()
+        return list(self._store.keys())
+
+    def memory_usage(self, contact: str) -> int:
+        entry = self._store.get(contact)
+        if entry is None:
+            return 0
+        size = sys.getsizeof(entry) + sys.getsizeof(entry.turns)
+        for turn in entry.turns:
+            size += sys.getsizeof(turn) + sys.getsizeof(turn.role) + sys.getsizeof(turn.message)
+        return size
+
+    def _get_alive(self, contact: str) -> Optional[_ContactHistory]:
+        entry = self._store.get(contact)
+        if entry is None:
+            return None
+        if self._is_expired(entry, time.monotonic()):
+            self._store.pop(contact, None)
+            return None
+        return entry
+
+    def _touch(self, contact: str, entry: _ContactHistory) -> None:
+        entry.last_seen = time.monotonic()
+        self._store.move_to_end(contact)
+
+    def _is_expired(self, entry: _ContactHistory, now: float) -> bool:
+        return self.idle_ttl_seconds is not None and now - entry.last_seen > self.idle_ttl_seconds
+
+    def _evict(self) -> None:
+        """Descarta contactos inactivos; como el orden es por actividad basta mirar el inicio."""
+        if self.idle_ttl_seconds is None:
+            return
+        now = time.monotonic()
+        while self._store:
+            contact, entry = next(iter(self._store.items()))
+            if not self._is_expired(entry, now):
+                break
+            self._store.pop(contact, None)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from app.core.conversation_store import ConversationBackend, ConversationTurn
+
+
+class SQLiteConversationStore(ConversationBackend):
+    """
+    Historial de conversación persistido en un archivo SQLite.
+
+    Pensado para un único nodo: sobrevive a reinicios del proceso pero no se
+    comparte entre réplicas.
+    """
+
+    # Cada cuántos append se purgan los contactos inactivos
+    PURGE_EVERY = 200
+
+    def __init__(
+        self,
+        path: str = "conversations.sqlite3",
+        max_turns: int = 10,
+        idle_ttl_seconds: Optional[float] = 6 * 3600,
+    ) -> None:
+        self.path = path
+        self.max_turns = max_turns
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._lock = threading.Lock()
+        self._appends = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS conversation_turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                contact TEXT NOT NULL,
+                role TEXT NOT NULL,
+                message TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_conversation_turns_contact ON conversation_turns(contact, id)"
+        )
+
+    def append(self, contact: str, role: str, message: str) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT INTO conversation_turns (contact, role, message, created_at) VALUES (?, ?, ?, ?)",
+                (contact, role, message, time.time()),
+            )
+            # Mantener solo los últimos max_turns turnos del contacto
+            self._conn.execute(
+                """
+                DELETE FROM conversation_turns
+                WHERE contact = ? AND id NOT IN (
+                    SELECT id FROM conversation_turns WHERE contact = ? ORDER BY id DESC LIMIT ?
+                )
+                """,
+                (contact, contact, self.max_turns),
+            )
+            self._conn.execute("COMMIT")
+
+            self._appends += 1
+            if self._appends % self.PURGE_EVERY == 0:
+                self._purge_idle()
+
+    def history(self, contact: str) -> List[ConversationTurn]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT role, message, created_at FROM conversation_turns
+                WHERE contact = ? ORDER BY id DESC LIMIT ?
+                """,
+                (contact, self.max_turns),
+            ).fetchall()
+
+        if not rows:
+            return []
+        last_activity = rows[0][2]
+        if self.idle_ttl_seconds is not None and time.time() - last_activity > self.idle_ttl_seconds:
+            self.clear(contact)
+            return []
+        return [ConversationTurn(role=role, message=message) for role, message, _ in reversed(rows)]
+
+    def clear(self, contact: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM conversation_turns WHERE contact = ?", (contact,))
+
+    def contacts(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT contact FROM conversation_turns").fetchall()
+        return [row[0] for row in rows]
+
+    def memory_usage(self, contact: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT COALESCE(SUM(LENGTH(CAST(role AS BLOB)) + LENGTH(CAST(message AS BLOB))), 0)
+                FROM conversation_turns WHERE contact = ?
+                """,
+                (contact,),
+            ).fetchone()
+        return int(row[0])
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _purge_idle(self) -> None:
+        if self.idle_ttl_seconds is None:
+            return
+        cutoff = time.time() - self.idle_ttl_seconds
+        self._conn.execute(
+            """
+            DELETE FROM conversation_turns WHERE contact IN (
+                SELECT contact FROM conversation_turns GROUP BY contact HAVING MAX(created_at) < ?
+            )
+            """,
+            (cutoff,),
+        )
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from supabase import Client
+
+from app.core.conversation_store import ConversationBackend, ConversationStore, ConversationTurn
+
+
+class SupabaseConversationStore(ConversationBackend):
+    """
+    Historial de conversación en la tabla conversation_turns de Supabase.
+
+    Las lecturas se sirven desde una copia local en memoria (que se hidrata
+    desde la tabla la primera vez que se consulta un contacto) y las escrituras
+    se acumulan y se envían en lotes desde un hilo en segundo plano
+    (write-behind), para no agregar un round-trip a Supabase en cada turno.
+    La hidratación es bloqueante: los flujos la hacen con hydrate() en el pool
+    DB_IO antes de procesar el turno, nunca en el event loop.
+    """
+
+    TABLE_NAME = "conversation_turns"
+    MAX_PENDING = 10_000
+
+    def __init__(
+        self,
+        supabase_client: Client,
+        max_turns: int = 10,
+        idle_ttl_seconds: Optional[float] = 6 * 3600,
+        max_contacts: Optional[int] = 5000,
+        flush_interval_seconds: float = 1.0,
+        batch_size: int = 50,
+    ) -> None:
+        self.supabase = supabase_client
+        self.max_turns = max_turns
+        self.flush_interval_seconds = flush_interval_seconds
+        self.batch_size = batch_size
+        self._local = ConversationStore(
+            max_turns=max_turns,
+            idle_ttl_seconds=idle_ttl_seconds,
+            max_contacts=max_contacts,
+        )
+        # Contactos ya consultados que no tenían turnos (la copia local no guarda
+        # contactos vacíos): sin esto se volverían a consultar en cada acceso
+        self._known_empty: "OrderedDict[str, None]" = OrderedDict()
+        self._max_known_empty = max_contacts or 5000
+        # Contactos borrados cuyo DELETE todavía no se envió: no hay que hidratarlos
+        self._cleared: Set[str] = set()
+        # Operaciones pendientes en orden: ("insert", fila) o ("clear", contacto)
+        self._pending: List[Tuple[str, Any]] = []
+        # Protege _local (ConversationStore no es thread-safe: hydrate y reload
+        # corren en el pool DB_IO mientras el event loop agrega turnos) y las
+        # estructuras de abajo; reentrante porque _ensure_hydrated consulta is_hydrated
+        self._lock = threading.RLock()
+        # Un solo flush a la vez (hilo write-behind y flush por turno en modo
+        # cluster): si no, un DELETE posterior podría llegar antes que un INSERT previo
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(
+            target=self._flush_loop,
+            name="conversation-write-behind",
+            daemon=True,
+        )
+        self._worker.start()
+
+    def append(self, contact: str, role: str, message: str) -> None:
+        self._ensure_hydrated(contact)
+        with self._lock:
+            self._local.append(contact, role, message)
+            self._cleared.discard(contact)
+            self._known_empty.pop(contact, None)
+            self._pending.append(("insert", {"contacto": contact, "role": role, "message": message}))
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.set()
+
+    def history(self, contact: str) -> List[ConversationTurn]:
+        self._ensure_hydrated(contact)
+        with self._lock:
+            return self._local.history(contact)
+
+    def clear(self, contact: str) -> None:
+        with self._lock:
+            self._local.clear(contact)
+            self._cleared.add(contact)
+            self._pending.append(("clear", contact))
+            self._wakeup.set()
+
+    def contacts(self) -> List[str]:
+        with self._lock:
+            return self._local.contacts()
+
+    def memory_usage(self, contact: str) -> int:
+        with self._lock:
+            return self._local.memory_usage(contact)
+
+    def is_hydrated(self, contact: str) -> bool:
+        with self._lock:
+            return contact in self._local or contact in self._cleared or contact in self._known_empty
+
+    def hydrate(self, contact: str) -> None:
+        self._ensure_hydrated(contact)
+
+    def reload(self, contact: str) -> None:
+        """Relee el contacto desde la tabla (otra réplica pudo haber escrito turnos)."""
+        self.flush()
+        with self._lock:
+            self._local.clear(contact)
+            self._known_empty.pop(contact, None)
+        self._ensure_hydrated(contact)
+
+    def flush(self) -> None:
+        """Envía a Supabase todas las operaciones pendientes, en orden."""
+        with self._flush_lock:
+            self._flush_pending()
+
+    def _flush_pending(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        sent = 0
+        try:
+            while sent < len(pending):
+                op, value = pending[sent]
+                if op == "clear":
+                    self.supabase.table(self.TABLE_NAME).delete().eq("contacto", value).execute()
+                    with self._lock:
+                        self._cleared.discard(value)
+                    sent += 1
+                    continue
+                # Agrupar inserts consecutivos en un solo POST
+                end = sent
+                while end < len(pending) and pending[end][0] == "insert" and end - sent < self.batch_size:
+                    end += 1
+                rows = [row for _, row in pending[sent:end]]
+                self.supabase.table(self.TABLE_NAME).insert(rows).execute()
+                sent = end
+        except Exception:
+            # Reencolar lo no enviado delante de lo nuevo, con un tope para no
+            # crecer sin límite si Supabase queda caído
+            with self._lock:
+                self._pending = (pending[sent:] + self._pending)[-self.MAX_PENDING:]
+            raise
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        self._worker.join(timeout=5)
+        self.flush()
+
+    def _ensure_hydrated(self, contact: str) -> None:
+        # La copia local expulsa contactos por TTL/LRU; si ya no está, se relee
+        if self.is_hydrated(contact):
+            return
+
+        # Primer acceso al contacto en este proceso: traer los últimos turnos.
+        # Es la única lectura bloqueante contra Supabase por contacto.
+        response = (
+            self.supabase.table(self.TABLE_NAME)
+            .select("role, message")
+            .eq("contacto", contact)
+            .order("id", desc=True)
+            .limit(self.max_turns)
+            .execute()
+        )
+        rows = list(reversed(response.data or []))
+        with self._lock:
+            if self.is_hydrated(contact):
+                return
+            if not rows:
+                self._known_empty[contact] = None
+                while len(self._known_empty) > self._max_known_empty:
+                    self._known_empty.popitem(last=False)
+                return
+            for row in rows:
+                self._local.append(contact, row["role"], row["message"])
+
+    def _flush_loop(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval_seconds)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Un fallo transitorio no debe matar el hilo: se reintenta en el próximo ciclo
+                continue
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Optional, Union
+
+import httpx
+from postgrest import APIResponse, AsyncPostgrestClient
+from supabase import Client
+
+from app.core.executors import DB_IO, run_blocking
+from app.core.tracing import span
+
+# Recibe un cliente con la interfaz de PostgREST (.table / .rpc) y retorna el
+# request builder listo para ejecutar. La misma función sirve para el cliente
+# sync de supabase-py y para el async, porque ambos comparten la API de builders.
+QueryBuilder = Callable[[Any], Any]
+
+
+class PooledAsyncPostgrestClient(AsyncPostgrestClient):
+    """AsyncPostgrestClient con límites de pool de conexiones configurables."""
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        headers: Dict[str, str],
+        pool_size: int = 20,
+        timeout: Union[int, float, httpx.Timeout] = 30,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        # create_session se invoca desde el __init__ base, así que estos
+        # atributos tienen que existir antes de llamarlo
+        self._pool_size = pool_size
+        self._transport = transport
+        super().__init__(base_url, headers=headers, timeout=timeout)
+
+    def create_session(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        timeout: Union[int, float, httpx.Timeout],
+        verify: bool = True,
+    ) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            follow_redirects=True,
+            http2=self._transport is None,
+            limits=httpx.Limits(
+                max_connections=self._pool_size,
+                max_keepalive_connections=self._pool_size,
+            ),
+            transport=self._transport,
+        )
+
+
+def build_async_postgrest_client(
+    url: str,
+    key: str,
+    *,
+    pool_size: int = 20,
+    timeout: float = 30,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> PooledAsyncPostgrestClient:
+    """Crea un cliente PostgREST async compartido apuntando a {url}/rest/v1."""
+    return PooledAsyncPostgrestClient(
+        f"{url.rstrip('/')}/rest/v1",
+        headers={
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        },
+        pool_size=pool_size,
+        timeout=timeout,
+        transport=transport,
+    )
+
+
+class DataAccess:
+    """
+    Punto único de ejecución de consultas a Supabase.
+
+    Si hay cliente async, la consulta se ejecuta de forma nativa sobre su pool
+    de conexiones; si no, se ejecuta con el cliente sync de supabase-py en el
+    executor db-io, como hacían los servicios hasta ahora con to_thread. Así
+    cada servicio puede migrar a `await db.execute(...)` sin depender de que el
+    cliente async esté activo.
+    """
+
+    def __init__(self, sync_client: Optional[Client], async_client: Optional[AsyncPostgrestClient] = None) -> None:
+        self.sync_client = sync_client
+        self.async_client = async_client
+
+    @property
+    def is_async(self) -> bool:
+        return self.async_client is not None
+
+    async def execute(self, build: QueryBuilder) -> APIResponse:
+        client = self.async_client if self.async_client is not None else self.sync_client
+        builder = build(client)
+        with span("db", method=getattr(builder, "http_method", None), path=getattr(builder, "path", None)):
+            if self.async_client is not None:
+                return await builder.execute()
+            return await run_blocking(DB_IO, builder.execute)
+
+    async def run_sync(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Ejecuta una función bloqueante que usa el cliente sync (operaciones aún no migradas)."""
+        with span("db.sync", function=getattr(fn, "__name__", None)):
+            return await run_blocking(DB_IO, fn, *args)
+
+    async def aclose(self) -> None:
+        if self.async_client is not None:
+            await self.async_client.aclose()
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from app.core.data_access import DataAccess
+from app.core.llm_tools import REMITO_LLM_FIELDS
+from app.core.metrics import DRIVER_PROFILE_LOOKUPS
+
+_SELECT_COLUMNS = ",".join(("id_remito", "id_empresa", "timestamp_creacion", *REMITO_LLM_FIELDS))
+
+
+class DriverProfile:
+    """
+    Datos del último remito de un teléfono: conductor, vehículo, origen y destino.
+
+    Los valores se guardan en una tupla alineada con REMITO_LLM_FIELDS para
+    que cada entrada del cache ocupe poco. id_empresa es la empresa de ese
+    remito: el perfil solo se usa si el teléfono sigue asociado a ella.
+    """
+
+    __slots__ = ("values", "id_remito", "id_empresa")
+
+    def __init__(
+        self,
+        values: Tuple[Any, ...],
+        id_remito: Optional[str] = None,
+        id_empresa: Optional[str] = None,
+    ) -> None:
+        self.values = values
+        self.id_remito = id_remito
+        self.id_empresa = id_empresa
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "DriverProfile":
+        id_empresa = record.get("id_empresa")
+        return cls(
+            tuple(record.get(name) for name in REMITO_LLM_FIELDS),
+            record.get("id_remito"),
+            str(id_empresa) if id_empresa is not None else None,
+        )
+
+    def belongs_to(self, empresa_ids: Sequence[str]) -> bool:
+        """True si el remito del perfil es de una de las empresas actuales del teléfono."""
+        return self.id_empresa is not None and self.id_empresa in empresa_ids
+
+    def as_slots(self) -> Dict[str, Any]:
+        """Campos para precargar el estado de slots (los vacíos se omiten, salvo la zorra)."""
+        slots = {}
+        for name, value in zip(REMITO_LLM_FIELDS, self.values):
+            if value is not None or name == "matricula_zorra":
+                slots[name] = value
+        return slots
+
+
+class DriverProfileCache:
+    """
+    Perfil por teléfono armado a partir de los remitos anteriores.
+
+    Se carga a demanda desde la tabla remitos (el último remito activo con
+    raw_payload.contacto igual al teléfono) y se actualiza localmente cada vez
+    que se crea un remito. Los teléfonos sin remitos también se cachean para
+    no repetir la consulta; el TTL acota lo desactualizado que puede quedar
+    un perfil si el remito se creó en otra réplica.
+    """
+
+    def __init__(
+        self,
+        data_access: DataAccess,
+        *,
+        max_entries: int = 5000,
+        ttl_seconds: float = 3600,
+    ) -> None:
+        self.db = data_access
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # contacto -> (perfil o None, momento de carga)
+        self._entries: "OrderedDict[str, Tuple[Optional[DriverProfile], float]]" = OrderedDict()
+
+    async def get(self, contact: str) -> Optional[DriverProfile]:
+        entry = self._entries.get(contact)
+        if entry is not None and time.monotonic() - entry[1] <= self.ttl_seconds:
+            self._entries.move_to_end(contact)
+            DRIVER_PROFILE_LOOKUPS.labels(result="hit" if entry[0] else "hit_empty").inc()
+            return entry[0]
+
+        response = await self.db.execute(
+            lambda c: c.table("remitos")
+            .select(_SELECT_COLUMNS)
+            .eq("raw_payload->>contacto", contact)
+            .eq("activo", True)
+            .order("timestamp_creacion", desc=True)
+            .limit(1)
+        )
+        profile = DriverProfile.from_record(response.data[0]) if response.data else None
+        DRIVER_PROFILE_LOOKUPS.labels(result="loaded" if profile else "empty").inc()
+        self._store(contact, profile)
+        return profile
+
+    def remember(self, contact: str, record: Dict[str, Any]) -> None:
+        """Actualiza el perfil con un remito recién creado."""
+        self._store(contact, DriverProfile.from_record(record))
+
+    def forget(self, contact: str) -> None:
+        self._entries.pop(contact, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store(self, contact: str, profile: Optional[DriverProfile]) -> None:
+        self._entries[contact] = (profile, time.monotonic())
+        self._entries.move_to_end(contact)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -5,12 +5,15 @@ from typing import Any, Dict, List, Optional
 
 from supabase import Client
 
+from app.core.data_access import DataAccess
+
 
 class EmpresaContextService:
     """Servicio para cargar contexto completo de una empresa (establecimientos y chacras)."""
 
-    def __init__(self, supabase_client: Client) -> None:
+    def __init__(self, supabase_client: Client, data_access: Optional[DataAccess] = None) -> None:
         self.supabase = supabase_client
+        self.db = data_access or DataAccess(supabase_client)
         self._cache: Dict[str, Dict[str, Any]] = {}
 
     async def load_context(self, empresa_id: str, use_cache: bool = True) -> Dict[str, Any]:
@@ -27,48 +30,33 @@ class EmpresaContextService:
         if use_cache and empresa_id in self._cache:
             return self._cache[empresa_id]
 
-        def _load_sync() -> Dict[str, Any]:
-            # Cargar empresa
-            empresa_resp = (
-                self.supabase.table("empresas")
-                .select("*")
-                .eq("id_empresa", empresa_id)
-                .limit(1)
-                .execute()
-            )
-            empresa = empresa_resp.data[0] if empresa_resp.data else None
-
-            if not empresa:
-                return {"empresa": None, "establecimientos": [], "chacras": []}
-
-            # Cargar establecimientos
-            est_resp = (
-                self.supabase.table("establecimientos")
-                .select("*")
-                .eq("id_empresa", empresa_id)
-                .order("nombre")
-                .execute()
-            )
-            establecimientos = est_resp.data or []
-
-            # Cargar chacras con información de establecimiento
-            chacras_resp = (
-                self.supabase.table("chacras")
-                .select("*, establecimientos(nombre)")
-                .eq("id_empresa", empresa_id)
-                .order("nombre_chacra")
-                .execute()
-            )
-            chacras = chacras_resp.data or []
+        # Cargar empresa
+        empresa_resp = await self.db.execute(
+            lambda c: c.table("empresas").select("*").eq("id_empresa", empresa_id).limit(1)
+        )
+        empresa = empresa_resp.data[0] if empresa_resp.data else None
 
-            return {
+        if not empresa:
+            context: Dict[str, Any] = {"empresa": None, "establecimientos": [], "chacras": []}
+        else:
+            # Establecimientos y chacras (con información de establecimiento) en paralelo
+            est_resp, chacras_resp = await asyncio.gather(
+                self.db.execute(
+                    lambda c: c.table("establecimientos").select("*").eq("id_empresa", empresa_id).order("nombre")
+                ),
+                self.db.execute(
+                    lambda c: c.table("chacras")
+                    .select("*, establecimientos(nombre)")
+                    .eq("id_empresa", empresa_id)
+                    .order("nombre_chacra")
+                ),
+            )
+            context = {
                 "empresa": empresa,
-                "establecimientos": establecimientos,
-                "chacras": chacras,
+                "establecimientos": est_resp.data or [],
+                "chacras": chacras_resp.data or [],
             }
 
-        context = await asyncio.to_thread(_load_sync)
-        
         if use_cache and context["empresa"]:
             self._cache[empresa_id] = context
         
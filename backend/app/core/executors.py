@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from app.core.tracing import span
+
+T = TypeVar("T")
+
+logger = logging.getLogger("remibot.executors")
+
+# Clases de carga bloqueante; cada una tiene su propio pool de hilos para que
+# una ráfaga de renders de QR no deje sin hilos a las consultas de otros choferes
+DB_IO = "db-io"
+CPU_RENDER = "cpu-render"
+STORAGE_IO = "storage-io"
+
+
+class WorkloadExecutor:
+    """ThreadPoolExecutor con nombre, métricas de cola y aviso de saturación."""
+
+    # Intervalo mínimo entre avisos de saturación del mismo executor
+    WARNING_INTERVAL_SECONDS = 30.0
+
+    def __init__(self, name: str, max_workers: int, saturation_queue_depth: int) -> None:
+        self.name = name
+        self.max_workers = max_workers
+        self.saturation_queue_depth = saturation_queue_depth
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"remibot-{name}")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+        self._saturation_events = 0
+        self._max_queue_depth = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+        self._last_warning = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Tareas enviadas que todavía esperan un hilo libre."""
+        return self._in_flight - self._active
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        loop = asyncio.get_running_loop()
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self._in_flight += 1
+            queue_depth = self._in_flight - self._active
+            self._max_queue_depth = max(self._max_queue_depth, queue_depth)
+        if queue_depth > self.saturation_queue_depth:
+            self._on_saturation(queue_depth)
+
+        def _tracked() -> T:
+            started_at = time.perf_counter()
+            with self._lock:
+                self._active += 1
+                self._total_wait += started_at - submitted_at
+            if executor_span is not None:
+                executor_span.set_attribute("queue_wait_ms", round((started_at - submitted_at) * 1000, 3))
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._in_flight -= 1
+                    self._total_run += time.perf_counter() - started_at
+                    if ok:
+                        self._completed += 1
+                    else:
+                        self._failed += 1
+
+        with span(f"executor.{self.name}") as executor_span:
+            # Igual que asyncio.to_thread: propagar contextvars al hilo
+            ctx = contextvars.copy_context()
+            return await loop.run_in_executor(self._pool, functools.partial(ctx.run, _tracked))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                "max_workers": self.max_workers,
+                "active": self._active,
+                "queue_depth": self._in_flight - self._active,
+                "max_queue_depth": self._max_queue_depth,
+                "completed": self._completed,
+                "failed": self._failed,
+                "saturation_events": self._saturation_events,
+                "avg_wait_ms": round(self._total_wait / finished * 1000, 2) if finished else 0.0,
+                "avg_run_ms": round(self._total_run / finished * 1000, 2) if finished else 0.0,
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._pool.shutdown(wait=wait)
+
+    def _on_saturation(self, queue_depth: int) -> None:
+        with self._lock:
+            self._saturation_events += 1
+            now = time.monotonic()
+            if now - self._last_warning < self.WARNING_INTERVAL_SECONDS:
+                return
+            self._last_warning = now
+        logger.warning(
+            "Executor %s saturado: %d tareas en cola (%d hilos)",
+            self.name,
+            queue_depth,
+            self.max_workers,
+        )
+
+
+class ExecutorRegistry:
+    """Conjunto de executors por clase de carga."""
+
+    def __init__(self, sizes: Dict[str, int], saturation_queue_depth: int = 10) -> None:
+        self._executors = {
+            name: WorkloadExecutor(name, max_workers, saturation_queue_depth)
+            for name, max_workers in sizes.items()
+        }
+
+    def get(self, name: str) -> WorkloadExecutor:
+        try:
+            return self._executors[name]
+        except KeyError:
+            raise ValueError(f"Executor desconocido: {name}") from None
+
+    async def run(self, name: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await self.get(name).run(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: executor.stats() for name, executor in self._executors.items()}
+
+    def shutdown(self, wait: bool = False) -> None:
+        for executor in self._executors.values():
+            executor.shutdown(wait=wait)
+
+
+_registry: Optional[ExecutorRegistry] = None
+
+
+def configure_executors(
+    *,
+    db_io_workers: int = 16,
+    cpu_render_workers: int = 2,
+    storage_io_workers: int = 8,
+    saturation_queue_depth: int = 10,
+) -> ExecutorRegistry:
+    """Crea (o reemplaza) los executors globales con los tamaños indicados."""
+    global _registry
+    previous = _registry
+    _registry = ExecutorRegistry(
+        {
+            DB_IO: db_io_workers,
+            CPU_RENDER: cpu_render_workers,
+            STORAGE_IO: storage_io_workers,
+        },
+        saturation_queue_depth=saturation_queue_depth,
+    )
+    if previous is not None:
+        previous.shutdown(wait=False)
+    return _registry
+
+
+def get_executors() -> ExecutorRegistry:
+    if _registry is None:
+        return configure_executors()
+    return _registry
+
+
+async def run_blocking(workload: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Ejecuta una función bloqueante en el executor de su clase de carga."""
+    return await get_executors().run(workload, fn, *args, **kwargs)
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.metrics import HEALTH_CHECK_UP, HEALTH_CHECKS
+
+if TYPE_CHECKING:
+    from app.core.data_access import DataAccess
+
+logger = logging.getLogger("remibot.health")
+
+HealthCheck = Callable[[], Awaitable[None]]
+
+
+def supabase_check(data_access: DataAccess) -> HealthCheck:
+    """Una lectura mínima por PostgREST: red, credenciales y base respondiendo."""
+
+    async def check() -> None:
+        await data_access.execute(lambda client: client.table("empresas").select("id_empresa").limit(1))
+
+    return check
+
+
+class CheckState:
+    __slots__ = ("ok", "ever_ok", "checked_at", "latency_ms", "error", "consecutive_failures")
+
+    def __init__(self) -> None:
+        self.ok = False
+        self.ever_ok = False
+        self.checked_at: Optional[float] = None
+        self.latency_ms = 0.0
+        self.error: Optional[str] = None
+        self.consecutive_failures = 0
+
+
+class HealthProber:
+    """
+    Verifica las dependencias en segundo plano cada interval_seconds y guarda
+    el último resultado; /livez y /readyz solo leen ese estado, así un load
+    balancer que los consulta seguido no genera consultas a Supabase.
+
+    Una dependencia deja de estar lista tras failure_threshold fallos seguidos
+    (un error aislado no saca a la réplica) o si su último resultado es viejo.
+    """
+
+    def __init__(
+        self,
+        checks: Dict[str, HealthCheck],
+        *,
+        interval_seconds: float = 10.0,
+        timeout_seconds: float = 3.0,
+        failure_threshold: int = 3,
+    ) -> None:
+        self.checks = checks
+        self.interval_seconds = interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self.failure_threshold = failure_threshold
+        self._states: Dict[str, CheckState] = {name: CheckState() for name in checks}
+        self._task: Optional[asyncio.Task] = None
+        self._last_cycle: Optional[float] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="health-prober")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval_seconds)
+
+    async def run_once(self) -> None:
+        await asyncio.gather(*(self._probe(name, check) for name, check in self.checks.items()))
+        self._last_cycle = time.monotonic()
+
+    async def _probe(self, name: str, check: HealthCheck) -> None:
+        state = self._states[name]
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(check(), self.timeout_seconds)
+        except Exception as exc:
+            error = "timeout" if isinstance(exc, asyncio.TimeoutError) else f"{type(exc).__name__}: {exc}"
+            if state.ok or state.checked_at is None:
+                logger.warning("Health check %s falló: %s", name, error)
+            state.ok = False
+            state.error = error
+            state.consecutive_failures += 1
+        else:
+            if not state.ok and state.checked_at is not None:
+                logger.info("Health check %s recuperado", name)
+            state.ok = state.ever_ok = True
+            state.error = None
+            state.consecutive_failures = 0
+        state.latency_ms = (time.perf_counter() - started) * 1000
+        state.checked_at = time.monotonic()
+        HEALTH_CHECKS.labels(check=name, outcome="ok" if state.ok else "error").inc()
+        HEALTH_CHECK_UP.labels(check=name).set(1 if state.ok else 0)
+
+    @property
+    def _stale_after(self) -> float:
+        return 3 * self.interval_seconds + self.timeout_seconds
+
+    def liveness(self) -> Tuple[bool, Dict[str, Any]]:
+        """
+        El proceso está vivo mientras el prober sigue completando ciclos: si se
+        detuvo o dejó de avanzar, el loop (o la tarea) quedó trabado.
+        """
+        if self._task is None:
+            return True, {"prober": "stopped"}
+        if self._task.done():
+            return False, {"prober": "crashed"}
+        if self._last_cycle is None:
+            return True, {"prober": "starting"}
+        age = time.monotonic() - self._last_cycle
+        return age <= self._stale_after, {"prober": "running", "last_cycle_age_s": round(age, 1)}
+
+    def readiness(self) -> Tuple[bool, Dict[str, Any]]:
+        now = time.monotonic()
+        ready = True
+        report: Dict[str, Any] = {}
+        for name, state in self._states.items():
+            if state.checked_at is None:
+                status, check_ready = "pending", False
+            elif now - state.checked_at > self._stale_after:
+                status, check_ready = "stale", False
+            elif state.ok:
+                status, check_ready = "ok", True
+            else:
+                status = "failing"
+                # Al arrancar no hay margen: hace falta al menos un resultado bueno
+                check_ready = state.ever_ok and state.consecutive_failures < self.failure_threshold
+            ready = ready and check_ready
+            entry: Dict[str, Any] = {"status": status}
+            if state.checked_at is not None:
+                entry["age_s"] = round(now - state.checked_at, 1)
+                entry["latency_ms"] = round(state.latency_ms, 1)
+            if state.error:
+                entry["error"] = state.error
+                entry["consecutive_failures"] = state.consecutive_failures
+            report[name] = entry
+        return ready, report
+
+
+class DiagnosticsGate:
+    """Deja pasar un diagnóstico pesado cada min_interval_seconds (por proceso)."""
+
+    def __init__(self, min_interval_seconds: float) -> None:
+        self.min_interval_seconds = min_interval_seconds
+        self._last_run: Optional[float] = None
+
+    def acquire(self) -> float:
+        """0 si se puede correr ahora (y lo registra); si no, segundos hasta el próximo turno."""
+        now = time.monotonic()
+        if self._last_run is not None:
+            wait = self._last_run + self.min_interval_seconds - now
+            if wait > 0:
+                return wait
+        self._last_run = now
+        return 0.0
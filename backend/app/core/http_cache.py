@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+from app.core.metrics import HTTP_NOT_MODIFIED, RESPONSE_CACHE_LOOKUPS
+
+# El navegador puede guardar la respuesta pero la revalida siempre (If-None-Match)
+CACHE_CONTROL = "private, no-cache"
+
+
+def etag_for(body: bytes, salt: str = "") -> str:
+    """ETag fuerte a partir del contenido serializado (y de un dato extra opcional)."""
+    digest = hashlib.blake2b(body, digest_size=16)
+    if salt:
+        digest.update(salt.encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Comparación débil (RFC 9110 13.1.2): W/"x" equivale a "x"
+    candidates = (item.strip().removeprefix("W/") for item in if_none_match.split(","))
+    return etag in candidates
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # Last-Modified tiene resolución de segundos
+    return last_modified.replace(microsecond=0) <= since
+
+
+def conditional_response(
+    request: Request,
+    body: bytes,
+    etag: str,
+    *,
+    endpoint: str,
+    last_modified: Optional[datetime] = None,
+) -> Response:
+    """
+    Respuesta JSON con ETag (y Last-Modified si se conoce), o 304 sin cuerpo
+    si el cliente ya tiene esa versión. If-None-Match tiene prioridad sobre
+    If-Modified-Since, como indica el RFC.
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = bool(if_modified_since and last_modified and _not_modified_since(if_modified_since, last_modified))
+
+    if not_modified:
+        HTTP_NOT_MODIFIED.labels(endpoint=endpoint).inc()
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cache_key(request: Request) -> str:
+    """Ruta y parámetros en orden canónico: ?a=1&b=2 y ?b=2&a=1 comparten entrada."""
+    params = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{params}"
+
+
+class CachedBody:
+    __slots__ = ("body", "etag", "expires_at")
+
+    def __init__(self, body: bytes, etag: str, expires_at: float) -> None:
+        self.body = body
+        self.etag = etag
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """
+    Cuerpos ya serializados de las lecturas más pedidas (listados de remitos).
+
+    Cualquier escritura de remitos invalida todas las entradas a través de
+    SharedState (scope "remitos"), así que también se enteran las otras
+    réplicas. El número de generación evita guardar un resultado leído antes
+    de una invalidación que ocurrió mientras se consultaba la base; el TTL
+    acota lo desactualizado que puede quedar algo modificado por fuera del
+    backend (SQL manual, triggers).
+    """
+
+    def __init__(self, *, max_entries: int = 256, ttl_seconds: float = 30.0) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+        self._entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CachedBody]:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            RESPONSE_CACHE_LOOKUPS.labels(result="miss").inc()
+            return None
+        self._entries.move_to_end(key)
+        RESPONSE_CACHE_LOOKUPS.labels(result="hit").inc()
+        return entry
+
+    def put(self, key: str, body: bytes, etag: str, generation: int) -> None:
+        if generation != self.generation:
+            return
+        self._entries[key] = CachedBody(body, etag, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        # Firma de InvalidationCallback; una escritura puede afectar cualquier listado
+        self.generation += 1
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Campos de un remito que el LLM no debe definir (los completa el backend)
+REMITO_FORBIDDEN_FIELDS = (
+    "id_remito",
+    "qr_url",
+    "timestamp_creacion",
+    "id_chacra",
+    "id_establecimiento",
+    "id_empresa",
+    "id_destino",
+    "estado_remito",
+    "activo",
+    "raw_payload",
+)
+
+# Mínimo para considerar que un objeto es un remito
+REMITO_REQUIRED_KEYS = ("nombre_empresa", "peso_estimado_tn")
+
+# Únicos caracteres que cambian el estado del escáner; el resto del texto se
+# saltea con la búsqueda del regex (en C) en lugar de recorrerlo en Python
+_RELEVANT = re.compile(r'[{}"\\`]')
+
+# Patrón del extractor anterior (objetos con hasta un nivel de anidamiento):
+# respaldo cuando el escáner agota el presupuesto de retrocesos
+_FLAT_OBJECT = re.compile(r"\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}")
+
+# (inicio, fin, dentro de bloque ```) en offsets absolutos del texto recibido
+_SpanInfo = Tuple[int, int, bool]
+
+
+class JsonObjectExtractor:
+    """
+    Extrae el primer objeto JSON aceptable de una respuesta del LLM en una sola pasada.
+
+    Lleva el balance de llaves y el estado de strings (con escapes), así que
+    el costo es lineal aunque el texto tenga muchas llaves sueltas, y soporta
+    objetos anidados a cualquier profundidad. Los objetos dentro de un bloque
+    ``` tienen prioridad: se aceptan apenas cierran, mientras que uno fuera de
+    bloque queda como respaldo hasta finish().
+
+    Si un candidato con strings no parsea (una comilla suelta en la prosa
+    hace que el JSON real quede "dentro" de un string), se vuelve a escanear
+    desde la llave siguiente. Lo reescaneado en total no pasa de
+    REWIND_FACTOR veces el texto leído (o REWIND_MIN_BUDGET caracteres, para
+    textos cortos); si el presupuesto se agota sin resultado, se recorre el
+    texto con el patrón del extractor anterior, así nunca encuentra menos
+    que él.
+
+    Se puede alimentar de a fragmentos (tokens de streaming) con feed(); para
+    un texto completo alcanza con extract().
+    """
+
+    REWIND_FACTOR = 2
+    REWIND_MIN_BUDGET = 16 * 1024
+
+    def __init__(
+        self,
+        *,
+        required_keys: Iterable[str] = (),
+        accept: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> None:
+        self.required_keys = tuple(required_keys)
+        # Prefiltro barato: la clave tiene que aparecer literal antes de intentar json.loads
+        self._key_markers = tuple(f'"{key}"' for key in self.required_keys)
+        self.accept = accept
+
+        self._buffer = ""
+        self._base = 0  # offset absoluto de _buffer[0]
+        self._scan_pos = 0  # próxima posición absoluta a examinar
+        self._in_string = False
+        self._in_fence = False
+        self._tick_run = 0
+        self._last_tick = -2
+        # Si hubo strings dentro del objeto de primer nivel abierto, y cuánto
+        # texto se volvió a escanear por comillas sueltas
+        self._quoted = False
+        self._rewound = 0
+        self._exhausted = False
+        # Pila de (inicio, dentro de bloque) por cada llave abierta, y los
+        # objetos hijos ya cerrados de cada nivel (para recuperar objetos
+        # válidos si una llave suelta del texto nunca se cierra)
+        self._stack: List[Tuple[int, bool]] = []
+        self._children: Dict[int, List[_SpanInfo]] = {}
+
+        self._result: Optional[Dict[str, Any]] = None
+        self._fallback: Optional[Dict[str, Any]] = None
+
+    @property
+    def done(self) -> bool:
+        return self._result is not None
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """Procesa un fragmento; retorna el objeto si ya se encontró uno dentro de un bloque ```."""
+        if self._result is not None or not chunk:
+            return self._result
+
+        self._buffer += chunk
+        self._scan()
+        if not self._stack:
+            # Fuera de todo objeto no hace falta conservar el texto ya leído
+            self._base += len(self._buffer)
+            self._buffer = ""
+        return self._result
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        """Cierra la entrada y retorna el mejor objeto encontrado (bloque ``` primero)."""
+        while self._result is None and self._stack:
+            # Llaves sin cerrar: probar los objetos completos que quedaron adentro
+            pending = sorted(span for level in self._children.values() for span in level)
+            for start, end, fenced in pending:
+                self._consider(start, end, fenced)
+                if self._result is not None:
+                    break
+            if self._result is not None or self._fallback is not None or not self._quoted:
+                break
+            # Sin objetos completos y con strings adentro: pudo ser una comilla suelta
+            if not self._can_rewind(self._stack[0][0], self._base + len(self._buffer)):
+                break
+            self._rewind(*self._stack[0])
+            self._scan()
+        if self._result is None and self._fallback is None and self._exhausted:
+            return self._pattern_scan(self._buffer)
+        return self._result if self._result is not None else self._fallback
+
+    def extract(self, text: str) -> Optional[Dict[str, Any]]:
+        self.feed(text)
+        result = self.finish()
+        if result is None and self._exhausted and self._base:
+            # finish() aplicó el respaldo solo a lo que quedaba en el buffer
+            result = self._pattern_scan(text)
+        return result
+
+    def _scan(self) -> None:
+        rewound = True
+        while rewound:
+            rewound = self._scan_once()
+
+    def _scan_once(self) -> bool:
+        """Avanza sobre el buffer; retorna True si retrocedió y hay que volver a escanear."""
+        # Estado en variables locales: este bucle corre una vez por carácter relevante
+        buffer = self._buffer
+        base = self._base
+        stack = self._stack
+        children = self._children
+        in_string = self._in_string
+        in_fence = self._in_fence
+        quoted = self._quoted
+        skip_to = self._scan_pos - base
+
+        for match in _RELEVANT.finditer(buffer, max(skip_to, 0)):
+            index = match.start()
+            if index < skip_to:
+                # Carácter escapado dentro de un string
+                continue
+            char = buffer[index]
+
+            if in_string:
+                if char == "\\":
+                    skip_to = index + 2
+                elif char == '"':
+                    in_string = False
+                continue
+
+            if char == "{":
+                if not stack:
+                    quoted = False
+                stack.append((base + index, in_fence))
+            elif not stack:
+                if char == "`":
+                    absolute = base + index
+                    self._tick_run = self._tick_run + 1 if absolute == self._last_tick + 1 else 1
+                    self._last_tick = absolute
+                    if self._tick_run == 3:
+                        in_fence = not in_fence
+                        self._tick_run = 0
+            elif char == '"':
+                in_string = True
+                quoted = True
+            elif char == "}":
+                start, fenced = stack.pop()
+                level = len(stack)
+                inner = children.pop(level, None)
+                end = base + index + 1
+                if level:
+                    children.setdefault(level - 1, []).append((start, end, fenced))
+                else:
+                    malformed = self._consider(start, end, fenced)
+                    if self._result is None and inner:
+                        # Un objeto que no sirve (o no parsea) puede envolver al remito
+                        for span in inner:
+                            self._consider(*span)
+                            if self._result is not None:
+                                break
+                    if self._result is not None:
+                        break
+                    if malformed and quoted and self._can_rewind(start, end):
+                        self._rewind(start, fenced)
+                        return True
+
+        self._in_string = in_string
+        self._in_fence = in_fence
+        self._quoted = quoted
+        self._scan_pos = base + max(skip_to, len(buffer))
+        return False
+
+    def _can_rewind(self, start: int, end: int) -> bool:
+        budget = max(self.REWIND_FACTOR * (self._base + len(self._buffer)), self.REWIND_MIN_BUDGET)
+        if self._rewound + (end - start) > budget:
+            self._exhausted = True
+            return False
+        self._rewound += end - start
+        return True
+
+    def _rewind(self, start: int, fenced: bool) -> None:
+        # Una comilla suelta en la prosa (ej. {campo: "valor}) deja al escáner
+        # dentro de un string falso que se traga el JSON real: el candidato no
+        # parsea y se reescanea desde la llave siguiente a la que lo abrió
+        self._stack.clear()
+        self._children.clear()
+        self._in_string = False
+        self._in_fence = fenced
+        self._quoted = False
+        self._tick_run = 0
+        self._last_tick = -2
+        self._scan_pos = start + 1
+
+    def _pattern_scan(self, text: str) -> Optional[Dict[str, Any]]:
+        for match in _FLAT_OBJECT.finditer(text):
+            candidate = match.group()
+            if any(marker not in candidate for marker in self._key_markers):
+                continue
+            try:
+                data = json.loads(candidate)
+            except ValueError:
+                continue
+            if not isinstance(data, dict) or any(key not in data for key in self.required_keys):
+                continue
+            if self.accept is None or self.accept(data):
+                return data
+        return None
+
+    def _consider(self, start: int, end: int, fenced: bool) -> bool:
+        """Evalúa el candidato [start, end); retorna True si no es JSON válido."""
+        if not fenced and self._fallback is not None:
+            return False
+
+        begin = start - self._base
+        finish = end - self._base
+        for marker in self._key_markers:
+            if self._buffer.find(marker, begin, finish) < 0:
+                return False
+        try:
+            data = json.loads(self._buffer[begin:finish])
+        except ValueError:
+            return True
+        if not isinstance(data, dict) or any(key not in data for key in self.required_keys):
+            return False
+        if self.accept is not None and not self.accept(data):
+            return False
+
+        if fenced:
+            self._result = data
+        else:
+            self._fallback = data
+        return False
+
+
+def extract_remito_json(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Busca el JSON del remito en la respuesta del LLM.
+
+    Retorna el objeto sin los campos que no deben venir del LLM, o None si la
+    respuesta no contiene un remito.
+    """
+    data = JsonObjectExtractor(required_keys=REMITO_REQUIRED_KEYS).extract(text)
+    if data is None:
+        return None
+    for field in REMITO_FORBIDDEN_FIELDS:
+        data.pop(field, None)
+    return data
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
 import json
+import time
 from typing import Any, Dict, Optional
 
 import httpx
 
+from app.core.llm_tools import LLMReply, ToolCall, ToolSpec
+from app.core.metrics import observe_llm_call
+from app.core.tracing import span
+
 
 class LLMService:
     """Wrapper para interactuar con los proveedores LLM soportados (Anthropic / OpenAI)."""
@@ -19,6 +24,7 @@ class LLMService:
         default_system_prompt: Optional[str] = None,
         timeout_seconds: int = 30,
         max_tokens: int = 6000,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
     ) -> None:
         self.claude_api_key = claude_api_key
         self.openai_api_key = openai_api_key
@@ -27,6 +33,8 @@ class LLMService:
         self.default_system_prompt = default_system_prompt or "Eres un asistente útil."
         self.timeout_seconds = timeout_seconds
         self.max_tokens = max_tokens
+        # Permite apuntar a un proveedor simulado (benchmarks de carga)
+        self.transport = transport
 
     def derive(
         self,
@@ -45,6 +53,7 @@ class LLMService:
             default_system_prompt=system_prompt or self.default_system_prompt,
             timeout_seconds=self.timeout_seconds,
             max_tokens=self.max_tokens,
+            transport=self.transport,
         )
 
     async def run_dialogue(
@@ -56,6 +65,49 @@ class LLMService:
         user_message: Optional[str] = None,
         conversation_history: Optional[list] = None,
     ) -> str:
+        reply = await self._run(
+            prompt,
+            context=context,
+            system_prompt=system_prompt,
+            user_message=user_message,
+            conversation_history=conversation_history,
+        )
+        return reply.text
+
+    async def run_structured(
+        self,
+        *,
+        tool: ToolSpec,
+        system_prompt: Optional[str] = None,
+        user_message: Optional[str] = None,
+        conversation_history: Optional[list] = None,
+    ) -> LLMReply:
+        """
+        Igual que run_dialogue pero ofreciendo una herramienta al modelo.
+
+        Con Anthropic se usa tool use; con OpenAI, response_format json_schema.
+        Si el modelo decide invocarla, la respuesta trae tool_call con los
+        argumentos ya parseados.
+        """
+        return await self._run(
+            None,
+            context=None,
+            system_prompt=system_prompt,
+            user_message=user_message,
+            conversation_history=conversation_history,
+            tool=tool,
+        )
+
+    async def _run(
+        self,
+        prompt: Optional[str],
+        *,
+        context: Dict[str, Any] | None,
+        system_prompt: Optional[str],
+        user_message: Optional[str],
+        conversation_history: Optional[list],
+        tool: Optional[ToolSpec] = None,
+    ) -> LLMReply:
         # Soportar ambos estilos: prompt tradicional o conversación con historial
         if user_message is None and prompt:
             user_message = prompt
@@ -73,6 +125,7 @@ class LLMService:
                 system_prompt=system_prompt, 
                 context=context,
                 conversation_history=conversation_history,
+                tool=tool,
             )
         if self.openai_api_key:
             return await self._invoke_openai(
@@ -80,11 +133,14 @@ class LLMService:
                 system_prompt=system_prompt, 
                 context=context,
                 conversation_history=conversation_history,
+                tool=tool,
             )
 
-        return (
-            "No se encontró ninguna API key configurada para el LLM. Configura CLAUDE_API_KEY o"
-            " OPENAI_API_KEY para habilitar las respuestas inteligentes."
+        return LLMReply(
+            text=(
+                "No se encontró ninguna API key configurada para el LLM. Configura CLAUDE_API_KEY o"
+                " OPENAI_API_KEY para habilitar las respuestas inteligentes."
+            )
         )
 
     async def _invoke_claude(
@@ -94,7 +150,8 @@ class LLMService:
         system_prompt: str,
         context: Dict[str, Any],
         conversation_history: list = None,
-    ) -> str:
+        tool: Optional[ToolSpec] = None,
+    ) -> LLMReply:
         conversation_history = conversation_history or []
         
         # Construir mensajes con historial
@@ -118,6 +175,13 @@ class LLMService:
             "messages": messages,
             "max_tokens": self.max_tokens,
         }
+        if tool is not None and tool.force:
+            payload["tools"] = [tool.to_anthropic()]
+            payload["tool_choice"] = {"type": "tool", "name": tool.name}
+        elif tool is not None:
+            payload["system"] = f"{system_prompt}\n\n{self._tool_instructions(tool)}"
+            payload["tools"] = [tool.to_anthropic()]
+            payload["tool_choice"] = {"type": "auto"}
 
         headers = {
             "x-api-key": self.claude_api_key,
@@ -125,20 +189,44 @@ class LLMService:
             "content-type": "application/json",
         }
 
-        async with httpx.AsyncClient(timeout=self.timeout_seconds) as client:
-            response = await client.post(
-                "https://api.anthropic.com/v1/messages",
-                headers=headers,
-                json=payload,
-            )
-            response.raise_for_status()
-            data = response.json()
+        started = time.perf_counter()
+        with span("llm.anthropic", model=self.anthropic_model, messages=len(messages)) as llm_span:
+            try:
+                async with httpx.AsyncClient(timeout=self.timeout_seconds, transport=self.transport) as client:
+                    response = await client.post(
+                        "https://api.anthropic.com/v1/messages",
+                        headers=headers,
+                        json=payload,
+                    )
+                    response.raise_for_status()
+                    data = response.json()
+            except Exception:
+                observe_llm_call("anthropic", time.perf_counter() - started, outcome="error")
+                raise
+
+            usage = data.get("usage") or {}
+            if llm_span is not None:
+                llm_span.set_attribute("input_tokens", usage.get("input_tokens"))
+                llm_span.set_attribute("output_tokens", usage.get("output_tokens"))
+        observe_llm_call(
+            "anthropic",
+            time.perf_counter() - started,
+            usage=(usage.get("input_tokens", 0), usage.get("output_tokens", 0)),
+        )
 
         contents = data.get("content", [])
         if not contents:
             raise RuntimeError("Respuesta vacía del modelo Claude")
 
-        return contents[0].get("text", "").strip()
+        text = "\n".join(block.get("text", "") for block in contents if block.get("type", "text") == "text").strip()
+        tool_call = None
+        for block in contents:
+            if block.get("type") == "tool_use" and isinstance(block.get("input"), dict):
+                tool_call = ToolCall(name=block.get("name", ""), arguments=block["input"])
+                break
+        if tool_call is not None and not text:
+            text = str(tool_call.arguments.get("mensaje") or "").strip()
+        return LLMReply(text=text, tool_call=tool_call)
 
     async def _invoke_openai(
         self,
@@ -147,10 +235,13 @@ class LLMService:
         system_prompt: str,
         context: Dict[str, Any],
         conversation_history: list = None,
-    ) -> str:
+        tool: Optional[ToolSpec] = None,
+    ) -> LLMReply:
         conversation_history = conversation_history or []
         
         # Construir mensajes con historial
+        if tool is not None and not tool.force:
+            system_prompt = f"{system_prompt}\n\n{self._response_format_instructions(tool)}"
         messages = [{"role": "system", "content": system_prompt}]
         
         for msg in conversation_history:
@@ -171,26 +262,78 @@ class LLMService:
             "messages": messages,
             "max_tokens": self.max_tokens,
         }
+        if tool is not None:
+            payload["response_format"] = tool.to_openai_response_format()
 
         headers = {
             "Authorization": f"Bearer {self.openai_api_key}",
             "Content-Type": "application/json",
         }
 
-        async with httpx.AsyncClient(timeout=self.timeout_seconds) as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=payload,
-            )
-            response.raise_for_status()
-            data = response.json()
+        started = time.perf_counter()
+        with span("llm.openai", model=self.openai_model, messages=len(messages)) as llm_span:
+            try:
+                async with httpx.AsyncClient(timeout=self.timeout_seconds, transport=self.transport) as client:
+                    response = await client.post(
+                        "https://api.openai.com/v1/chat/completions",
+                        headers=headers,
+                        json=payload,
+                    )
+                    response.raise_for_status()
+                    data = response.json()
+            except Exception:
+                observe_llm_call("openai", time.perf_counter() - started, outcome="error")
+                raise
+
+            usage = data.get("usage") or {}
+            if llm_span is not None:
+                llm_span.set_attribute("input_tokens", usage.get("prompt_tokens"))
+                llm_span.set_attribute("output_tokens", usage.get("completion_tokens"))
+        observe_llm_call(
+            "openai",
+            time.perf_counter() - started,
+            usage=(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)),
+        )
 
         choices = data.get("choices", [])
         if not choices:
             raise RuntimeError("Respuesta vacía del modelo OpenAI")
 
-        return choices[0]["message"]["content"].strip()
+        content = (choices[0]["message"].get("content") or "").strip()
+        if tool is None:
+            return LLMReply(text=content)
+        return self._parse_structured_content(content, tool)
+
+    @staticmethod
+    def _parse_structured_content(content: str, tool: ToolSpec) -> LLMReply:
+        """Desarma la respuesta del modo json_schema ({"mensaje", "arguments"} o el schema forzado)."""
+        try:
+            data = json.loads(content)
+        except ValueError:
+            return LLMReply(text=content, malformed=True)
+        if not isinstance(data, dict):
+            return LLMReply(text=content, malformed=True)
+        if tool.force:
+            return LLMReply(text=str(data.get("mensaje") or "").strip(), tool_call=ToolCall(name=tool.name, arguments=data))
+
+        arguments = data.get("arguments")
+        tool_call = ToolCall(name=tool.name, arguments=arguments) if isinstance(arguments, dict) else None
+        return LLMReply(text=str(data.get("mensaje") or "").strip(), tool_call=tool_call)
+
+    @staticmethod
+    def _tool_instructions(tool: ToolSpec) -> str:
+        return (
+            f"MODO HERRAMIENTA: cuando el usuario confirme los datos, en lugar de escribir el JSON "
+            f"llamá a la herramienta {tool.name} con esos campos. No escribas el JSON en el texto."
+        )
+
+    @staticmethod
+    def _response_format_instructions(tool: ToolSpec) -> str:
+        return (
+            "FORMATO DE RESPUESTA: respondé siempre con el objeto estructurado. Poné el texto para el "
+            "usuario en \"mensaje\" y dejá \"arguments\" en null; cuando el usuario confirme los datos, "
+            f"completá \"arguments\" con los campos de {tool.name} en lugar de escribir el JSON en el texto."
+        )
 
     @staticmethod
     def _compose_prompt(prompt: str, context: Dict[str, Any]) -> str:
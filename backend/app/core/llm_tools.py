@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from app.models.remito import RemitoCreate
+
+# Campos del remito que completa el LLM; el resto (IDs, estado, QR) los
+# resuelve el backend a partir de los nombres
+REMITO_LLM_FIELDS = (
+    "nombre_empresa",
+    "nombre_establecimiento",
+    "nombre_chacra",
+    "nombre_conductor",
+    "cedula_conductor",
+    "matricula_camion",
+    "matricula_zorra",
+    "peso_estimado_tn",
+    "nombre_destino",
+)
+
+CREATE_REMITO_TOOL = "create_remito"
+UPDATE_SLOTS_TOOL = "actualizar_remito"
+
+# Reglas del prompt que conviene repetir en el schema: el modelo las lee al
+# completar cada argumento
+_FIELD_DESCRIPTIONS = {
+    "cedula_conductor": "Solo números, sin puntos ni guiones",
+    "matricula_camion": "Formato ABC 1234, AB 123 CD, ABC1D23 o ABCD 123",
+    "matricula_zorra": "Misma regla que la del camión; null si no lleva zorra",
+    "peso_estimado_tn": "Toneladas (número), entre 5 y 40",
+}
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """Herramienta que el LLM puede invocar con argumentos que cumplen input_schema."""
+
+    name: str
+    description: str
+    input_schema: Dict[str, Any]
+    # Obligatoria en cada respuesta: el texto para el usuario viaja en el
+    # argumento "mensaje" en lugar de un bloque de texto aparte
+    force: bool = False
+
+    def to_anthropic(self) -> Dict[str, Any]:
+        return {"name": self.name, "description": self.description, "input_schema": self.input_schema}
+
+    def to_openai_response_format(self) -> Dict[str, Any]:
+        """
+        response_format json_schema de OpenAI.
+
+        Ese modo obliga a que toda respuesta cumpla el schema, así que se
+        envuelve: "mensaje" lleva el texto para el usuario y el argumento de la
+        herramienta va en "arguments", en null mientras no corresponda llamarla.
+        Una herramienta forzada usa su propio schema tal cual.
+        """
+        if self.force:
+            return {
+                "type": "json_schema",
+                "json_schema": {"name": self.name, "strict": True, "schema": self.input_schema},
+            }
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": self.name,
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "mensaje": {"type": "string"},
+                        "arguments": {"anyOf": [self.input_schema, {"type": "null"}]},
+                    },
+                    "required": ["mensaje", "arguments"],
+                    "additionalProperties": False,
+                },
+            },
+        }
+
+
+def remito_input_schema() -> Dict[str, Any]:
+    """
+    Schema de los argumentos de create_remito, derivado de RemitoCreate.
+
+    Todos los campos son obligatorios (requisito del modo strict de OpenAI);
+    los opcionales del modelo aceptan null.
+    """
+    model_properties = RemitoCreate.model_json_schema()["properties"]
+    properties: Dict[str, Any] = {}
+    for name in REMITO_LLM_FIELDS:
+        source = model_properties[name]
+        if "anyOf" in source:
+            prop: Dict[str, Any] = {"type": [option["type"] for option in source["anyOf"]]}
+        else:
+            prop = {"type": source["type"]}
+        description = _FIELD_DESCRIPTIONS.get(name) or source.get("description")
+        if description:
+            prop["description"] = description
+        properties[name] = prop
+
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(REMITO_LLM_FIELDS),
+        "additionalProperties": False,
+    }
+
+
+CREATE_REMITO_SPEC = ToolSpec(
+    name=CREATE_REMITO_TOOL,
+    description=(
+        "Crea el remito de carga. Llamala solo cuando el usuario confirmó todos los datos; "
+        "usá los nombres tal como figuran en el catálogo de la empresa."
+    ),
+    input_schema=remito_input_schema(),
+)
+
+
+def slot_update_schema() -> Dict[str, Any]:
+    """
+    Schema de actualizar_remito: la respuesta al usuario, los campos que
+    aparecen en el último mensaje (null si no se mencionan) y la confirmación.
+    """
+    base = remito_input_schema()["properties"]
+    properties: Dict[str, Any] = {
+        "mensaje": {"type": "string", "description": "Respuesta para enviar al usuario por WhatsApp"},
+    }
+    for name in REMITO_LLM_FIELDS:
+        prop = dict(base[name])
+        types = prop["type"] if isinstance(prop["type"], list) else [prop["type"]]
+        prop["type"] = types if "null" in types else [*types, "null"]
+        properties[name] = prop
+    properties["matricula_zorra"]["description"] = (
+        "null si no se mencionó; \"ninguna\" si el usuario dice que no lleva zorra"
+    )
+    properties["confirmado"] = {
+        "type": "boolean",
+        "description": "true solo si el usuario confirma explícitamente el resumen ya mostrado",
+    }
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+SLOT_UPDATE_SPEC = ToolSpec(
+    name=UPDATE_SLOTS_TOOL,
+    description=(
+        "Registra los datos del remito que aparecen en el último mensaje del usuario y "
+        "la respuesta a enviarle. Se llama en todas las respuestas."
+    ),
+    input_schema=slot_update_schema(),
+    force=True,
+)
+
+
+@dataclass
+class ToolCall:
+    name: str
+    arguments: Dict[str, Any]
+
+
+@dataclass
+class LLMReply:
+    """
+    Respuesta del LLM en modo estructurado.
+
+    malformed indica que el proveedor devolvió una salida que no respetaba el
+    formato pedido (por ejemplo, JSON inválido en el modo json_schema).
+    """
+
+    text: str
+    tool_call: Optional[ToolCall] = None
+    malformed: bool = False
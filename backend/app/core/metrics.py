@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.exposition import CONTENT_TYPE_LATEST
+
+from app.core.tracing import span
+
+# Registro propio (no el global de prometheus_client) para exponer solo las
+# métricas del bot y poder recrearlo en benchmarks sin colisiones de nombres
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+# Buckets pensados para el rango real del pipeline: desde lecturas de caché
+# (milisegundos) hasta llamadas al LLM de varios segundos
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Etapas de un turno de mensaje
+STAGE_PHONE_RESOLUTION = "phone_resolution"
+STAGE_CONTEXT_LOAD = "context_load"
+STAGE_PROMPT_BUILD = "prompt_build"
+STAGE_LLM = "llm"
+STAGE_JSON_EXTRACTION = "json_extraction"
+STAGE_VALIDATION = "validation"
+STAGE_CATALOG_RESOLUTION = "catalog_resolution"
+STAGE_QR_RENDER = "qr_render"
+STAGE_QR_UPLOAD = "qr_upload"
+STAGE_REMITO_INSERT = "remito_insert"
+STAGE_REMITO_CREATE = "remito_create"
+STAGE_WHATSAPP_SEND = "whatsapp_send"
+STAGE_WHATSAPP_UPLOAD = "whatsapp_upload"
+
+WEBHOOK_DURATION = Histogram(
+    "remibot_webhook_duration_seconds",
+    "Tiempo desde que llega el webhook hasta que se responde el 200 a Meta",
+    ["status"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+WEBHOOK_MESSAGES = Counter(
+    "remibot_webhook_messages_total",
+    "Mensajes recibidos por webhook, según cómo se trataron",
+    ["result"],
+    registry=REGISTRY,
+)
+STAGE_DURATION = Histogram(
+    "remibot_stage_duration_seconds",
+    "Duración de cada etapa del pipeline de mensajes",
+    ["stage", "outcome"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+LLM_DURATION = Histogram(
+    "remibot_llm_request_duration_seconds",
+    "Latencia de las llamadas al LLM por proveedor",
+    ["provider", "outcome"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+LLM_TOKENS = Counter(
+    "remibot_llm_tokens_total",
+    "Tokens consumidos por proveedor (input / output)",
+    ["provider", "kind"],
+    registry=REGISTRY,
+)
+JSON_EXTRACTION = Counter(
+    "remibot_json_extraction_total",
+    "Respuestas del LLM según si contenían un JSON de remito",
+    ["outcome"],
+    registry=REGISTRY,
+)
+REMITO_VALIDATION = Counter(
+    "remibot_remito_validation_total",
+    "Resultado de validar el JSON de remito extraído",
+    ["outcome"],
+    registry=REGISTRY,
+)
+LLM_REPLY_FORMAT = Counter(
+    "remibot_llm_reply_format_total",
+    "Respuestas del LLM por modo (text / tools / slots / unregistered) y forma: tool_call, text_json, text o invalid_json",
+    ["mode", "kind"],
+    registry=REGISTRY,
+)
+TURNS_PER_REMITO = Histogram(
+    "remibot_turns_per_remito",
+    "Mensajes del usuario hasta obtener un remito válido, por modo de salida del LLM",
+    ["mode"],
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 20),
+    registry=REGISTRY,
+)
+CATALOG_NAME_RESOLUTION = Counter(
+    "remibot_catalog_name_resolution_total",
+    "Nombres del LLM contra el catálogo antes de insertar (exact: se usa la fila; similar: hay uno parecido que no se usa; none)",
+    ["table", "outcome"],
+    registry=REGISTRY,
+)
+DRIVER_PROFILE_LOOKUPS = Counter(
+    "remibot_driver_profile_lookups_total",
+    "Búsquedas de perfil de conductor por teléfono (hit, hit_empty, loaded, empty)",
+    ["result"],
+    registry=REGISTRY,
+)
+RESPONSE_CACHE_LOOKUPS = Counter(
+    "remibot_response_cache_lookups_total",
+    "Lecturas del cache de respuestas de la API (hit, miss)",
+    ["result"],
+    registry=REGISTRY,
+)
+HTTP_NOT_MODIFIED = Counter(
+    "remibot_http_not_modified_total",
+    "Respuestas 304 por ETag o Last-Modified, por endpoint",
+    ["endpoint"],
+    registry=REGISTRY,
+)
+REMITO_EVENT_STREAMS = Gauge(
+    "remibot_remito_event_streams",
+    "Clientes conectados a GET /remitos/events",
+    registry=REGISTRY,
+)
+REMITO_EVENTS = Counter(
+    "remibot_remito_events_total",
+    "Eventos de remitos (published, delivered, resync: cliente lento que debe recargar)",
+    ["outcome"],
+    registry=REGISTRY,
+)
+WHATSAPP_REQUESTS = Counter(
+    "remibot_whatsapp_requests_total",
+    "Llamadas a la Graph API de WhatsApp por tipo",
+    ["kind", "outcome"],
+    registry=REGISTRY,
+)
+ADMISSION_LIMIT = Gauge(
+    "remibot_admission_limit",
+    "Turnos simultáneos que admite el webhook (límite AIMD actual)",
+    registry=REGISTRY,
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "remibot_admission_in_flight",
+    "Turnos del webhook en curso",
+    registry=REGISTRY,
+)
+WEBHOOK_SHED = Counter(
+    "remibot_webhook_shed_total",
+    "Mensajes que no pasaron por el LLM, por motivo y aviso al chofer (sent, suppressed, failed, unavailable)",
+    ["reason", "reply"],
+    registry=REGISTRY,
+)
+RATE_LIMIT_DECISIONS = Counter(
+    "remibot_rate_limit_decisions_total",
+    "Mensajes entrantes según el límite por teléfono y empresa (allowed, telefono, empresa: límite superado)",
+    ["result"],
+    registry=REGISTRY,
+)
+HEALTH_CHECKS = Counter(
+    "remibot_health_checks_total",
+    "Verificaciones del prober de fondo por dependencia (ok, error)",
+    ["check", "outcome"],
+    registry=REGISTRY,
+)
+HEALTH_CHECK_UP = Gauge(
+    "remibot_health_check_up",
+    "Resultado de la última verificación de cada dependencia (1 ok, 0 error)",
+    ["check"],
+    registry=REGISTRY,
+)
+
+
+@contextmanager
+def observe_stage(stage: str) -> Iterator[None]:
+    """
+    Mide una etapa del pipeline; outcome es "error" si el bloque lanza excepción.
+
+    Además abre un span con el nombre de la etapa si hay una traza activa.
+    """
+    started = time.perf_counter()
+    outcome = "ok"
+    with span(stage):
+        try:
+            yield
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            STAGE_DURATION.labels(stage=stage, outcome=outcome).observe(time.perf_counter() - started)
+
+
+def observe_llm_call(
+    provider: str,
+    elapsed_seconds: float,
+    *,
+    outcome: str = "ok",
+    usage: Optional[Tuple[int, int]] = None,
+) -> None:
+    """Registra latencia y, si el proveedor los informa, tokens de entrada y salida."""
+    LLM_DURATION.labels(provider=provider, outcome=outcome).observe(elapsed_seconds)
+    if usage:
+        input_tokens, output_tokens = usage
+        LLM_TOKENS.labels(provider=provider, kind="input").inc(input_tokens or 0)
+        LLM_TOKENS.labels(provider=provider, kind="output").inc(output_tokens or 0)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Serializa el registro en formato de texto de Prometheus."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import re
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from app.core.metrics import CATALOG_NAME_RESOLUTION
+
+if TYPE_CHECKING:
+    from app.core.data_access import DataAccess
+    from app.core.empresa_context_service import EmpresaContextService
+
+# Palabras que no distinguen un lugar de otro: se ignoran al comparar para
+# que "La Esperanza", "Estancia La Esperanza" y "Esperanza" den la misma clave
+_GENERIC_WORDS = frozenset(
+    {"el", "la", "los", "las", "de", "del", "y", "estancia", "establecimiento", "est", "campo", "chacra"}
+)
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def fold_name(value: str) -> str:
+    """Minúsculas, sin acentos ni signos y con espacios simples."""
+    decomposed = unicodedata.normalize("NFKD", value)
+    without_marks = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", without_marks.casefold()).strip()
+
+
+def name_key(value: str) -> str:
+    """Clave de comparación: el nombre plegado sin las palabras genéricas."""
+    words = fold_name(value).split()
+    significant = [word for word in words if word not in _GENERIC_WORDS]
+    return " ".join(significant or words)
+
+
+def trigrams(key: str) -> FrozenSet[str]:
+    """Trigramas como pg_trgm: cada palabra con dos espacios delante y uno detrás."""
+    grams = set()
+    for word in key.split():
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+@dataclass(frozen=True)
+class NameMatch:
+    row: Dict[str, Any]
+    nombre: str
+    score: float
+    exact: bool
+
+
+class _Entry:
+    __slots__ = ("position", "row", "nombre", "key", "grams", "numbers")
+
+    def __init__(self, position: int, row: Dict[str, Any], nombre: str) -> None:
+        self.position = position
+        self.row = row
+        self.nombre = nombre
+        self.key = name_key(nombre)
+        self.grams = trigrams(self.key)
+        self.numbers = _numbers(self.key)
+
+
+def _numbers(key: str) -> Tuple[str, ...]:
+    return tuple(word for word in key.split() if word.isdigit())
+
+
+class NameIndex:
+    """
+    Índice en memoria de los nombres de una tabla de catálogo.
+
+    exact() busca por clave plegada; similar() busca aparte por similitud de
+    trigramas sobre los candidatos que comparten algún trigrama, sin
+    devolver nunca la coincidencia exacta. Nunca une nombres con números
+    distintos ("Lote 1" y "Lote 12" son chacras distintas) y no adivina: si
+    dos candidatos quedan a menos de ambiguity_margin, no hay resultado.
+    """
+
+    def __init__(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        name_field: str,
+        *,
+        threshold: float = 0.5,
+        ambiguity_margin: float = 0.05,
+    ) -> None:
+        self.name_field = name_field
+        self.threshold = threshold
+        self.ambiguity_margin = ambiguity_margin
+        self._entries: List[_Entry] = []
+        self._by_key: Dict[str, _Entry] = {}
+        self._by_gram: Dict[str, List[int]] = {}
+        for row in rows:
+            self.add(row)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, row: Dict[str, Any]) -> None:
+        nombre = row.get(self.name_field)
+        if not nombre:
+            return
+        entry = _Entry(len(self._entries), row, nombre)
+        self._entries.append(entry)
+        # Ante claves repetidas gana la fila cargada primero
+        self._by_key.setdefault(entry.key, entry)
+        for gram in entry.grams:
+            self._by_gram.setdefault(gram, []).append(entry.position)
+
+    def exact(self, nombre: str) -> Optional[NameMatch]:
+        """Fila con la misma clave de name_key, si existe."""
+        entry = self._by_key.get(name_key(nombre))
+        if entry is None:
+            return None
+        return NameMatch(entry.row, entry.nombre, 1.0, True)
+
+    def similar(self, nombre: str) -> Optional[NameMatch]:
+        """Fila más parecida con otra clave, sobre threshold y sin empate."""
+        key = name_key(nombre)
+        if not key:
+            return None
+        ranked = self._candidates(key, trigrams(key), _numbers(key))
+        if not ranked or ranked[0][0] < self.threshold:
+            return None
+        if len(ranked) > 1 and ranked[0][0] - ranked[1][0] < self.ambiguity_margin:
+            return None
+        score, entry = ranked[0]
+        return NameMatch(entry.row, entry.nombre, round(score, 3), False)
+
+    def duplicate_groups(self, threshold: Optional[float] = None) -> List[List[Tuple[Dict[str, Any], float]]]:
+        """
+        Grupos de filas que el índice consideraría el mismo nombre.
+
+        Cada grupo es una lista de (fila, similitud con la primera fila del
+        grupo), empezando por la fila cargada primero.
+        """
+        limit = self.threshold if threshold is None else threshold
+        parent = list(range(len(self._entries)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(a: int, b: int) -> None:
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        for entry in self._entries:
+            union(entry.position, self._by_key[entry.key].position)
+            for score, other in self._candidates(entry.key, entry.grams, entry.numbers):
+                if score < limit:
+                    break
+                union(entry.position, other.position)
+
+        groups: Dict[int, List[_Entry]] = {}
+        for entry in self._entries:
+            groups.setdefault(find(entry.position), []).append(entry)
+
+        report = []
+        for members in groups.values():
+            if len(members) < 2:
+                continue
+            head = members[0]
+            report.append(
+                [(head.row, 1.0)]
+                + [(member.row, round(similarity(head.grams, member.grams), 3)) for member in members[1:]]
+            )
+        return report
+
+    def _candidates(
+        self, key: str, grams: FrozenSet[str], numbers: Tuple[str, ...]
+    ) -> List[Tuple[float, _Entry]]:
+        """Entradas que comparten trigramas y números, ordenadas por similitud."""
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for position in self._by_gram.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+
+        ranked: List[Tuple[float, _Entry]] = []
+        seen_keys = {key}
+        for position, count in shared.items():
+            # Las filas con la misma clave se representan por la canónica
+            entry = self._by_key[self._entries[position].key]
+            if entry.key in seen_keys or entry.numbers != numbers:
+                continue
+            seen_keys.add(entry.key)
+            score = count / (len(grams) + len(entry.grams) - count)
+            ranked.append((score, entry))
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        return ranked
+
+
+class CatalogNameResolver:
+    """
+    Resolución de nombres del LLM a filas existentes del catálogo, por empresa.
+
+    Solo se resuelve por clave exacta (name_key: sin acentos, mayúsculas ni
+    palabras genéricas). Un nombre apenas parecido ("Santa Rita" y "Santa
+    Rosa", "San Pedrito" y "San Pedro") suele ser otro lugar: no se
+    reemplaza por el existente, se cuenta como "similar" y, una vez creado,
+    aparece en el reporte de duplicados para que lo revise una persona.
+
+    Los índices de establecimientos y chacras se arman con el contexto de
+    EmpresaContextService y se reconstruyen cuando ese contexto se recarga
+    (por ejemplo, tras la invalidación que publica CatalogService al crear
+    una entidad). Los destinos no dependen de la empresa: se cargan aparte y
+    se refrescan cada destinos_ttl_seconds.
+    """
+
+    def __init__(
+        self,
+        empresa_context_service: EmpresaContextService,
+        data_access: DataAccess,
+        *,
+        threshold: float = 0.5,
+        destinos_ttl_seconds: float = 300,
+    ) -> None:
+        self.empresa_context_service = empresa_context_service
+        self.db = data_access
+        self.threshold = threshold
+        self.destinos_ttl_seconds = destinos_ttl_seconds
+        # empresa -> (contexto con el que se armó, establecimientos, chacras por establecimiento)
+        self._empresas: Dict[str, Tuple[Dict[str, Any], NameIndex, Dict[str, NameIndex]]] = {}
+        self._destinos: Optional[NameIndex] = None
+        self._destinos_loaded_at = 0.0
+
+    async def establecimiento(self, empresa_id: str, nombre: str) -> Optional[NameMatch]:
+        establecimientos, _ = await self._empresa_indexes(empresa_id)
+        return self._resolve("establecimientos", establecimientos, nombre)
+
+    async def chacra(self, empresa_id: str, establecimiento_id: str, nombre: str) -> Optional[NameMatch]:
+        _, chacras = await self._empresa_indexes(empresa_id)
+        return self._resolve("chacras", chacras.get(establecimiento_id), nombre)
+
+    async def destino(self, nombre: str) -> Optional[NameMatch]:
+        index = await self._destinos_index()
+        return self._resolve("destinos", index, nombre)
+
+    def note_destino(self, row: Dict[str, Any]) -> None:
+        """Agrega un destino recién creado sin esperar al próximo refresco."""
+        if self._destinos is not None:
+            self._destinos.add(row)
+
+    async def duplicates(self, empresa_id: str, threshold: Optional[float] = None) -> Dict[str, List[Any]]:
+        """Grupos de posibles duplicados de la empresa (y de los destinos, que son globales)."""
+        establecimientos, chacras = await self._empresa_indexes(empresa_id)
+        return {
+            "establecimientos": establecimientos.duplicate_groups(threshold),
+            "chacras": [group for index in chacras.values() for group in index.duplicate_groups(threshold)],
+            "destinos": (await self._destinos_index()).duplicate_groups(threshold),
+        }
+
+    def clear(self) -> None:
+        self._empresas.clear()
+        self._destinos = None
+
+    async def _empresa_indexes(self, empresa_id: str) -> Tuple[NameIndex, Dict[str, NameIndex]]:
+        context = await self.empresa_context_service.load_context(empresa_id)
+        cached = self._empresas.get(empresa_id)
+        if cached is not None and cached[0] is context:
+            return cached[1], cached[2]
+
+        establecimientos = NameIndex(context["establecimientos"], "nombre", threshold=self.threshold)
+        rows_by_establecimiento: Dict[str, List[Dict[str, Any]]] = {}
+        for chacra in context["chacras"]:
+            rows_by_establecimiento.setdefault(chacra["id_establecimiento"], []).append(chacra)
+        chacras = {
+            establecimiento_id: NameIndex(rows, "nombre_chacra", threshold=self.threshold)
+            for establecimiento_id, rows in rows_by_establecimiento.items()
+        }
+        if context.get("empresa"):
+            self._empresas[empresa_id] = (context, establecimientos, chacras)
+        return establecimientos, chacras
+
+    async def _destinos_index(self) -> NameIndex:
+        now = time.monotonic()
+        if self._destinos is None or now - self._destinos_loaded_at > self.destinos_ttl_seconds:
+            response = await self.db.execute(lambda c: c.table("destinos").select("*").order("nombre"))
+            self._destinos = NameIndex(response.data or [], "nombre", threshold=self.threshold)
+            self._destinos_loaded_at = now
+        return self._destinos
+
+    @staticmethod
+    def _resolve(table: str, index: Optional[NameIndex], nombre: str) -> Optional[NameMatch]:
+        match = index.exact(nombre) if index is not None else None
+        if match is not None:
+            outcome = "exact"
+        elif index is not None and index.similar(nombre) is not None:
+            # Solo para la métrica: el parecido nunca reemplaza al nombre
+            outcome = "similar"
+        else:
+            outcome = "none"
+        CATALOG_NAME_RESOLUTION.labels(table=table, outcome=outcome).inc()
+        return match
@@ -1,6 +1,7 @@
 """Módulo para gestionar prompts del sistema."""
 
 import os
+from functools import lru_cache
 from typing import Optional
 
 
@@ -19,6 +20,17 @@ def load_system_prompt(prompt_name: str) -> Optional[str]:
         return None
 
 
+@lru_cache(maxsize=None)
+def load_reply_template(reply_name: str) -> str:
+    """
+    Respuesta fija al chofer (replies/<nombre>.md) que se manda sin pasar por
+    el LLM. Se lee una vez por proceso: se usa justo cuando hay sobrecarga.
+    """
+    reply_path = os.path.join(os.path.dirname(__file__), "replies", f"{reply_name}.md")
+    with open(reply_path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+
 def load_catalog_template() -> str:
     """Carga la plantilla para mostrar catálogos."""
     return """
@@ -1,24 +1,32 @@
 from __future__ import annotations
 
 import asyncio
+from collections import OrderedDict
 from datetime import datetime
 from io import BytesIO
-from typing import Any, Dict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 import traceback
 
-import qrcode
-from PIL import Image, ImageDraw, ImageFont
-from qrcode.image.pil import PilImage
-from supabase import Client
+from app.core.executors import CPU_RENDER, STORAGE_IO, get_executors, run_blocking
+from app.core.metrics import STAGE_QR_RENDER, STAGE_QR_UPLOAD, observe_stage
+
+if TYPE_CHECKING:
+    from qrcode.image.pil import PilImage
+    from supabase import Client
 
 
 class QRCodeService:
     """Genera códigos QR y los almacena en Supabase Storage."""
 
+    # Cantidad de imágenes recientes que se mantienen en memoria para enviarlas
+    # por WhatsApp sin volver a descargarlas del bucket
+    RENDERED_CACHE_SIZE = 64
+
     def __init__(self, supabase_client: Client, bucket_name: str = "remibot-qrs") -> None:
         self.supabase = supabase_client
         self.bucket_name = bucket_name
         self._bucket_checked = False
+        self._rendered: "OrderedDict[str, bytes]" = OrderedDict()
 
     async def generate(self, payload: Dict[str, Any], include_text: bool = True) -> str:
         try:
@@ -27,11 +35,14 @@ class QRCodeService:
 
             # Pasar metadata para agregar texto a la imagen
             metadata = payload if include_text else None
-            image_bytes = await asyncio.to_thread(self._build_qr_bytes, qr_text, metadata)
-            await asyncio.to_thread(self._ensure_bucket)
-            
-            # Subir imagen a Supabase Storage
-            await asyncio.to_thread(self._upload_image, storage_key, image_bytes)
+            with observe_stage(STAGE_QR_RENDER):
+                image_bytes = await run_blocking(CPU_RENDER, self._build_qr_bytes, qr_text, metadata)
+            self._remember_rendered(payload.get("id_remito"), image_bytes)
+
+            with observe_stage(STAGE_QR_UPLOAD):
+                await run_blocking(STORAGE_IO, self._ensure_bucket)
+                # Subir imagen a Supabase Storage
+                await run_blocking(STORAGE_IO, self._upload_image, storage_key, image_bytes)
             
             public_url = self.supabase.storage.from_(self.bucket_name).get_public_url(storage_key)
             return public_url
@@ -46,8 +57,67 @@ class QRCodeService:
                 )
             raise Exception(error_msg) from e
 
+    async def generate_many(
+        self,
+        payloads: List[Dict[str, Any]],
+        include_text: bool = True,
+        upload_concurrency: int = 8,
+    ) -> List[Union[str, BaseException]]:
+        """
+        Genera varios QR a la vez (carga masiva de remitos).
+
+        Los renders se reparten en el pool CPU_RENDER y las subidas corren en
+        paralelo hasta upload_concurrency. Se encolan pocos renders a la vez
+        para que el QR de un remito del chat no espere detrás de todo el lote.
+        Retorna, en el orden recibido, la URL pública de cada QR o la
+        excepción que impidió generarlo.
+        """
+        await run_blocking(STORAGE_IO, self._ensure_bucket)
+        renders = asyncio.Semaphore(get_executors().get(CPU_RENDER).max_workers)
+        uploads = asyncio.Semaphore(upload_concurrency)
+
+        async def _one(payload: Dict[str, Any]) -> str:
+            storage_key = self._compose_storage_key(payload)
+            metadata = payload if include_text else None
+            async with renders:
+                with observe_stage(STAGE_QR_RENDER):
+                    image_bytes = await run_blocking(
+                        CPU_RENDER, self._build_qr_bytes, self._compose_text(payload), metadata
+                    )
+            self._remember_rendered(payload.get("id_remito"), image_bytes)
+            async with uploads:
+                with observe_stage(STAGE_QR_UPLOAD):
+                    await run_blocking(STORAGE_IO, self._upload_image, storage_key, image_bytes)
+            return self.supabase.storage.from_(self.bucket_name).get_public_url(storage_key)
+
+        return await asyncio.gather(*(_one(payload) for payload in payloads), return_exceptions=True)
+
+    def get_rendered_image(self, remito_id: str) -> Optional[bytes]:
+        """Retorna el PNG generado recientemente para un remito, si sigue en memoria."""
+        return self._rendered.get(remito_id)
+
+    def _remember_rendered(self, remito_id: Optional[str], image_bytes: bytes) -> None:
+        if not remito_id:
+            return
+        self._rendered[remito_id] = image_bytes
+        self._rendered.move_to_end(remito_id)
+        while len(self._rendered) > self.RENDERED_CACHE_SIZE:
+            self._rendered.popitem(last=False)
+
+    @staticmethod
+    def preload_imaging() -> None:
+        """
+        Importa qrcode y Pillow. Se cargan con el primer QR y no al importar el
+        módulo, así el arranque no los paga; el warm-up los adelanta.
+        """
+        import qrcode  # noqa: F401
+        from PIL import Image, ImageDraw, ImageFont  # noqa: F401
+
     def _build_qr_bytes(self, text: str, metadata: Dict[str, Any] = None) -> bytes:
         """Genera QR con texto informativo debajo."""
+        import qrcode
+        from PIL import Image, ImageDraw, ImageFont
+
         # Generar QR code
         qr = qrcode.QRCode(
             version=1,
@@ -146,7 +216,13 @@ class QRCodeService:
             
             if not bucket_exists:
                 # Create bucket if it doesn't exist
-                self.supabase.storage.create_bucket(self.bucket_name)
+                try:
+                    self.supabase.storage.create_bucket(self.bucket_name)
+                except Exception:
+                    # Otra réplica pudo haberlo creado en paralelo
+                    buckets = self.supabase.storage.list_buckets()
+                    if not any(bucket.name == self.bucket_name for bucket in buckets):
+                        raise
                 # Make bucket public
                 self.supabase.storage.update_bucket(self.bucket_name, {"public": True})
                 
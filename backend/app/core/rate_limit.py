@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence, Tuple
+
+from app.core.metrics import RATE_LIMIT_DECISIONS
+
+if TYPE_CHECKING:
+    from app.core.empresa_context_service import EmpresaContextService
+    from app.core.shared_state import SharedState
+
+SCOPE_PHONE = "telefono"
+SCOPE_EMPRESA = "empresa"
+
+
+class SlidingWindowCounter:
+    """
+    Ventana deslizante aproximada por clave: el contador de la ventana fija
+    actual más el de la anterior, ponderado por la parte de ella que sigue
+    dentro de los últimos window_seconds. Memoria constante por clave (no
+    guarda cada mensaje) y acotada a max_keys, descartando las menos usadas.
+    La misma cuenta hace rate_limit_hit en Postgres (migración 0011).
+    """
+
+    def __init__(self, max_keys: int = 50_000) -> None:
+        self.max_keys = max_keys
+        # clave -> (window_seconds, índice de ventana, cuenta anterior, cuenta actual)
+        self._windows: "OrderedDict[str, Tuple[float, int, int, int]]" = OrderedDict()
+
+    def hit(self, key: str, limit: int, window_seconds: float) -> bool:
+        """Cuenta un evento y retorna True si entra en el límite; el rechazado no cuenta."""
+        position = time.time() / window_seconds
+        index = int(position)
+        previous = current = 0
+        stored = self._windows.get(key)
+        if stored is not None and stored[0] == window_seconds:
+            if stored[1] == index:
+                previous, current = stored[2], stored[3]
+            elif stored[1] == index - 1:
+                previous = stored[3]
+
+        allowed = previous * (1 - (position - index)) + current + 1 <= limit
+        if allowed:
+            current += 1
+        self._windows[key] = (window_seconds, index, previous, current)
+        self._windows.move_to_end(key)
+        while len(self._windows) > self.max_keys:
+            self._windows.popitem(last=False)
+        return allowed
+
+
+class RateLimits:
+    __slots__ = ("per_phone", "per_empresa", "window_seconds")
+
+    def __init__(self, per_phone: int, per_empresa: int, window_seconds: int) -> None:
+        self.per_phone = per_phone
+        self.per_empresa = per_empresa
+        self.window_seconds = window_seconds
+
+    @classmethod
+    def for_empresa(cls, empresa: Optional[Dict[str, Any]], defaults: "RateLimits") -> "RateLimits":
+        """Límites de la fila de empresas (migración 0011); NULL usa el default."""
+        empresa = empresa or {}
+
+        def _value(column: str, default: int) -> int:
+            value = empresa.get(column)
+            return default if value is None else int(value)
+
+        return cls(
+            per_phone=_value("limite_mensajes_telefono", defaults.per_phone),
+            per_empresa=_value("limite_mensajes_empresa", defaults.per_empresa),
+            window_seconds=_value("limite_ventana_segundos", defaults.window_seconds) or defaults.window_seconds,
+        )
+
+
+class InboundRateLimiter:
+    """
+    Límite de mensajes entrantes por teléfono y por empresa, antes de que
+    lleguen al LLM.
+
+    Cada empresa puede tener sus propios límites (columnas limite_* de
+    empresas); se leen del contexto que EmpresaContextService ya tiene en
+    cache para armar el prompt, así que en régimen no agregan consultas. Un
+    teléfono sin empresa (no registrado) usa los límites por defecto. Los
+    contadores van en el SharedState recibido: en memoria del proceso o, con
+    RATE_LIMIT_SHARED en modo cluster, en Postgres para todas las réplicas.
+    """
+
+    def __init__(
+        self,
+        store: SharedState,
+        defaults: RateLimits,
+        empresa_context_service: Optional[EmpresaContextService] = None,
+    ) -> None:
+        self.store = store
+        self.defaults = defaults
+        self.empresa_context_service = empresa_context_service
+
+    async def check(self, phone: str, empresa_ids: Sequence[str]) -> Optional[str]:
+        """Cuenta el mensaje; retorna None si puede seguir o el alcance del límite superado."""
+        limits = [(empresa_id, await self._limits_for(empresa_id)) for empresa_id in empresa_ids]
+
+        # Un teléfono de varias empresas queda con el límite más estricto que le aplique
+        phone_limits = [item for _, item in limits if item.per_phone > 0] if limits else [self.defaults]
+        if phone_limits:
+            strictest = min(phone_limits, key=lambda item: item.per_phone / item.window_seconds)
+            if not await self.store.rate_limit_hit(f"rl:tel:{phone}", strictest.per_phone, strictest.window_seconds):
+                RATE_LIMIT_DECISIONS.labels(result=SCOPE_PHONE).inc()
+                return SCOPE_PHONE
+
+        for empresa_id, item in limits:
+            if item.per_empresa <= 0:
+                continue
+            if not await self.store.rate_limit_hit(f"rl:empresa:{empresa_id}", item.per_empresa, item.window_seconds):
+                RATE_LIMIT_DECISIONS.labels(result=SCOPE_EMPRESA).inc()
+                return SCOPE_EMPRESA
+
+        RATE_LIMIT_DECISIONS.labels(result="allowed").inc()
+        return None
+
+    async def _limits_for(self, empresa_id: str) -> RateLimits:
+        if self.empresa_context_service is None:
+            return self.defaults
+        try:
+            context = await self.empresa_context_service.load_context(empresa_id)
+        except Exception:
+            # Sin contexto no se frena al chofer por eso: valen los límites por defecto
+            return self.defaults
+        return RateLimits.for_empresa(context.get("empresa"), self.defaults)
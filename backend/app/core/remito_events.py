@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+from app.core.metrics import REMITO_EVENT_STREAMS, REMITO_EVENTS
+
+logger = logging.getLogger("remibot.remito_events")
+
+EVENT_CREATED = "creado"
+EVENT_UPDATED = "actualizado"
+
+
+class RemitoEvent:
+    __slots__ = ("id", "tipo", "remito")
+
+    def __init__(self, event_id: str, tipo: str, remito: Dict[str, Any]) -> None:
+        self.id = event_id
+        self.tipo = tipo
+        self.remito = remito
+
+    def to_sse(self) -> str:
+        data = json.dumps({"tipo": self.tipo, "remito": self.remito}, ensure_ascii=False, default=str)
+        return f"id: {self.id}\nevent: remito\ndata: {data}\n\n"
+
+
+# Aviso de recarga: el cliente se atrasó o no se pudo recuperar lo que perdió
+RESYNC = RemitoEvent("", "resync", {})
+
+
+class TooManySubscribers(Exception):
+    """Se alcanzó el máximo de clientes conectados al stream."""
+
+
+class RemitoSubscription:
+    """
+    Cola de eventos de un cliente, con sus filtros.
+
+    La cola es acotada: si el cliente no lee al ritmo de las publicaciones se
+    vacía y se marca `lagged`, y el stream le pide recargar la lista completa
+    (evento resync) en vez de frenar a quien publica o crecer sin límite.
+    """
+
+    def __init__(
+        self,
+        bus: "RemitoEventBus",
+        *,
+        empresa: Optional[str],
+        destino: Optional[str],
+        queue_size: int,
+    ) -> None:
+        self._bus = bus
+        self.empresa = empresa
+        self.destino = destino
+        self.queue: "asyncio.Queue[RemitoEvent]" = asyncio.Queue(maxsize=queue_size)
+        self.lagged = False
+
+    def matches(self, event: RemitoEvent) -> bool:
+        if self.empresa and str(event.remito.get("id_empresa")) != self.empresa:
+            return False
+        if self.destino and str(event.remito.get("id_destino")) != self.destino:
+            return False
+        return True
+
+    def offer(self, event: RemitoEvent) -> None:
+        if self.lagged or not self.matches(event):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.mark_lagged()
+
+    def mark_lagged(self) -> None:
+        """Descarta lo pendiente y deja solo el aviso de recarga (hasta que el cliente lo lea)."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(RESYNC)
+        self.lagged = True
+
+    async def next_event(self, timeout: float) -> Optional[RemitoEvent]:
+        """
+        Próximo evento (RESYNC si el cliente perdió eventos), o None si pasó
+        `timeout` sin eventos: el momento de mandar un heartbeat.
+        """
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event is RESYNC:
+            self.lagged = False
+        return event
+
+    def close(self) -> None:
+        self._bus.unsubscribe(self)
+
+
+class RemitoEventBus:
+    """
+    Pub/sub en proceso de remitos creados y actualizados para GET /remitos/events.
+
+    Lo alimenta RemitoService en cada escritura o, con varias réplicas,
+    SupabaseRealtimeRelay con los cambios de la tabla remitos. Guarda los
+    últimos eventos para que un cliente que se reconecta con Last-Event-ID
+    reciba lo que se perdió; si ya no están (o el id es de otra réplica) se
+    le pide recargar.
+    """
+
+    def __init__(
+        self,
+        *,
+        queue_size: int = 100,
+        replay_size: int = 256,
+        max_subscribers: int = 200,
+    ) -> None:
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.relay: Optional[SupabaseRealtimeRelay] = None
+        # Prefijo del id de evento: los ids de otra réplica (o de antes de un reinicio) no se confunden
+        self._origin = uuid.uuid4().hex[:8]
+        self._sequence = itertools.count(1)
+        self._replay: Deque[RemitoEvent] = deque(maxlen=replay_size)
+        self._subscribers: Set[RemitoSubscription] = set()
+
+    def publish(self, tipo: str, remito: Dict[str, Any]) -> None:
+        event = RemitoEvent(f"{self._origin}-{next(self._sequence)}", tipo, remito)
+        self._replay.append(event)
+        REMITO_EVENTS.labels(outcome="published").inc()
+        for subscription in list(self._subscribers):
+            subscription.offer(event)
+
+    async def subscribe(
+        self,
+        *,
+        empresa: Optional[str] = None,
+        destino: Optional[str] = None,
+        last_event_id: Optional[str] = None,
+    ) -> RemitoSubscription:
+        if len(self._subscribers) >= self.max_subscribers:
+            raise TooManySubscribers(f"Máximo {self.max_subscribers} clientes conectados")
+        if self.relay is not None:
+            await self.relay.ensure_started()
+
+        subscription = RemitoSubscription(self, empresa=empresa, destino=destino, queue_size=self.queue_size)
+        if last_event_id:
+            for event in self._missed_since(last_event_id, subscription):
+                subscription.offer(event)
+        self._subscribers.add(subscription)
+        REMITO_EVENT_STREAMS.set(len(self._subscribers))
+        return subscription
+
+    def unsubscribe(self, subscription: RemitoSubscription) -> None:
+        self._subscribers.discard(subscription)
+        REMITO_EVENT_STREAMS.set(len(self._subscribers))
+
+    def _missed_since(self, last_event_id: str, subscription: RemitoSubscription) -> List[RemitoEvent]:
+        origin, _, sequence = last_event_id.partition("-")
+        oldest = int(self._replay[0].id.partition("-")[2]) if self._replay else None
+        if origin != self._origin or not sequence.isdigit() or (oldest is not None and int(sequence) < oldest - 1):
+            subscription.mark_lagged()
+            return []
+        return [event for event in self._replay if int(event.id.partition("-")[2]) > int(sequence)]
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+
+class SupabaseRealtimeRelay:
+    """
+    Publica en el bus local los INSERT/UPDATE de remitos que llegan por
+    Supabase Realtime (migración 0010), así cada réplica ve también los
+    remitos creados en las otras. Se conecta con el primer cliente del stream.
+    """
+
+    def __init__(self, publish: Callable[[str, Dict[str, Any]], None], supabase_url: str, api_key: str) -> None:
+        self._publish = publish
+        self._url = f"{supabase_url.rstrip('/')}/realtime/v1"
+        self._api_key = api_key
+        self._client: Any = None
+        self._lock = asyncio.Lock()
+
+    async def ensure_started(self) -> None:
+        if self._client is not None:
+            return
+        async with self._lock:
+            if self._client is not None:
+                return
+            from realtime import AsyncRealtimeClient
+
+            # Pocos reintentos: el cliente del stream espera la conexión (y reintenta solo si falla)
+            client = AsyncRealtimeClient(self._url, self._api_key, max_retries=3, initial_backoff=0.5)
+            await client.connect()
+            channel = client.channel("remibot-remitos")
+            channel.on_postgres_changes("INSERT", self._on_change, table="remitos", schema="public")
+            channel.on_postgres_changes("UPDATE", self._on_change, table="remitos", schema="public")
+            await channel.subscribe()
+            self._client = client
+            logger.info("Suscripto a Supabase Realtime para remitos")
+
+    def _on_change(self, payload: Dict[str, Any]) -> None:
+        from app.core.remito_service import RemitoService
+
+        data = payload.get("data", payload)
+        record = data.get("record") or data.get("new")
+        if not record:
+            return
+        kind = str(data.get("type") or data.get("eventType") or "").upper()
+        try:
+            remito = RemitoService._record_to_model(record).model_dump(mode="json")
+        except Exception:
+            logger.exception("Cambio de remito inválido desde Realtime")
+            return
+        self._publish(EVENT_CREATED if kind == "INSERT" else EVENT_UPDATED, remito)
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-import json
-import re
 from typing import Any, Dict, List, Optional
 
 from app.core.catalog_service import CatalogService
-from app.core.conversation_store import ConversationStore
+from app.core.conversation_store import ConversationBackend
+from app.core.executors import DB_IO, run_blocking
+from app.core.json_extractor import extract_remito_json
 from app.core.llm_service import LLMService
+from app.core.llm_tools import REMITO_LLM_FIELDS
 from app.core.log_service import LogService
 from app.core.remito_service import RemitoService
 from app.core.whatsapp_service import WhatsAppService
@@ -220,7 +221,7 @@ class RemitoFlowManagerV2:
         llm_service: LLMService,
         catalog_service: CatalogService,
         remito_service: RemitoService,
-        conversation_store: ConversationStore,
+        conversation_store: ConversationBackend,
         log_service: LogService,
         whatsapp_service: Optional[WhatsAppService] = None,
         config_store: Optional[Any] = None,
@@ -251,6 +252,13 @@ class RemitoFlowManagerV2:
         self._phone_empresa_cache[phone] = empresa_ids
         return empresa_ids
 
+    def clear_cache(self, phone: Optional[str] = None) -> None:
+        """Limpia el caché de empresas por teléfono."""
+        if phone:
+            self._phone_empresa_cache.pop(phone, None)
+        else:
+            self._phone_empresa_cache.clear()
+
     async def _build_prompt_for_phone(self, phone: str) -> str:
         """Construye el prompt personalizado según el teléfono del usuario."""
         # Obtener prompt base desde configuración
@@ -291,6 +299,10 @@ class RemitoFlowManagerV2:
         contact = payload.from_number
         incoming = payload.body.strip()
 
+        # La primera lectura de un contacto en un backend persistente va al pool DB_IO
+        if not self.conversation_store.is_hydrated(contact):
+            await run_blocking(DB_IO, self.conversation_store.hydrate, contact)
+
         # Guardar mensaje del usuario
         self.conversation_store.append(contact, "user", incoming)
 
@@ -350,17 +362,7 @@ class RemitoFlowManagerV2:
         """Procesa una respuesta JSON del LLM: crea remito y envía QR."""
         try:
             # Validar que solo tenga los campos esperados del LLM
-            expected_fields = {
-                "nombre_empresa",
-                "nombre_establecimiento",
-                "nombre_chacra",
-                "nombre_conductor",
-                "cedula_conductor",
-                "matricula_camion",
-                "matricula_zorra",
-                "peso_estimado_tn",
-                "nombre_destino",
-            }
+            expected_fields = set(REMITO_LLM_FIELDS)
             
             # Validar datos requeridos (todos excepto matricula_zorra)
             required_fields = expected_fields - {"matricula_zorra"}
@@ -384,13 +386,13 @@ class RemitoFlowManagerV2:
             # Crear payload del remito
             remito_payload = RemitoCreate(
                 id_chacra=chacra["id_chacra"],
-                nombre_chacra=json_data["nombre_chacra"],
+                nombre_chacra=chacra["nombre_chacra"],
                 id_establecimiento=establecimiento["id_establecimiento"],
-                nombre_establecimiento=json_data["nombre_establecimiento"],
+                nombre_establecimiento=establecimiento["nombre"],
                 id_empresa=empresa["id_empresa"],
                 nombre_empresa=json_data["nombre_empresa"],
                 id_destino=destino["id_destino"],
-                nombre_destino=json_data["nombre_destino"],
+                nombre_destino=destino["nombre"],
                 nombre_conductor=json_data["nombre_conductor"],
                 cedula_conductor=json_data["cedula_conductor"],
                 matricula_camion=json_data["matricula_camion"],
@@ -458,26 +460,4 @@ class RemitoFlowManagerV2:
 
     def _extract_json(self, text: str) -> Optional[Dict[str, Any]]:
         """Extrae y valida JSON de una respuesta de texto."""
-        # Buscar bloques JSON en el texto
-        json_pattern = r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}'
-        matches = re.findall(json_pattern, text, re.DOTALL)
-
-        for match in matches:
-            try:
-                data = json.loads(match)
-                # Verificar que tenga los campos esperados de un remito (mínimo empresa y peso)
-                if isinstance(data, dict) and "nombre_empresa" in data and "peso_estimado_tn" in data:
-                    # Limpiar campos que no deben venir del LLM
-                    unwanted_fields = [
-                        "id_remito", "qr_url", "timestamp_creacion", 
-                        "id_chacra", "id_establecimiento", "id_empresa", "id_destino",
-                        "estado_remito", "activo", "raw_payload"
-                    ]
-                    for field in unwanted_fields:
-                        data.pop(field, None)
-                    
-                    return data
-            except json.JSONDecodeError:
-                continue
-
-        return None
+        return extract_remito_json(text)
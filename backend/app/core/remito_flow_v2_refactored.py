@@ -1,13 +1,20 @@
 from __future__ import annotations
 
+import time
 from typing import Any, Dict, List, Optional
 
+from app.core.admission import is_overload_error
 from app.core.config_store import ConfigStore
 from app.core.empresa_context_service import EmpresaContextService
+from app.core.executors import DB_IO, run_blocking
 from app.core.llm_service import LLMService
 from app.core.log_service import LogService
+from app.core.metrics import STAGE_CONTEXT_LOAD, STAGE_PHONE_RESOLUTION, STAGE_PROMPT_BUILD, observe_stage
 from app.core.phone_service import PhoneService
 from app.core.prompts import load_system_prompt
+from app.core.shared_state import SharedState
+from app.core.tracing import span
+from app.models.remito import Remito
 from app.models.webhook import WhatsAppWebhookPayload, WhatsAppWebhookResponse
 from app.services.conversation_service import ConversationService
 from app.usecases.create_remito_usecase import CreateRemitoUseCase
@@ -27,6 +34,8 @@ class RemitoFlowManagerV2Refactored:
         phone_service: Optional[PhoneService] = None,
         config_store: Optional[ConfigStore] = None,
         whatsapp_service: Optional[Any] = None,
+        qr_delivery_mode: str = "id",
+        shared_state: Optional[SharedState] = None,
     ) -> None:
         self.conversation_service = conversation_service
         self.create_remito_usecase = create_remito_usecase
@@ -36,27 +45,66 @@ class RemitoFlowManagerV2Refactored:
         self.phone_service = phone_service
         self.config_store = config_store
         self.whatsapp_service = whatsapp_service
+        # "id": sube el PNG a /media y envía por media id; "link": usa la URL pública
+        self.qr_delivery_mode = qr_delivery_mode
+        self.shared_state = shared_state
         self._phone_empresa_cache: Dict[str, List[str]] = {}
 
     async def handle_message(self, payload: WhatsAppWebhookPayload) -> WhatsAppWebhookResponse:
+        """Procesa un mensaje de WhatsApp, serializando los turnos de cada contacto."""
+        contact = payload.from_number
+        if not self.shared_state:
+            await self._hydrate_conversation(contact)
+            return await self._process_message(payload)
+
+        await self.shared_state.sync_invalidations()
+        async with self.shared_state.contact_lock(contact):
+            if not self.shared_state.distributed:
+                await self._hydrate_conversation(contact)
+                return await self._process_message(payload)
+
+            # En modo cluster el turno anterior pudo procesarse en otra réplica
+            store = self.conversation_service.conversation_store
+            with span("conversation.reload"):
+                await run_blocking(DB_IO, store.reload, contact)
+            try:
+                return await self._process_message(payload)
+            finally:
+                with span("conversation.flush"):
+                    await run_blocking(DB_IO, store.flush)
+
+    async def _hydrate_conversation(self, contact: str) -> None:
+        # La primera lectura de un contacto en un backend persistente va al pool DB_IO, no al event loop
+        store = self.conversation_service.conversation_store
+        if not store.is_hydrated(contact):
+            with span("conversation.hydrate"):
+                await run_blocking(DB_IO, store.hydrate, contact)
+
+    async def _process_message(self, payload: WhatsAppWebhookPayload) -> WhatsAppWebhookResponse:
         """Procesa un mensaje de WhatsApp y genera respuesta."""
         contact = payload.from_number
         incoming = payload.body.strip()
 
         try:
             # Construir prompt personalizado según el teléfono
-            system_prompt = await self._build_prompt_for_phone(contact)
+            with observe_stage(STAGE_PROMPT_BUILD):
+                system_prompt = await self._build_prompt_for_phone(contact)
+
+            # Ya en cache por el prompt; sin empresas el teléfono no puede crear remitos
+            empresa_ids = await self.get_empresas_for_phone(contact)
 
             # Procesar mensaje con el servicio de conversación
             response_text, json_data = await self.conversation_service.process_message(
                 phone=contact,
                 message=incoming,
                 system_prompt=system_prompt,
+                empresa_ids=empresa_ids,
             )
 
-            if json_data:
+            if json_data and empresa_ids:
                 # Crear remito usando el caso de uso
-                return await self._handle_remito_creation(contact, json_data)
+                with span("remito.create"):
+                    return await self._handle_remito_creation(contact, json_data, empresa_ids)
             else:
                 # Enviar respuesta por WhatsApp si hay servicio disponible
                 if self.whatsapp_service and response_text:
@@ -92,7 +140,7 @@ class RemitoFlowManagerV2Refactored:
 
             return WhatsAppWebhookResponse(
                 reply=error_message,
-                metadata={"status": "error", "error": str(e)},
+                metadata={"status": "error", "error": str(e), "overloaded": is_overload_error(e)},
             )
 
     async def _build_prompt_for_phone(self, phone: str) -> str:
@@ -101,14 +149,16 @@ class RemitoFlowManagerV2Refactored:
         base_prompt = load_system_prompt("registered_user")
         if self.config_store:
             try:
-                config = await self.config_store.read()
+                with span("config.read"):
+                    config = await self.config_store.read()
                 if config.llm_prompt:
                     base_prompt = config.llm_prompt
             except Exception:
                 pass
 
         # Buscar empresas asociadas al teléfono
-        empresa_ids = await self._get_empresas_for_phone(phone)
+        with observe_stage(STAGE_PHONE_RESOLUTION):
+            empresa_ids = await self.get_empresas_for_phone(phone)
         
         # Si no hay empresas, usar prompt de no registrado
         if not empresa_ids:
@@ -121,16 +171,18 @@ class RemitoFlowManagerV2Refactored:
         # Cargar contexto de empresa(s)
         if len(empresa_ids) == 1:
             # Una sola empresa: agregar su catálogo
-            context = await self.empresa_context_service.load_context(empresa_ids[0])
+            with observe_stage(STAGE_CONTEXT_LOAD):
+                context = await self.empresa_context_service.load_context(empresa_ids[0])
             catalog_text = self.empresa_context_service.build_catalog_text(context)
             return base_prompt + catalog_text
         else:
             # Múltiples empresas: agregar todos los catálogos
-            contexts = await self.empresa_context_service.load_multiple_contexts(empresa_ids)
+            with observe_stage(STAGE_CONTEXT_LOAD):
+                contexts = await self.empresa_context_service.load_multiple_contexts(empresa_ids)
             catalog_text = self.empresa_context_service.build_multiple_catalog_text(contexts)
             return base_prompt + catalog_text
 
-    async def _get_empresas_for_phone(self, phone: str) -> List[str]:
+    async def get_empresas_for_phone(self, phone: str) -> List[str]:
         """Obtiene lista de IDs de empresa asociadas a un teléfono."""
         if phone in self._phone_empresa_cache:
             return self._phone_empresa_cache[phone]
@@ -146,6 +198,7 @@ class RemitoFlowManagerV2Refactored:
         self,
         contact: str,
         remito_data: Dict[str, Any],
+        empresa_ids: List[str],
     ) -> WhatsAppWebhookResponse:
         """Maneja la creación de un remito."""
         try:
@@ -153,6 +206,7 @@ class RemitoFlowManagerV2Refactored:
             remito = await self.create_remito_usecase.execute(
                 remito_data=remito_data,
                 contact=contact,
+                empresa_ids=empresa_ids,
             )
 
             # Limpiar conversación
@@ -161,16 +215,8 @@ class RemitoFlowManagerV2Refactored:
             # Enviar QR por WhatsApp si está disponible
             if self.whatsapp_service and remito.qr_url:
                 try:
-                    await self.whatsapp_service.send_image(
-                        to=contact,
-                        image_url=remito.qr_url,
-                        caption=f"✅ Remito generado exitosamente\n\n"
-                        f"📋 ID: {remito.id_remito}\n"
-                        f"🏢 {remito.nombre_establecimiento} - {remito.nombre_chacra}\n"
-                        f"🚛 {remito.matricula_camion}\n"
-                        f"👤 {remito.nombre_conductor}\n"
-                        f"📍 Destino: {remito.nombre_destino}",
-                    )
+                    with span("whatsapp.send_qr", id_remito=remito.id_remito):
+                        await self._send_remito_qr(contact, remito)
                 except Exception as e:
                     await self.log_service.write_log(
                         tipo="ERROR",
@@ -204,9 +250,62 @@ class RemitoFlowManagerV2Refactored:
 
             return WhatsAppWebhookResponse(
                 reply=error_message,
-                metadata={"status": "error", "error": str(e)},
+                metadata={"status": "error", "error": str(e), "overloaded": is_overload_error(e)},
             )
 
+    async def _send_remito_qr(self, contact: str, remito: Remito) -> None:
+        """Envía el QR del remito, por media id si tenemos el PNG en memoria o por link."""
+        caption = (
+            f"✅ Remito generado exitosamente\n\n"
+            f"📋 ID: {remito.id_remito}\n"
+            f"🏢 {remito.nombre_establecimiento} - {remito.nombre_chacra}\n"
+            f"🚛 {remito.matricula_camion}\n"
+            f"👤 {remito.nombre_conductor}\n"
+            f"📍 Destino: {remito.nombre_destino}"
+        )
+
+        image_bytes = None
+        if self.qr_delivery_mode == "id":
+            image_bytes = self.create_remito_usecase.qrcode_service.get_rendered_image(remito.id_remito)
+
+        mode = "id" if image_bytes else "link"
+        started = time.perf_counter()
+        try:
+            if image_bytes:
+                try:
+                    await self.whatsapp_service.send_image_bytes(
+                        to=contact,
+                        data=image_bytes,
+                        cache_key=remito.id_remito,
+                        caption=caption,
+                    )
+                except Exception:
+                    # Si la subida falla, el link público sigue siendo válido
+                    self.whatsapp_service.forget_media_id(remito.id_remito)
+                    mode = "link_fallback"
+                    await self.whatsapp_service.send_image(to=contact, image_url=remito.qr_url, caption=caption)
+            else:
+                await self.whatsapp_service.send_image(to=contact, image_url=remito.qr_url, caption=caption)
+        except Exception:
+            mode = "failed"
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            # Registrar latencia por modo para comparar link vs media id (también los envíos fallidos)
+            try:
+                await self.log_service.write_log(
+                    tipo="WHATSAPP",
+                    detalle=f"QR enviado por {mode} en {elapsed_ms:.0f} ms",
+                    payload={
+                        "id_remito": remito.id_remito,
+                        "contacto": contact,
+                        "modo": mode,
+                        "elapsed_ms": round(elapsed_ms, 1),
+                    },
+                )
+            except Exception:
+                pass  # No tapar el error del envío si el log falla
+
     def clear_cache(self, phone: Optional[str] = None) -> None:
         """Limpia el caché de empresas por teléfono."""
         if phone:
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import re
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Tuple
+
+# Base32 de Crockford: sin I, L, O ni U para que el id se pueda dictar y
+# copiar del papel sin confusiones; el orden ASCII coincide con el numérico
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_RANDOM_BITS = 30
+_RANDOM_CHARS = 6
+_MILLIS_CHARS = 2
+
+REMITO_ID_PATTERN = re.compile(r"^(\d{8})-(\d{6})-([0-9A-HJKMNP-TV-Z]{8})$")
+
+
+def _encode(value: int, width: int) -> str:
+    chars = []
+    for _ in range(width):
+        value, digit = divmod(value, 32)
+        chars.append(_ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def _decode(text: str) -> int:
+    value = 0
+    for char in text:
+        value = value * 32 + _ALPHABET.index(char)
+    return value
+
+
+class RemitoIdGenerator:
+    """
+    Ids de remito únicos y ordenables por fecha: AAAAMMDD-HHMMSS-XXXXXXXX.
+
+    Los dos primeros caracteres del sufijo son los milisegundos y los seis
+    restantes una secuencia que arranca en un valor aleatorio en cada
+    milisegundo y se incrementa dentro del mismo (como ULID monotónico):
+    dentro del proceso no se repiten nunca y entre réplicas la chance de
+    choque es de 1 en 2^30 por par de ids del mismo milisegundo. Si el reloj
+    retrocede se sigue usando el último milisegundo emitido, así el orden se
+    mantiene.
+    """
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.time,
+        randbits: Callable[[int], int] = secrets.randbits,
+    ) -> None:
+        self._clock = clock
+        self._randbits = randbits
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def allocate(self) -> Tuple[str, datetime]:
+        """Reserva un id nuevo; retorna el id y el instante (UTC) que codifica."""
+        with self._lock:
+            now_ms = int(self._clock() * 1000)
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = self._randbits(_RANDOM_BITS)
+            else:
+                self._sequence += 1
+                if self._sequence >= 1 << _RANDOM_BITS:
+                    # Secuencia agotada en este milisegundo: se avanza al siguiente
+                    self._last_ms += 1
+                    self._sequence = self._randbits(_RANDOM_BITS - 1)
+            ms, sequence = self._last_ms, self._sequence
+
+        timestamp = datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+        suffix = _encode(ms % 1000, _MILLIS_CHARS) + _encode(sequence, _RANDOM_CHARS)
+        return f"{timestamp:%Y%m%d-%H%M%S}-{suffix}", timestamp
+
+    def allocate_many(self, count: int) -> List[Tuple[str, datetime]]:
+        return [self.allocate() for _ in range(count)]
+
+    @staticmethod
+    def timestamp_of(remito_id: str) -> Optional[datetime]:
+        """Instante codificado en un id de este formato (None para ids anteriores)."""
+        match = REMITO_ID_PATTERN.match(remito_id)
+        if not match:
+            return None
+        date, clock, suffix = match.groups()
+        base = datetime.strptime(date + clock, "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc)
+        millis = _decode(suffix[:_MILLIS_CHARS])
+        return base.replace(microsecond=millis * 1000)
@@ -1,15 +1,22 @@
 from __future__ import annotations
 
 import asyncio
-from datetime import datetime, timezone
+from datetime import date, datetime
 from typing import Any, Dict, List, Optional
 import traceback
+import uuid
 
 from supabase import Client
 
+from app.core.data_access import DataAccess
 from app.core.log_service import LogService
+from app.core.metrics import STAGE_REMITO_INSERT, observe_stage
 from app.core.qrcode_service import QRCodeService
-from app.models.remito import Remito, RemitoCreate, RemitoUpdate
+from app.core.remito_events import EVENT_CREATED, EVENT_UPDATED, RemitoEventBus
+from app.core.remito_ids import RemitoIdGenerator
+from app.core.shared_state import SharedState
+from app.core.time_window import DEFAULT_TIMEZONE, resolve_window
+from app.models.remito import Remito, RemitoBulkItem, RemitoCreate, RemitoUpdate
 
 
 class RemitoService:
@@ -22,10 +29,18 @@ class RemitoService:
         supabase_client: Client,
         qrcode_service: Optional[QRCodeService] = None,
         log_service: Optional[LogService] = None,
+        data_access: Optional[DataAccess] = None,
+        id_generator: Optional[RemitoIdGenerator] = None,
+        shared_state: Optional[SharedState] = None,
+        event_bus: Optional[RemitoEventBus] = None,
     ) -> None:
         self.supabase = supabase_client
         self.qrcode_service = qrcode_service or QRCodeService(supabase_client)
         self.log_service = log_service
+        self.db = data_access or DataAccess(supabase_client)
+        self.id_generator = id_generator or RemitoIdGenerator()
+        self.shared_state = shared_state
+        self.event_bus = event_bus
 
     async def list_remitos(
         self,
@@ -39,74 +54,63 @@ class RemitoService:
         year: int | None = None,
         month: int | None = None,
         day: int | None = None,
+        q: str | None = None,
+        desde: date | datetime | None = None,
+        hasta: date | datetime | None = None,
+        tz: str = DEFAULT_TIMEZONE,
     ) -> List[Remito]:
-        def _list_sync() -> List[Dict[str, Any]]:
-            query = self.supabase.table(self.TABLE_NAME).select("*")
+        search = (q or "").strip()
+        start, end = resolve_window(desde=desde, hasta=hasta, year=year, month=month, day=day, tz=tz)
+
+        def _build(client: Any) -> Any:
+            if search:
+                # remitos_buscar (migración 0008) devuelve los remitos ya ordenados
+                # por relevancia; el texto viaja como parámetro de la función
+                query = client.rpc("remitos_buscar", {"p_q": search})
+            else:
+                query = client.table(self.TABLE_NAME).select("*")
             
+            # Cada valor va en su propio filtro (columna=operador.valor): nunca
+            # se arma un or=(...) con texto del usuario, que podría agregar condiciones
             if activo is not None:
                 query = query.eq("activo", activo)
             if destino is not None:
-                query = query.or_(f"nombre_destino.ilike.%{destino}%,id_destino.eq.{destino}")
+                query = _id_or_name(query, "id_destino", "nombre_destino", destino)
             if establecimiento is not None:
-                query = query.or_(f"nombre_establecimiento.ilike.%{establecimiento}%,id_establecimiento.eq.{establecimiento}")
+                query = _id_or_name(query, "id_establecimiento", "nombre_establecimiento", establecimiento)
             if chacra is not None:
-                query = query.or_(f"nombre_chacra.ilike.%{chacra}%,id_chacra.eq.{chacra}")
+                query = _id_or_name(query, "id_chacra", "nombre_chacra", chacra)
             if matricula_camion is not None:
-                query = query.ilike("matricula_camion", f"%{matricula_camion}%")
+                query = query.ilike("matricula_camion", _contains_pattern(matricula_camion))
             if matricula_zorra is not None:
-                query = query.ilike("matricula_zorra", f"%{matricula_zorra}%")
+                query = query.ilike("matricula_zorra", _contains_pattern(matricula_zorra))
             if cedula_conductor is not None:
-                query = query.ilike("cedula_conductor", f"%{cedula_conductor}%")
-            
-            # Filtros de fecha
-            if year is not None:
-                query = query.gte("timestamp_creacion", f"{year}-01-01T00:00:00Z")
-                query = query.lt("timestamp_creacion", f"{year + 1}-01-01T00:00:00Z")
-            if month is not None:
-                if year is None:
-                    # Si no hay año, usar el año actual
-                    from datetime import datetime
-                    year = datetime.now().year
-                month_str = f"{month:02d}"
-                query = query.gte("timestamp_creacion", f"{year}-{month_str}-01T00:00:00Z")
-                # Calcular el primer día del mes siguiente
-                next_month = month + 1 if month < 12 else 1
-                next_year = year if month < 12 else year + 1
-                query = query.lt("timestamp_creacion", f"{next_year}-{next_month:02d}-01T00:00:00Z")
-            if day is not None:
-                if month is None or year is None:
-                    from datetime import datetime
-                    now = datetime.now()
-                    year = year or now.year
-                    month = month or now.month
-                day_str = f"{day:02d}"
-                month_str = f"{month:02d}"
-                query = query.gte("timestamp_creacion", f"{year}-{month_str}-{day_str}T00:00:00Z")
-                query = query.lt("timestamp_creacion", f"{year}-{month_str}-{day_str}T23:59:59Z")
+                query = query.ilike("cedula_conductor", _contains_pattern(cedula_conductor))
             
-            response = query.order("timestamp_creacion", desc=True).execute()
-            return response.data or []
+            # Un único rango semiabierto sobre timestamp_creacion (índice de la migración 0009)
+            if start is not None:
+                query = query.gte("timestamp_creacion", start.isoformat())
+            if end is not None:
+                query = query.lt("timestamp_creacion", end.isoformat())
 
-        records = await asyncio.to_thread(_list_sync)
-        return [self._record_to_model(record) for record in records]
+            if search:
+                return query
+            return query.order("timestamp_creacion", desc=True)
 
-    async def get_remito(self, remito_id: str) -> Optional[Remito]:
-        def _get_sync() -> Optional[Dict[str, Any]]:
-            response = (
-                self.supabase.table(self.TABLE_NAME)
-                .select("*")
-                .eq("id_remito", remito_id)
-                .limit(1)
-                .execute()
-            )
-            return response.data[0] if response.data else None
+        response = await self.db.execute(_build)
+        return [self._record_to_model(record) for record in response.data or []]
 
-        record = await asyncio.to_thread(_get_sync)
+    async def get_remito(self, remito_id: str) -> Optional[Remito]:
+        response = await self.db.execute(
+            lambda c: c.table(self.TABLE_NAME).select("*").eq("id_remito", remito_id).limit(1)
+        )
+        record = response.data[0] if response.data else None
         return self._record_to_model(record) if record else None
 
     async def create_remito(self, payload: RemitoCreate) -> Remito:
-        timestamp = datetime.now(timezone.utc)
-        remito_id = self._build_remito_id(payload.id_chacra, timestamp)
+        # El id se reserva antes de generar el QR (que lo imprime): no puede
+        # chocar en el insert después de haber renderizado y subido la imagen
+        remito_id, timestamp = self.id_generator.allocate()
         
         if self.log_service:
             await self.log_service.write_log(
@@ -118,17 +122,7 @@ class RemitoService:
         try:
             # Generar QR code
             qr_url = payload.qr_url or await self.qrcode_service.generate(
-                {
-                    "id_remito": remito_id,
-                    "nombre_establecimiento": payload.nombre_establecimiento,
-                    "nombre_chacra": payload.nombre_chacra,
-                    "nombre_destino": payload.nombre_destino,
-                    "matricula_camion": payload.matricula_camion,
-                    "matricula_zorra": payload.matricula_zorra,
-                    "nombre_conductor": payload.nombre_conductor,
-                    "cedula_conductor": payload.cedula_conductor,
-                    "timestamp": timestamp.strftime("%Y-%m-%d %H:%M"),
-                },
+                self._qr_payload(remito_id, timestamp, payload),
                 include_text=True,
             )
 
@@ -146,14 +140,12 @@ class RemitoService:
                 "timestamp_creacion": timestamp.isoformat(),
             }
 
-            def _insert_sync() -> Dict[str, Any]:
+            with observe_stage(STAGE_REMITO_INSERT):
                 # Refresh schema cache before insert
-                self.supabase.table(self.TABLE_NAME).select("*", count="exact").limit(0).execute()
+                await self.db.execute(lambda c: c.table(self.TABLE_NAME).select("*", count="exact").limit(0))
                 # Perform actual insert
-                response = self.supabase.table(self.TABLE_NAME).insert(remito_data).execute()
-                return response.data[0] if response.data else remito_data
-
-            record = await asyncio.to_thread(_insert_sync)
+                response = await self.db.execute(lambda c: c.table(self.TABLE_NAME).insert(remito_data))
+            record = response.data[0] if response.data else remito_data
             
             if self.log_service:
                 await self.log_service.write_log(
@@ -171,6 +163,7 @@ class RemitoService:
                     payload={"id_remito": remito_id, "id_chacra": payload.id_chacra},
                 )
 
+            await self._publish_change(EVENT_CREATED, [remito])
             return remito
         except Exception as e:
             if self.log_service:
@@ -181,6 +174,124 @@ class RemitoService:
                 )
             raise
 
+    async def create_remitos_bulk(
+        self,
+        payloads: List[RemitoCreate],
+        upload_concurrency: int = 8,
+    ) -> List[RemitoBulkItem]:
+        """
+        Crea varios remitos en una sola pasada (despachos armados desde una planilla).
+
+        Las chacras y destinos referenciados se verifican con una consulta por
+        tabla, los QR se generan en paralelo y las filas se insertan en una
+        sola llamada. Un remito con errores no frena al resto: el resultado
+        trae el estado de cada uno, en el orden recibido.
+        """
+        allocations = self.id_generator.allocate_many(len(payloads))
+        errors: Dict[int, str] = await self._check_catalog_refs(payloads)
+
+        # QR de los remitos válidos que no traen uno
+        pending_qr = [i for i, payload in enumerate(payloads) if i not in errors and not payload.qr_url]
+        qr_urls: Dict[int, str] = {}
+        generated = await self.qrcode_service.generate_many(
+            [self._qr_payload(*allocations[i], payloads[i]) for i in pending_qr],
+            include_text=True,
+            upload_concurrency=upload_concurrency,
+        )
+        for i, result in zip(pending_qr, generated):
+            if isinstance(result, BaseException):
+                errors[i] = f"Error generando QR: {result}"
+            else:
+                qr_urls[i] = result
+
+        rows = {
+            i: {
+                **payload.model_dump(exclude={"qr_url"}),
+                "id_remito": allocations[i][0],
+                "qr_url": payload.qr_url or qr_urls[i],
+                "timestamp_creacion": allocations[i][1].isoformat(),
+            }
+            for i, payload in enumerate(payloads)
+            if i not in errors
+        }
+        records = await self._insert_bulk(rows, errors)
+
+        results = [
+            RemitoBulkItem(indice=i, ok=True, remito=self._record_to_model(records[i]))
+            if i in records
+            else RemitoBulkItem(indice=i, ok=False, error=errors.get(i, "Remito no insertado"))
+            for i in range(len(payloads))
+        ]
+
+        if self.log_service:
+            await self.log_service.write_log(
+                tipo="REMITO",
+                detalle=f"Carga masiva: {len(records)} remitos creados, {len(payloads) - len(records)} con error",
+                payload={
+                    "ids": [allocations[i][0] for i in sorted(records)],
+                    "errores": {str(i): error for i, error in errors.items()},
+                },
+            )
+        if records:
+            await self._publish_change(EVENT_CREATED, [item.remito for item in results if item.remito])
+        return results
+
+    async def _check_catalog_refs(self, payloads: List[RemitoCreate]) -> Dict[int, str]:
+        """Errores por posición para chacras o destinos inexistentes o de otra empresa."""
+        chacra_ids = sorted({payload.id_chacra for payload in payloads})
+        destino_ids = sorted({payload.id_destino for payload in payloads})
+        chacras_resp, destinos_resp = await asyncio.gather(
+            self.db.execute(
+                lambda c: c.table("chacras")
+                .select("id_chacra,id_establecimiento,id_empresa")
+                .in_("id_chacra", chacra_ids)
+            ),
+            self.db.execute(lambda c: c.table("destinos").select("id_destino").in_("id_destino", destino_ids)),
+        )
+        chacras = {str(row["id_chacra"]): row for row in chacras_resp.data or []}
+        destinos = {str(row["id_destino"]) for row in destinos_resp.data or []}
+
+        errors: Dict[int, str] = {}
+        for i, payload in enumerate(payloads):
+            chacra = chacras.get(payload.id_chacra)
+            if chacra is None:
+                errors[i] = f"Chacra {payload.id_chacra} no encontrada"
+            elif str(chacra["id_establecimiento"]) != payload.id_establecimiento or str(
+                chacra["id_empresa"]
+            ) != payload.id_empresa:
+                errors[i] = f"La chacra {payload.id_chacra} no pertenece al establecimiento o empresa indicados"
+            elif payload.id_destino not in destinos:
+                errors[i] = f"Destino {payload.id_destino} no encontrado"
+        return errors
+
+    async def _insert_bulk(self, rows: Dict[int, Dict[str, Any]], errors: Dict[int, str]) -> Dict[int, Dict[str, Any]]:
+        """Inserta las filas en una llamada; si el lote falla, fila por fila para aislar el error."""
+        if not rows:
+            return {}
+        positions = list(rows)
+        batch = [rows[i] for i in positions]
+        with observe_stage(STAGE_REMITO_INSERT):
+            try:
+                response = await self.db.execute(lambda c: c.table(self.TABLE_NAME).insert(batch))
+                data = response.data or batch
+                return dict(zip(positions, data))
+            except Exception:
+                # El insert de PostgREST es atómico: un conflicto descarta todo el lote
+                pass
+
+            async def _insert_one(row: Dict[str, Any]) -> Dict[str, Any]:
+                response = await self.db.execute(lambda c: c.table(self.TABLE_NAME).insert(row))
+                return response.data[0] if response.data else row
+
+            outcomes = await asyncio.gather(*(_insert_one(rows[i]) for i in positions), return_exceptions=True)
+        records = {}
+        for i, outcome in zip(positions, outcomes):
+            if isinstance(outcome, BaseException):
+                errors[i] = f"Error insertando remito {rows[i]['id_remito']}: {outcome}"
+            else:
+                records[i] = outcome
+        return records
+
     async def update_remito(self, remito_id: str, payload: RemitoUpdate) -> Remito:
         update_data = payload.model_dump(exclude_unset=True, mode="python")
         if not update_data:
@@ -189,16 +300,10 @@ class RemitoService:
                 raise ValueError(f"Remito {remito_id} no encontrado")
             return remito
 
-        def _update_sync() -> Optional[Dict[str, Any]]:
-            response = (
-                self.supabase.table(self.TABLE_NAME)
-                .update(update_data)
-                .eq("id_remito", remito_id)
-                .execute()
-            )
-            return response.data[0] if response.data else None
-
-        record = await asyncio.to_thread(_update_sync)
+        response = await self.db.execute(
+            lambda c: c.table(self.TABLE_NAME).update(update_data).eq("id_remito", remito_id)
+        )
+        record = response.data[0] if response.data else None
         if not record:
             raise ValueError(f"Remito {remito_id} no encontrado")
 
@@ -209,12 +314,39 @@ class RemitoService:
                 payload={"id_remito": remito_id, "campos": list(update_data.keys())},
             )
 
-        return self._record_to_model(record)
+        remito = self._record_to_model(record)
+        await self._publish_change(EVENT_UPDATED, [remito])
+        return remito
+
+    async def _publish_change(self, tipo: str, remitos: List[Remito]) -> None:
+        """
+        Avisa que los remitos cambiaron: a los caches de lecturas (todas las
+        réplicas) y a los clientes de GET /remitos/events.
+        """
+        if self.event_bus:
+            for remito in remitos:
+                self.event_bus.publish(tipo, remito.model_dump(mode="json"))
+        if not self.shared_state:
+            return
+        try:
+            await self.shared_state.publish_invalidation("remitos")
+        except Exception:
+            # El remito ya se guardó; el TTL del cache acota lo que tarda en verse
+            pass
 
     @staticmethod
-    def _build_remito_id(id_chacra: str, timestamp: datetime) -> str:
-        suffix = timestamp.strftime("%Y%m%d%H%M%S")
-        return f"{id_chacra}-{suffix}"
+    def _qr_payload(remito_id: str, timestamp: datetime, payload: RemitoCreate) -> Dict[str, Any]:
+        return {
+            "id_remito": remito_id,
+            "nombre_establecimiento": payload.nombre_establecimiento,
+            "nombre_chacra": payload.nombre_chacra,
+            "nombre_destino": payload.nombre_destino,
+            "matricula_camion": payload.matricula_camion,
+            "matricula_zorra": payload.matricula_zorra,
+            "nombre_conductor": payload.nombre_conductor,
+            "cedula_conductor": payload.cedula_conductor,
+            "timestamp": timestamp.strftime("%Y-%m-%d %H:%M"),
+        }
 
     @staticmethod
     def _record_to_model(record: Dict[str, Any]) -> Remito:
@@ -249,3 +381,23 @@ class RemitoService:
         if value.endswith("Z"):
             value = value.replace("Z", "+00:00")
         return datetime.fromisoformat(value)
+
+
+def _contains_pattern(value: str) -> str:
+    """
+    Patrón ILIKE que busca el valor literal: %, _ y \\ no actúan como comodines.
+
+    PostgREST convierte todo * en % antes de llegar a Postgres, así que un
+    * escapado igual quedaría como comodín. Se reemplaza por _, que acepta un
+    solo carácter cualquiera (el * incluido) en vez de cualquier secuencia.
+    """
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_").replace("*", "_")
+    return f"%{escaped}%"
+
+
+def _id_or_name(query: Any, id_column: str, name_column: str, value: str) -> Any:
+    """Un UUID filtra por id exacto; cualquier otro texto, por nombre que lo contenga."""
+    try:
+        return query.eq(id_column, str(uuid.UUID(value)))
+    except ValueError:
+        return query.ilike(name_column, _contains_pattern(value))
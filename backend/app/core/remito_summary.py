@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from app.core.data_access import DataAccess
+
+# Dimensiones por las que se puede agrupar el resumen -> columnas de
+# remitos_resumen_diario que identifican y nombran cada grupo
+SUMMARY_DIMENSIONS: Dict[str, Tuple[str, ...]] = {
+    "dia": ("dia",),
+    "mes": ("mes",),
+    "empresa": ("id_empresa", "nombre_empresa"),
+    "establecimiento": ("id_establecimiento", "nombre_establecimiento"),
+    "chacra": ("id_chacra", "nombre_chacra"),
+    "destino": ("id_destino", "nombre_destino"),
+}
+
+
+class RemitoSummaryService:
+    """
+    Totales de remitos activos a partir de remitos_resumen_diario.
+
+    La tabla la mantiene un trigger sobre remitos (migración 0007), así que
+    el resumen nunca recorre los remitos: se leen las filas diarias del
+    rango pedido y se agrupan por las dimensiones solicitadas.
+    """
+
+    TABLE_NAME = "remitos_resumen_diario"
+    # PostgREST limita las filas por respuesta; se pagina hasta agotar el rango
+    PAGE_SIZE = 1000
+
+    def __init__(self, data_access: DataAccess) -> None:
+        self.db = data_access
+
+    async def summarize(
+        self,
+        *,
+        agrupar: Sequence[str] = (),
+        desde: Optional[date] = None,
+        hasta: Optional[date] = None,
+        empresa: Optional[str] = None,
+        establecimiento: Optional[str] = None,
+        chacra: Optional[str] = None,
+        destino: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        unknown = [name for name in agrupar if name not in SUMMARY_DIMENSIONS]
+        if unknown:
+            raise ValueError(
+                f"No se puede agrupar por {', '.join(unknown)}; opciones: {', '.join(SUMMARY_DIMENSIONS)}"
+            )
+
+        filters = {
+            "id_empresa": empresa,
+            "id_establecimiento": establecimiento,
+            "id_chacra": chacra,
+            "id_destino": destino,
+        }
+        rows = await self._fetch_rows(desde, hasta, {k: v for k, v in filters.items() if v is not None})
+
+        groups: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        total_cantidad = 0
+        total_toneladas = 0.0
+        for row in rows:
+            row["mes"] = str(row["dia"])[:7]
+            key = tuple(row[SUMMARY_DIMENSIONS[name][0]] for name in agrupar)
+            group = groups.get(key)
+            if group is None:
+                group = {column: row[column] for name in agrupar for column in SUMMARY_DIMENSIONS[name]}
+                group["cantidad"] = 0
+                group["toneladas"] = 0.0
+                groups[key] = group
+            cantidad = int(row["cantidad"])
+            toneladas = float(row["toneladas"])
+            group["cantidad"] += cantidad
+            group["toneladas"] += toneladas
+            total_cantidad += cantidad
+            total_toneladas += toneladas
+
+        # Orden por fecha y por nombre (la última columna de cada dimensión)
+        sort_columns = [SUMMARY_DIMENSIONS[name][-1] for name in agrupar]
+        ordered = sorted(
+            groups.values(),
+            key=lambda group: tuple("" if group[column] is None else str(group[column]) for column in sort_columns),
+        )
+        for group in ordered:
+            group["toneladas"] = round(group["toneladas"], 2)
+        return {
+            "desde": desde,
+            "hasta": hasta,
+            "agrupar": list(agrupar),
+            "cantidad": total_cantidad,
+            "toneladas": round(total_toneladas, 2),
+            # Los grupos que quedaron en cero (todos sus remitos se anularon) no se informan
+            "grupos": [group for group in ordered if group["cantidad"]],
+        }
+
+    async def _fetch_rows(
+        self, desde: Optional[date], hasta: Optional[date], filters: Dict[str, str]
+    ) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = []
+        offset = 0
+        while True:
+
+            def _build(client: Any, offset: int = offset) -> Any:
+                query = client.table(self.TABLE_NAME).select(
+                    "dia,id_empresa,nombre_empresa,id_establecimiento,nombre_establecimiento,"
+                    "id_chacra,nombre_chacra,id_destino,nombre_destino,cantidad,toneladas"
+                )
+                if desde is not None:
+                    query = query.gte("dia", desde.isoformat())
+                if hasta is not None:
+                    query = query.lte("dia", hasta.isoformat())
+                for column, value in filters.items():
+                    query = query.eq(column, value)
+                return query.order("id").range(offset, offset + self.PAGE_SIZE - 1)
+
+            response = await self.db.execute(_build)
+            page = response.data or []
+            rows.extend(page)
+            if len(page) < self.PAGE_SIZE:
+                return rows
+            offset += self.PAGE_SIZE
@@ -1,58 +1,151 @@
 from __future__ import annotations
 
-from functools import lru_cache
-from typing import Any
+import importlib
+from functools import cached_property, lru_cache
+from typing import TYPE_CHECKING, Optional
 
 from pydantic import ConfigDict, Field
 from pydantic_settings import BaseSettings
 
-from app.core.catalog_service import CatalogService
-from app.core.config_store import ConfigStore
-from app.core.conversation_store import ConversationStore
-from app.core.empresa_context_service import EmpresaContextService
-from app.core.llm_service import LLMService
-from app.core.log_service import LogService
-from app.core.phone_service import PhoneService
-from app.core.qrcode_service import QRCodeService
-from app.core.remito_flow_v2 import RemitoFlowManagerV2
-from app.core.remito_flow_v2_refactored import RemitoFlowManagerV2Refactored
-from app.core.remito_service import RemitoService
-from app.core.supabase_client import build_supabase_client
-from app.core.whatsapp_service import WhatsAppService
+from app.core.executors import configure_executors
+from app.core.tracing import configure_tracing
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+    from app.core.admission import AdmissionController, ReplyThrottle
+    from app.core.catalog_service import CatalogService
+    from app.core.config_store import ConfigStore
+    from app.core.conversation_store import ConversationBackend
+    from app.core.data_access import DataAccess
+    from app.core.driver_profiles import DriverProfileCache
+    from app.core.empresa_context_service import EmpresaContextService
+    from app.core.health_probe import DiagnosticsGate, HealthProber
+    from app.core.http_cache import ResponseCache
+    from app.core.llm_service import LLMService
+    from app.core.log_service import LogService
+    from app.core.name_index import CatalogNameResolver
+    from app.core.phone_service import PhoneService
+    from app.core.qrcode_service import QRCodeService
+    from app.core.rate_limit import InboundRateLimiter
+    from app.core.remito_events import RemitoEventBus
+    from app.core.remito_flow_v2 import RemitoFlowManagerV2
+    from app.core.remito_flow_v2_refactored import RemitoFlowManagerV2Refactored
+    from app.core.remito_service import RemitoService
+    from app.core.remito_summary import RemitoSummaryService
+    from app.core.shared_state import SharedState
+    from app.core.supabase_client import SupabaseClientManager
+    from app.core.whatsapp_service import WhatsAppService
+
+# Lo que necesita el primer mensaje de WhatsApp; Settings.warm_up lo prepara al arrancar
+CRITICAL_PATH_MODULES = (
+    "app.core.data_access",
+    "app.core.remito_service",
+    "app.core.qrcode_service",
+    "app.services.conversation_service",
+    "app.usecases.create_remito_usecase",
+    "app.core.remito_flow_v2_refactored",
+)
+CRITICAL_PATH_SERVICES = ("remito_flow_v2_refactored", "remito_service", "response_cache", "admission_controller", "inbound_rate_limiter")
 
 
 class Settings(BaseSettings):
     environment: str = Field("development", alias="ENVIRONMENT")
     frontend_url: str = Field("http://localhost:5173", alias="FRONTEND_URL")
 
+    # Varias réplicas/workers: estado compartido en Supabase (migración 0004)
+    cluster_mode: bool = Field(False, alias="CLUSTER_MODE")
+    cluster_node_id: str | None = Field(None, alias="CLUSTER_NODE_ID")
+
     supabase_url: str = Field(..., alias="SUPABASE_URL")
     supabase_service_role_key: str = Field(..., alias="SUPABASE_SERVICE_ROLE_KEY")
     supabase_anon_key: str | None = Field(None, alias="SUPABASE_ANON_KEY")
+    # Cliente PostgREST async con pool propio en lugar de asyncio.to_thread por consulta
+    supabase_async_db: bool = Field(True, alias="SUPABASE_ASYNC_DB")
+    supabase_pool_size: int = Field(20, alias="SUPABASE_POOL_SIZE")
+
+    # Executors por clase de carga bloqueante
+    executor_db_io_workers: int = Field(16, alias="EXECUTOR_DB_IO_WORKERS")
+    executor_cpu_render_workers: int = Field(2, alias="EXECUTOR_CPU_RENDER_WORKERS")
+    executor_storage_io_workers: int = Field(8, alias="EXECUTOR_STORAGE_IO_WORKERS")
+    executor_saturation_queue_depth: int = Field(10, alias="EXECUTOR_SATURATION_QUEUE_DEPTH")
+    # Carga masiva (POST /remitos/bulk): tope de remitos por pedido y subidas de QR en paralelo,
+    # por debajo de EXECUTOR_STORAGE_IO_WORKERS para dejar hilos a los remitos del chat
+    remitos_bulk_max_items: int = Field(200, alias="REMITOS_BULK_MAX_ITEMS")
+    remitos_bulk_upload_concurrency: int = Field(4, alias="REMITOS_BULK_UPLOAD_CONCURRENCY")
+    # Cache de listados de remitos ya serializados; cualquier escritura de remitos lo vacía (0 lo desactiva)
+    response_cache_size: int = Field(256, alias="RESPONSE_CACHE_SIZE")
+    response_cache_ttl_seconds: float = Field(30, alias="RESPONSE_CACHE_TTL_SECONDS")
+    # GET /remitos/events (SSE): cola por cliente, heartbeat y tope de clientes. Con varias réplicas,
+    # REMITO_EVENTS_REALTIME toma los eventos de Supabase Realtime (migración 0010) en vez de RemitoService
+    remito_events_queue_size: int = Field(100, alias="REMITO_EVENTS_QUEUE_SIZE")
+    remito_events_heartbeat_seconds: float = Field(15, alias="REMITO_EVENTS_HEARTBEAT_SECONDS")
+    remito_events_max_clients: int = Field(200, alias="REMITO_EVENTS_MAX_CLIENTS")
+    remito_events_realtime: bool = Field(False, alias="REMITO_EVENTS_REALTIME")
+
+    # Trazas por mensaje (buffer en memoria, export OTLP opcional a archivo)
+    tracing_enabled: bool = Field(True, alias="TRACING_ENABLED")
+    tracing_buffer_size: int = Field(200, alias="TRACING_BUFFER_SIZE")
+    tracing_max_spans: int = Field(500, alias="TRACING_MAX_SPANS")
+    tracing_slow_ms: float = Field(5000, alias="TRACING_SLOW_MS")
+    tracing_otlp_file: Optional[str] = Field(None, alias="TRACING_OTLP_FILE")
 
     claude_api_key: str | None = Field(None, alias="CLAUDE_API_KEY")
     openai_api_key: str | None = Field(None, alias="OPENAI_API_KEY")
     llm_prompt: str | None = Field(None, alias="LLM_PROMPT")
+    # El remito se pide como tool use (Anthropic) / json_schema (OpenAI) en vez de JSON en el texto
+    llm_structured_output: bool = Field(True, alias="LLM_STRUCTURED_OUTPUT")
+    # Estado explícito de los 9 campos del remito por contacto; el LLM recibe solo ese estado y el último mensaje
+    conversation_slot_state: bool = Field(True, alias="CONVERSATION_SLOT_STATE")
+    # Resolución de nombres del catálogo a filas existentes antes de insertar: solo por clave
+    # exacta (acentos, mayúsculas, palabras genéricas). El umbral de trigramas no reemplaza
+    # nombres; marca los parecidos y es el default del reporte /catalogo/{id}/duplicados
+    catalog_name_resolution: bool = Field(True, alias="CATALOG_NAME_RESOLUTION")
+    catalog_match_threshold: float = Field(0.5, alias="CATALOG_MATCH_THRESHOLD")
+    # Perfil del último remito por teléfono para precargar los slots de un viaje repetido (0 lo desactiva)
+    driver_profile_cache_size: int = Field(5000, alias="DRIVER_PROFILE_CACHE_SIZE")
+    driver_profile_ttl_seconds: float = Field(3600, alias="DRIVER_PROFILE_TTL_SECONDS")
+
+    # Historial de conversación: "memory", "sqlite" o "supabase"
+    conversation_backend: str = Field("memory", alias="CONVERSATION_BACKEND")
+    conversation_sqlite_path: str = Field("conversations.sqlite3", alias="CONVERSATION_SQLITE_PATH")
+    conversation_idle_ttl_seconds: float = Field(6 * 3600, alias="CONVERSATION_IDLE_TTL_SECONDS")
+    conversation_max_contacts: int = Field(5000, alias="CONVERSATION_MAX_CONTACTS")
 
     whatsapp_token: str | None = Field(None, alias="WHATSAPP_TOKEN")
     whatsapp_phone_id: str | None = Field(None, alias="WHATSAPP_PHONE_ID")
     whatsapp_api_version: str = Field("v18.0", alias="WHATSAPP_API_VERSION")
     whatsapp_verify_token: str = Field("remibot_verify_2025", alias="WHATSAPP_VERIFY_TOKEN")
+    whatsapp_media_mode: str = Field("id", alias="WHATSAPP_MEDIA_MODE")
 
-    # Servicios inicializados en __init__
-    supabase_service_client: Any = None
-    supabase_anon_client: Any = None
-    qrcode_service: Any = None
-    llm_service: Any = None
-    conversation_store: Any = None
-    log_service: Any = None
-    config_store: Any = None
-    remito_service: Any = None
-    catalog_service: Any = None
-    whatsapp_service: Any = None
-    phone_service: Any = None
-    empresa_context_service: Any = None
-    remito_flow_v2: Any = None
-    remito_flow_v2_refactored: Any = None
+    # El lifespan precalienta en segundo plano el camino del webhook (imports y servicios)
+    startup_warmup: bool = Field(True, alias="STARTUP_WARMUP")
+    # Control de admisión del webhook: límite AIMD de turnos simultáneos según la latencia y los
+    # errores de cada turno; con el límite alcanzado el chofer recibe el aviso de demora (replies/demora.md)
+    admission_control: bool = Field(True, alias="ADMISSION_CONTROL")
+    admission_initial_limit: int = Field(20, alias="ADMISSION_INITIAL_LIMIT")
+    admission_min_limit: int = Field(2, alias="ADMISSION_MIN_LIMIT")
+    admission_max_limit: int = Field(100, alias="ADMISSION_MAX_LIMIT")
+    admission_target_latency_seconds: float = Field(8, alias="ADMISSION_TARGET_LATENCY_SECONDS")
+    admission_backoff_ratio: float = Field(0.7, alias="ADMISSION_BACKOFF_RATIO")
+    # Límite de mensajes entrantes por teléfono y por empresa en una ventana deslizante; cada
+    # empresa puede ajustarlo (columnas limite_* de la migración 0011). Superado, el chofer
+    # recibe replies/limite.md y el mensaje no llega al LLM. RATE_LIMIT_SHARED con
+    # CLUSTER_MODE cuenta en Postgres para todas las réplicas; si no, cada proceso cuenta lo suyo
+    rate_limit_enabled: bool = Field(True, alias="RATE_LIMIT_ENABLED")
+    rate_limit_phone_messages: int = Field(20, alias="RATE_LIMIT_PHONE_MESSAGES")
+    rate_limit_empresa_messages: int = Field(600, alias="RATE_LIMIT_EMPRESA_MESSAGES")
+    rate_limit_window_seconds: int = Field(60, alias="RATE_LIMIT_WINDOW_SECONDS")
+    rate_limit_shared: bool = Field(False, alias="RATE_LIMIT_SHARED")
+    # Un chofer recibe a lo sumo un aviso automático por intervalo
+    auto_reply_interval_seconds: float = Field(60, alias="AUTO_REPLY_INTERVAL_SECONDS")
+    # /livez y /readyz leen el estado del prober de fondo; no consultan nada al responder
+    health_probe_interval_seconds: float = Field(10, alias="HEALTH_PROBE_INTERVAL_SECONDS")
+    health_probe_timeout_seconds: float = Field(3, alias="HEALTH_PROBE_TIMEOUT_SECONDS")
+    health_probe_failure_threshold: int = Field(3, alias="HEALTH_PROBE_FAILURE_THRESHOLD")
+    # GET /admin/diagnostics: requiere X-Admin-Token y corre a lo sumo una vez por intervalo
+    admin_token: str | None = Field(None, alias="ADMIN_TOKEN")
+    admin_diagnostics_min_interval_seconds: float = Field(60, alias="ADMIN_DIAGNOSTICS_MIN_INTERVAL_SECONDS")
 
     model_config = ConfigDict(
         env_file=".env",
@@ -63,56 +156,232 @@ class Settings(BaseSettings):
 
     def __init__(self, **values):
         super().__init__(**values)
-        supabase_manager = build_supabase_client(
+        configure_executors(
+            db_io_workers=self.executor_db_io_workers,
+            cpu_render_workers=self.executor_cpu_render_workers,
+            storage_io_workers=self.executor_storage_io_workers,
+            saturation_queue_depth=self.executor_saturation_queue_depth,
+        )
+        configure_tracing(
+            enabled=self.tracing_enabled,
+            buffer_size=self.tracing_buffer_size,
+            max_spans_per_trace=self.tracing_max_spans,
+            otlp_file=self.tracing_otlp_file,
+        )
+
+    # Los servicios se construyen con el primer acceso (y sus módulos se importan
+    # recién ahí): el arranque y los health checks no pagan Supabase, los flujos
+    # conversacionales ni Pillow. warm_up los adelanta desde el lifespan.
+
+    @cached_property
+    def supabase_service_client(self) -> Client:
+        return self._supabase_manager.service_client
+
+    @cached_property
+    def supabase_anon_client(self) -> Client:
+        return self._supabase_manager.anon_client
+
+    @cached_property
+    def _supabase_manager(self) -> SupabaseClientManager:
+        from app.core.supabase_client import build_supabase_client
+
+        return build_supabase_client(
             url=self.supabase_url,
             service_role_key=self.supabase_service_role_key,
             anon_key=self.supabase_anon_key,
         )
-        self.supabase_service_client = supabase_manager.service_client
-        self.supabase_anon_client = supabase_manager.anon_client
 
-        self.qrcode_service = QRCodeService(self.supabase_service_client)
-        self.llm_service = LLMService(
+    @cached_property
+    def data_access(self) -> DataAccess:
+        from app.core.data_access import DataAccess, build_async_postgrest_client
+
+        return DataAccess(
+            self.supabase_service_client,
+            build_async_postgrest_client(
+                self.supabase_url,
+                self.supabase_service_role_key,
+                pool_size=self.supabase_pool_size,
+            )
+            if self.supabase_async_db
+            else None,
+        )
+
+    @cached_property
+    def shared_state(self) -> SharedState:
+        from app.core.shared_state import InProcessSharedState, PostgresSharedState
+
+        if self.cluster_mode:
+            return PostgresSharedState(
+                self.supabase_service_client,
+                node_id=self.cluster_node_id,
+                data_access=self.data_access,
+            )
+        return InProcessSharedState()
+
+    @cached_property
+    def qrcode_service(self) -> QRCodeService:
+        from app.core.qrcode_service import QRCodeService
+
+        return QRCodeService(self.supabase_service_client)
+
+    @cached_property
+    def llm_service(self) -> LLMService:
+        from app.core.llm_service import LLMService
+
+        return LLMService(
             claude_api_key=self.claude_api_key,
             openai_api_key=self.openai_api_key,
             default_system_prompt=self.llm_prompt,
         )
-        self.conversation_store = ConversationStore()
 
-        self.log_service = LogService(self.supabase_service_client)
+    @cached_property
+    def conversation_store(self) -> ConversationBackend:
+        # En modo cluster la conversación tiene que vivir en el store compartido
+        backend = "supabase" if self.cluster_mode else self.conversation_backend.lower()
+        if backend == "sqlite":
+            from app.core.conversation_store_sqlite import SQLiteConversationStore
+
+            return SQLiteConversationStore(
+                path=self.conversation_sqlite_path,
+                idle_ttl_seconds=self.conversation_idle_ttl_seconds,
+            )
+        if backend == "supabase":
+            from app.core.conversation_store_supabase import SupabaseConversationStore
+
+            return SupabaseConversationStore(
+                self.supabase_service_client,
+                idle_ttl_seconds=self.conversation_idle_ttl_seconds,
+                max_contacts=self.conversation_max_contacts,
+            )
+        from app.core.conversation_store import ConversationStore
 
-        self.config_store = ConfigStore(
+        return ConversationStore(
+            idle_ttl_seconds=self.conversation_idle_ttl_seconds,
+            max_contacts=self.conversation_max_contacts,
+        )
+
+    @cached_property
+    def log_service(self) -> LogService:
+        from app.core.log_service import LogService
+
+        return LogService(self.supabase_service_client, data_access=self.data_access)
+
+    @cached_property
+    def config_store(self) -> ConfigStore:
+        from app.core.config_store import ConfigStore
+
+        return ConfigStore(
             supabase=self.supabase_service_client,
             log_service=self.log_service,
+            data_access=self.data_access,
+        )
+
+    @cached_property
+    def remito_events(self) -> RemitoEventBus:
+        from app.core.remito_events import RemitoEventBus, SupabaseRealtimeRelay
+
+        bus = RemitoEventBus(
+            queue_size=self.remito_events_queue_size,
+            max_subscribers=self.remito_events_max_clients,
         )
-        self.remito_service = RemitoService(
+        if self.remito_events_realtime:
+            bus.relay = SupabaseRealtimeRelay(bus.publish, self.supabase_url, self.supabase_service_role_key)
+        return bus
+
+    @cached_property
+    def remito_service(self) -> RemitoService:
+        from app.core.remito_service import RemitoService
+
+        return RemitoService(
             supabase_client=self.supabase_service_client,
             qrcode_service=self.qrcode_service,
             log_service=self.log_service,
+            data_access=self.data_access,
+            shared_state=self.shared_state,
+            # Con Realtime los eventos (también los propios) llegan por la suscripción
+            event_bus=None if self.remito_events.relay else self.remito_events,
         )
-        self.catalog_service = CatalogService(self.supabase_service_client)
-        
-        # Phone service (gestión de teléfonos por empresa)
-        self.phone_service = PhoneService(self.supabase_service_client)
-        
+
+    @cached_property
+    def response_cache(self) -> Optional[ResponseCache]:
+        if self.response_cache_size <= 0:
+            return None
+        from app.core.http_cache import ResponseCache
+
+        cache = ResponseCache(
+            max_entries=self.response_cache_size,
+            ttl_seconds=self.response_cache_ttl_seconds,
+        )
+        self.shared_state.subscribe("remitos", cache.invalidate)
+        return cache
+
+    @cached_property
+    def empresa_context_service(self) -> EmpresaContextService:
         # Empresa context service (catálogos personalizados)
-        self.empresa_context_service = EmpresaContextService(self.supabase_service_client)
-        
+        from app.core.empresa_context_service import EmpresaContextService
+
+        service = EmpresaContextService(
+            self.supabase_service_client,
+            data_access=self.data_access,
+        )
+        self.shared_state.subscribe("empresa_context", service.clear_cache)
+        return service
+
+    @cached_property
+    def remito_summary_service(self) -> RemitoSummaryService:
+        from app.core.remito_summary import RemitoSummaryService
+
+        return RemitoSummaryService(self.data_access)
+
+    @cached_property
+    def catalog_service(self) -> CatalogService:
+        from app.core.catalog_service import CatalogService
+
+        return CatalogService(
+            self.supabase_service_client,
+            shared_state=self.shared_state,
+            data_access=self.data_access,
+            name_resolver=self._build_name_resolver(),
+        )
+
+    @cached_property
+    def driver_profiles(self) -> Optional[DriverProfileCache]:
+        if self.driver_profile_cache_size <= 0:
+            return None
+        from app.core.driver_profiles import DriverProfileCache
+
+        return DriverProfileCache(
+            self.data_access,
+            max_entries=self.driver_profile_cache_size,
+            ttl_seconds=self.driver_profile_ttl_seconds,
+        )
+
+    @cached_property
+    def phone_service(self) -> PhoneService:
+        # Phone service (gestión de teléfonos por empresa)
+        from app.core.phone_service import PhoneService
+
+        return PhoneService(self.supabase_service_client, data_access=self.data_access)
+
+    @cached_property
+    def whatsapp_service(self) -> Optional[WhatsAppService]:
         # WhatsApp service (opcional)
-        self.whatsapp_service = None
-        if self.whatsapp_token and self.whatsapp_phone_id:
-            self.whatsapp_service = WhatsAppService(
-                phone_id=self.whatsapp_phone_id,
-                access_token=self.whatsapp_token,
-                api_version=self.whatsapp_api_version,
-            )
-        
-        # Importar servicios del nuevo sistema
-        from app.services.conversation_service import ConversationService
-        from app.usecases.create_remito_usecase import CreateRemitoUseCase
-        
+        if not (self.whatsapp_token and self.whatsapp_phone_id):
+            return None
+        from app.core.whatsapp_service import WhatsAppService
+
+        return WhatsAppService(
+            phone_id=self.whatsapp_phone_id,
+            access_token=self.whatsapp_token,
+            api_version=self.whatsapp_api_version,
+        )
+
+    @cached_property
+    def remito_flow_v2(self) -> RemitoFlowManagerV2:
         # Flujo conversacional V2 (antiguo - mantenido para compatibilidad)
-        self.remito_flow_v2 = RemitoFlowManagerV2(
+        from app.core.remito_flow_v2 import RemitoFlowManagerV2
+
+        flow = RemitoFlowManagerV2(
             llm_service=self.llm_service,
             catalog_service=self.catalog_service,
             remito_service=self.remito_service,
@@ -123,22 +392,34 @@ class Settings(BaseSettings):
             phone_service=self.phone_service,
             empresa_context_service=self.empresa_context_service,
         )
-        
+        self.shared_state.subscribe("phone_empresas", flow.clear_cache)
+        return flow
+
+    @cached_property
+    def remito_flow_v2_refactored(self) -> RemitoFlowManagerV2Refactored:
         # Nuevo sistema refacturado
+        from app.core.remito_flow_v2_refactored import RemitoFlowManagerV2Refactored
+        from app.services.conversation_service import ConversationService
+        from app.usecases.create_remito_usecase import CreateRemitoUseCase
+
         conversation_service = ConversationService(
             llm_service=self.llm_service,
             conversation_store=self.conversation_store,
             log_service=self.log_service,
+            structured_output=self.llm_structured_output,
+            slot_state=self.conversation_slot_state,
+            profile_cache=self.driver_profiles,
         )
-        
+
         create_remito_usecase = CreateRemitoUseCase(
             remito_service=self.remito_service,
             catalog_service=self.catalog_service,
             qrcode_service=self.qrcode_service,
             log_service=self.log_service,
+            profile_cache=self.driver_profiles,
         )
-        
-        self.remito_flow_v2_refactored = RemitoFlowManagerV2Refactored(
+
+        flow = RemitoFlowManagerV2Refactored(
             conversation_service=conversation_service,
             create_remito_usecase=create_remito_usecase,
             llm_service=self.llm_service,
@@ -147,8 +428,96 @@ class Settings(BaseSettings):
             whatsapp_service=self.whatsapp_service,
             config_store=self.config_store,
             phone_service=self.phone_service,
+            qr_delivery_mode=self.whatsapp_media_mode,
+            shared_state=self.shared_state,
+        )
+        # Invalidaciones de cache publicadas por cualquier réplica
+        self.shared_state.subscribe("phone_empresas", flow.clear_cache)
+        return flow
+
+    @cached_property
+    def admission_controller(self) -> Optional[AdmissionController]:
+        if not self.admission_control:
+            return None
+        from app.core.admission import AdmissionController
+
+        return AdmissionController(
+            initial_limit=self.admission_initial_limit,
+            min_limit=self.admission_min_limit,
+            max_limit=self.admission_max_limit,
+            target_latency_seconds=self.admission_target_latency_seconds,
+            backoff_ratio=self.admission_backoff_ratio,
+        )
+
+    @cached_property
+    def inbound_rate_limiter(self) -> Optional[InboundRateLimiter]:
+        if not self.rate_limit_enabled:
+            return None
+        from app.core.rate_limit import InboundRateLimiter, RateLimits
+        from app.core.shared_state import InProcessSharedState
+
+        # Sin RATE_LIMIT_SHARED no hace falta un viaje a Postgres por mensaje ni en modo cluster
+        store = self.shared_state if self.rate_limit_shared else InProcessSharedState()
+        return InboundRateLimiter(
+            store,
+            RateLimits(
+                per_phone=self.rate_limit_phone_messages,
+                per_empresa=self.rate_limit_empresa_messages,
+                window_seconds=self.rate_limit_window_seconds,
+            ),
+            self.empresa_context_service,
+        )
+
+    @cached_property
+    def auto_reply_throttle(self) -> ReplyThrottle:
+        from app.core.admission import ReplyThrottle
+
+        return ReplyThrottle(self.auto_reply_interval_seconds)
+
+    @cached_property
+    def health_prober(self) -> HealthProber:
+        from app.core.health_probe import HealthProber, supabase_check
+
+        return HealthProber(
+            {"supabase": supabase_check(self.data_access)},
+            interval_seconds=self.health_probe_interval_seconds,
+            timeout_seconds=self.health_probe_timeout_seconds,
+            failure_threshold=self.health_probe_failure_threshold,
         )
 
+    @cached_property
+    def diagnostics_gate(self) -> DiagnosticsGate:
+        from app.core.health_probe import DiagnosticsGate
+
+        return DiagnosticsGate(self.admin_diagnostics_min_interval_seconds)
+
+    def _build_name_resolver(self) -> Optional[CatalogNameResolver]:
+        if not self.catalog_name_resolution:
+            return None
+        from app.core.name_index import CatalogNameResolver
+
+        return CatalogNameResolver(
+            self.empresa_context_service,
+            self.data_access,
+            threshold=self.catalog_match_threshold,
+        )
+
+    def preload_modules(self) -> None:
+        """
+        Importa los módulos del camino del webhook (y Pillow/qrcode) sin construir
+        nada; el lifespan lo corre en un hilo para no frenar los health checks.
+        """
+        for module in CRITICAL_PATH_MODULES:
+            importlib.import_module(module)
+        from app.core.qrcode_service import QRCodeService
+
+        QRCodeService.preload_imaging()
+
+    def warm_up(self) -> None:
+        """Construye los servicios del camino del webhook antes del primer mensaje."""
+        for name in CRITICAL_PATH_SERVICES:
+            getattr(self, name)
+
 
 @lru_cache
 def get_settings() -> Settings:
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from supabase import Client
+
+from app.core.data_access import DataAccess
+from app.core.rate_limit import SlidingWindowCounter
+from app.core.tracing import span
+
+InvalidationCallback = Callable[[Optional[str]], None]
+
+
+class SharedState(ABC):
+    """
+    Estado compartido entre réplicas del backend.
+
+    Cubre cuatro necesidades del modo cluster:
+    - claves de deduplicación (mensajes de WhatsApp reentregados),
+    - invalidación de caches locales en todos los nodos,
+    - afinidad por contacto: un mismo teléfono nunca se procesa en paralelo,
+    - contadores de límite de mensajes por teléfono y empresa.
+    """
+
+    distributed = False
+
+    def __init__(self) -> None:
+        self._subscribers: Dict[str, List[InvalidationCallback]] = {}
+        self._local_locks: Dict[str, List] = {}
+
+    @abstractmethod
+    async def mark_seen(self, key: str, ttl_seconds: float = 24 * 3600) -> bool:
+        """Registra la clave; retorna False si ya había sido vista y no expiró."""
+
+    @abstractmethod
+    async def publish_invalidation(self, scope: str, key: Optional[str] = None) -> None:
+        """Invalida una entrada (o todo el scope si key es None) en todos los nodos."""
+
+    @abstractmethod
+    async def rate_limit_hit(self, key: str, limit: int, window_seconds: int) -> bool:
+        """Cuenta un evento en la ventana deslizante de key; False si supera limit (y no lo cuenta)."""
+
+    async def sync_invalidations(self) -> None:
+        """Aplica invalidaciones publicadas por otros nodos."""
+
+    def subscribe(self, scope: str, callback: InvalidationCallback) -> None:
+        self._subscribers.setdefault(scope, []).append(callback)
+
+    def _dispatch(self, scope: str, key: Optional[str]) -> None:
+        for callback in self._subscribers.get(scope, []):
+            callback(key)
+
+    @asynccontextmanager
+    async def contact_lock(self, contact: str) -> AsyncIterator[None]:
+        """Serializa los turnos de un contacto dentro del proceso y, si aplica, del cluster."""
+        entry = self._local_locks.setdefault(contact, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            with span("contact_lock.wait"):
+                await entry[0].acquire()
+            try:
+                if self.distributed:
+                    with span("contact_lock.remote"):
+                        await self._acquire_remote(contact)
+                try:
+                    yield
+                finally:
+                    await self._release_remote(contact)
+            finally:
+                entry[0].release()
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._local_locks.pop(contact, None)
+
+    async def _acquire_remote(self, contact: str) -> None:
+        return None
+
+    async def _release_remote(self, contact: str) -> None:
+        return None
+
+
+class InProcessSharedState(SharedState):
+    """Implementación en memoria para un solo proceso (default y tests)."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._seen: Dict[str, float] = {}
+        self._rate_windows = SlidingWindowCounter()
+
+    async def mark_seen(self, key: str, ttl_seconds: float = 24 * 3600) -> bool:
+        now = time.monotonic()
+        if len(self._seen) > 10_000:
+            self._seen = {k: exp for k, exp in self._seen.items() if exp > now}
+
+        expires_at = self._seen.get(key)
+        if expires_at is not None and expires_at > now:
+            return False
+        self._seen[key] = now + ttl_seconds
+        return True
+
+    async def publish_invalidation(self, scope: str, key: Optional[str] = None) -> None:
+        self._dispatch(scope, key)
+
+    async def rate_limit_hit(self, key: str, limit: int, window_seconds: int) -> bool:
+        return self._rate_windows.hit(key, limit, window_seconds)
+
+
+class PostgresSharedState(SharedState):
+    """
+    Estado compartido sobre tablas de Supabase (migración 0004_cluster_state.sql).
+
+    Los locks por contacto son leases en cluster_locks; la función
+    cluster_try_lock serializa la toma del lease con pg_advisory_xact_lock.
+    Las invalidaciones se leen por polling de cluster_invalidations.
+    """
+
+    distributed = True
+
+    def __init__(
+        self,
+        supabase_client: Client,
+        *,
+        node_id: Optional[str] = None,
+        lock_ttl_seconds: int = 120,
+        lock_timeout_seconds: float = 90.0,
+        sync_interval_seconds: float = 2.0,
+        data_access: Optional[DataAccess] = None,
+    ) -> None:
+        super().__init__()
+        self.supabase = supabase_client
+        self.db = data_access or DataAccess(supabase_client)
+        self.node_id = node_id or uuid.uuid4().hex
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.lock_timeout_seconds = lock_timeout_seconds
+        self.sync_interval_seconds = sync_interval_seconds
+        self._last_invalidation_id: Optional[int] = None
+        self._last_sync = 0.0
+        self._sync_lock = asyncio.Lock()
+
+    async def mark_seen(self, key: str, ttl_seconds: float = 24 * 3600) -> bool:
+        response = await self.db.execute(
+            lambda c: c.rpc("cluster_mark_seen", {"p_key": key, "p_ttl_seconds": int(ttl_seconds)})
+        )
+        return bool(response.data)
+
+    async def rate_limit_hit(self, key: str, limit: int, window_seconds: int) -> bool:
+        response = await self.db.execute(
+            lambda c: c.rpc(
+                "rate_limit_hit",
+                {"p_key": key, "p_limit": limit, "p_window_seconds": int(window_seconds)},
+            )
+        )
+        return bool(response.data)
+
+    async def publish_invalidation(self, scope: str, key: Optional[str] = None) -> None:
+        # Aplicar localmente de inmediato; el resto de los nodos lo verá en su próximo sync
+        self._dispatch(scope, key)
+        await self.db.execute(
+            lambda c: c.table("cluster_invalidations").insert(
+                {"scope": scope, "key": key, "origin": self.node_id}
+            )
+        )
+
+    async def sync_invalidations(self, force: bool = False) -> None:
+        if not force and time.monotonic() - self._last_sync < self.sync_interval_seconds:
+            return
+
+        async with self._sync_lock:
+            if not force and time.monotonic() - self._last_sync < self.sync_interval_seconds:
+                return
+
+            def _build_poll(client: Any) -> Any:
+                query = client.table("cluster_invalidations").select("id, scope, key, origin")
+                if self._last_invalidation_id is None:
+                    # Primer sync: solo posicionarse al final, los caches arrancan vacíos
+                    return query.order("id", desc=True).limit(1)
+                return query.gt("id", self._last_invalidation_id).order("id").limit(500)
+
+            rows = (await self.db.execute(_build_poll)).data or []
+            self._last_sync = time.monotonic()
+
+            if self._last_invalidation_id is None:
+                self._last_invalidation_id = rows[0]["id"] if rows else 0
+                return
+
+            for row in rows:
+                self._last_invalidation_id = max(self._last_invalidation_id, row["id"])
+                if row.get("origin") != self.node_id:
+                    self._dispatch(row["scope"], row.get("key"))
+
+    async def _acquire_remote(self, contact: str) -> None:
+        async def _try_lock() -> bool:
+            response = await self.db.execute(
+                lambda c: c.rpc(
+                    "cluster_try_lock",
+                    {"p_key": contact, "p_owner": self.node_id, "p_ttl_seconds": self.lock_ttl_seconds},
+                )
+            )
+            return bool(response.data)
+
+        deadline = time.monotonic() + self.lock_timeout_seconds
+        delay = 0.05
+        while not await _try_lock():
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"No se pudo obtener el lock del contacto {contact}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+    async def _release_remote(self, contact: str) -> None:
+        try:
+            await self.db.execute(
+                lambda c: c.rpc("cluster_unlock", {"p_key": contact, "p_owner": self.node_id})
+            )
+        except Exception:
+            # El lease expira solo; no fallar el turno por no poder liberarlo
+            pass
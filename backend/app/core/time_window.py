@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DEFAULT_TIMEZONE = "America/Montevideo"
+
+# Rango semiabierto [inicio, fin) en UTC; None deja ese extremo abierto
+TimeWindow = Tuple[Optional[datetime], Optional[datetime]]
+
+
+def get_timezone(name: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Zona horaria desconocida: {name}") from None
+
+
+def parse_instant(value: str) -> date | datetime:
+    """Fecha (AAAA-MM-DD) u hora ISO 8601 de un parámetro de consulta."""
+    text = value.strip()
+    if "T" in text:
+        # Un "+03:00" sin codificar llega al query string como espacio
+        text = text.replace(" ", "+")
+    try:
+        return date.fromisoformat(text) if len(text) == 10 else datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"Fecha u hora inválida: {value}") from None
+
+
+def _local_start(day: date, tz: ZoneInfo) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=tz).astimezone(timezone.utc)
+
+
+def _as_utc(value: datetime, tz: ZoneInfo) -> datetime:
+    # Un instante sin zona se interpreta como hora local de tz
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=tz)
+    return value.astimezone(timezone.utc)
+
+
+def resolve_window(
+    *,
+    desde: date | datetime | None = None,
+    hasta: date | datetime | None = None,
+    year: int | None = None,
+    month: int | None = None,
+    day: int | None = None,
+    tz: str = DEFAULT_TIMEZONE,
+) -> TimeWindow:
+    """
+    Convierte los filtros de fecha de la API en un único rango [inicio, fin) en UTC.
+
+    `desde`/`hasta` aceptan fecha u hora: una fecha es el día completo en tz
+    (`hasta` incluye ese día), una hora sin zona se toma como hora local de tz.
+    year/month/day (formato anterior) se traducen al período local
+    correspondiente, completando con el año y mes actuales, y se intersectan
+    con desde/hasta. Lanza ValueError si la zona no existe o el rango queda vacío.
+    """
+    zone = get_timezone(tz)
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
+    if desde is not None:
+        start = _as_utc(desde, zone) if isinstance(desde, datetime) else _local_start(desde, zone)
+    if hasta is not None:
+        end = _as_utc(hasta, zone) if isinstance(hasta, datetime) else _local_start(hasta + timedelta(days=1), zone)
+
+    if year is not None or month is not None or day is not None:
+        today = datetime.now(zone).date()
+        period_year = year if year is not None else today.year
+        if day is not None:
+            period_month = month if month is not None else today.month
+            try:
+                first = date(period_year, period_month, day)
+            except ValueError:
+                raise ValueError(f"Fecha inválida: {period_year}-{period_month:02d}-{day:02d}") from None
+            after = first + timedelta(days=1)
+        elif month is not None:
+            first = date(period_year, month, 1)
+            after = date(period_year + 1, 1, 1) if month == 12 else date(period_year, month + 1, 1)
+        else:
+            first = date(period_year, 1, 1)
+            after = date(period_year + 1, 1, 1)
+        period_start, period_end = _local_start(first, zone), _local_start(after, zone)
+        start = period_start if start is None else max(start, period_start)
+        end = period_end if end is None else min(end, period_end)
+
+    if start is not None and end is not None and start >= end:
+        raise ValueError("El rango de fechas está vacío: 'from' debe ser anterior a 'to'")
+    return start, end
@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("remibot.tracing")
+
+
+class Span:
+    """Tramo medido dentro de una traza. Los tiempos son de perf_counter_ns."""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[int], attributes: Dict[str, Any]) -> None:
+        self.trace = trace
+        self.span_id = random.getrandbits(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+
+class Trace:
+    """Conjunto de spans de un mensaje de WhatsApp."""
+
+    __slots__ = ("trace_id", "name", "wall_start_ns", "start_ns", "spans", "dropped", "root")
+
+    def __init__(self, name: str) -> None:
+        self.trace_id = random.getrandbits(128)
+        self.name = name
+        self.wall_start_ns = time.time_ns()
+        self.start_ns = time.perf_counter_ns()
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.root: Optional[Span] = None
+
+    @property
+    def trace_id_hex(self) -> str:
+        return f"{self.trace_id:032x}"
+
+    @property
+    def duration_ms(self) -> float:
+        return self.root.duration_ms if self.root else 0.0
+
+    def to_waterfall(self) -> Dict[str, Any]:
+        """Representación para visualizar como cascada: offset y duración de cada span."""
+        depths: Dict[int, int] = {}
+        rows = []
+        for span in sorted(self.spans, key=lambda s: s.start_ns):
+            depth = depths.get(span.parent_id, -1) + 1 if span.parent_id is not None else 0
+            depths[span.span_id] = depth
+            rows.append(
+                {
+                    "name": span.name,
+                    "span_id": f"{span.span_id:016x}",
+                    "parent_id": f"{span.parent_id:016x}" if span.parent_id is not None else None,
+                    "depth": depth,
+                    "offset_ms": round((span.start_ns - self.start_ns) / 1e6, 3),
+                    "duration_ms": round(span.duration_ms, 3),
+                    "status": span.status,
+                    "attributes": span.attributes,
+                }
+            )
+        return {
+            "trace_id": self.trace_id_hex,
+            "name": self.name,
+            "start": self.wall_start_ns / 1e9,
+            "duration_ms": round(self.duration_ms, 3),
+            "span_count": len(self.spans),
+            "dropped_spans": self.dropped,
+            "spans": rows,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("remibot_current_span", default=None)
+
+
+class OTLPFileExporter:
+    """
+    Escribe cada traza terminada como una línea JSON en formato OTLP/JSON
+    (el mismo que produce el file exporter del OpenTelemetry Collector).
+
+    La escritura se hace en un hilo propio para no bloquear el event loop.
+    """
+
+    def __init__(self, path: str, service_name: str = "remibot-backend", max_pending: int = 1000) -> None:
+        self.path = path
+        self.service_name = service_name
+        self._queue: "queue.Queue[Optional[Trace]]" = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="remibot-otlp-export", daemon=True)
+        self._thread.start()
+
+    def export(self, trace: Trace) -> None:
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            logger.warning("Exportador OTLP saturado, se descarta la traza %s", trace.trace_id_hex)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while True:
+            trace = self._queue.get()
+            if trace is None:
+                return
+            try:
+                line = json.dumps(self._to_otlp(trace), ensure_ascii=False, default=str)
+                with open(self.path, "a", encoding="utf-8") as handle:
+                    handle.write(line + "\n")
+            except Exception:
+                logger.exception("No se pudo exportar la traza %s", trace.trace_id_hex)
+
+    def _to_otlp(self, trace: Trace) -> Dict[str, Any]:
+        def _nanos(perf_ns: int) -> str:
+            return str(trace.wall_start_ns + (perf_ns - trace.start_ns))
+
+        spans = [
+            {
+                "traceId": trace.trace_id_hex,
+                "spanId": f"{span.span_id:016x}",
+                "parentSpanId": f"{span.parent_id:016x}" if span.parent_id is not None else "",
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": _nanos(span.start_ns),
+                "endTimeUnixNano": _nanos(span.end_ns if span.end_ns is not None else span.start_ns),
+                "attributes": [
+                    {"key": key, "value": {"stringValue": str(value)}} for key, value in span.attributes.items()
+                ],
+                # 1 = OK, 2 = ERROR
+                "status": {"code": 2 if span.status == "error" else 1},
+            }
+            for span in trace.spans
+        ]
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]
+                    },
+                    "scopeSpans": [{"scope": {"name": "remibot"}, "spans": spans}],
+                }
+            ]
+        }
+
+
+class _NoopScope:
+    """Context manager vacío para spans fuera de traza; se reutiliza una sola instancia."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NOOP_SCOPE = _NoopScope()
+
+
+class _SpanScope:
+    """Context manager de un span hijo (clase en lugar de generador por costo)."""
+
+    __slots__ = ("span", "token")
+
+    def __init__(self, span: Span) -> None:
+        self.span = span
+        self.token = None
+
+    def __enter__(self) -> Span:
+        self.span.trace.spans.append(self.span)
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.span.end_ns = time.perf_counter_ns()
+        if exc_type is not None:
+            self.span.status = "error"
+        _current_span.reset(self.token)
+
+
+class Tracer:
+    """
+    Tracer liviano basado en contextvars.
+
+    Una traza se abre con start_trace() y los spans hijos se cuelgan del span
+    actual del contexto, así que atraviesan awaits y las llamadas a executors
+    (que copian el contexto). Fuera de una traza, span() no registra nada.
+    """
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = True,
+        buffer_size: int = 200,
+        max_spans_per_trace: int = 500,
+        exporter: Optional[OTLPFileExporter] = None,
+    ) -> None:
+        self.enabled = enabled
+        self.max_spans_per_trace = max_spans_per_trace
+        self.exporter = exporter
+        self._finished: Deque[Trace] = deque(maxlen=buffer_size)
+
+    @contextmanager
+    def start_trace(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        if not self.enabled:
+            yield None
+            return
+
+        trace = Trace(name)
+        root = Span(trace, name, None, attributes)
+        trace.root = root
+        trace.spans.append(root)
+        token = _current_span.set(root)
+        try:
+            yield root
+        except BaseException:
+            root.status = "error"
+            raise
+        finally:
+            root.end_ns = time.perf_counter_ns()
+            _current_span.reset(token)
+            self._finish(trace)
+
+    def span(self, name: str, **attributes: Any) -> "_SpanScope | _NoopScope":
+        parent = _current_span.get()
+        if parent is None:
+            return _NOOP_SCOPE
+
+        trace = parent.trace
+        if len(trace.spans) >= self.max_spans_per_trace:
+            trace.dropped += 1
+            return _NOOP_SCOPE
+        return _SpanScope(Span(trace, name, parent.span_id, attributes))
+
+    def current_trace_id(self) -> Optional[str]:
+        span = _current_span.get()
+        return span.trace.trace_id_hex if span is not None else None
+
+    def recent_traces(self, *, min_duration_ms: float = 0.0, limit: int = 20) -> List[Dict[str, Any]]:
+        """Trazas terminadas más recientes que superan min_duration_ms, en formato cascada."""
+        selected = [trace for trace in reversed(self._finished) if trace.duration_ms >= min_duration_ms]
+        return [trace.to_waterfall() for trace in selected[:limit]]
+
+    def get_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        for trace in self._finished:
+            if trace.trace_id_hex == trace_id:
+                return trace.to_waterfall()
+        return None
+
+    def close(self) -> None:
+        if self.exporter is not None:
+            self.exporter.close()
+
+    def _finish(self, trace: Trace) -> None:
+        self._finished.append(trace)
+        if self.exporter is not None:
+            self.exporter.export(trace)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def configure_tracing(
+    *,
+    enabled: bool = True,
+    buffer_size: int = 200,
+    max_spans_per_trace: int = 500,
+    otlp_file: Optional[str] = None,
+) -> Tracer:
+    """Crea (o reemplaza) el tracer global."""
+    global _tracer
+    previous = _tracer
+    _tracer = Tracer(
+        enabled=enabled,
+        buffer_size=buffer_size,
+        max_spans_per_trace=max_spans_per_trace,
+        exporter=OTLPFileExporter(otlp_file) if otlp_file else None,
+    )
+    if previous is not None:
+        previous.close()
+    return _tracer
+
+
+def get_tracer() -> Tracer:
+    if _tracer is None:
+        return configure_tracing()
+    return _tracer
+
+
+def span(name: str, **attributes: Any):
+    """Atajo para get_tracer().span(...)."""
+    return get_tracer().span(name, **attributes)
@@ -1,24 +1,38 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Optional
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
 
 import httpx
 
+from app.core.metrics import STAGE_WHATSAPP_SEND, STAGE_WHATSAPP_UPLOAD, WHATSAPP_REQUESTS, observe_stage
+
 
 class WhatsAppService:
     """Servicio para enviar mensajes e imágenes por WhatsApp Cloud API."""
 
+    # Meta conserva los media subidos durante 30 días; renovamos antes de que expiren
+    MEDIA_ID_TTL_SECONDS = 29 * 24 * 3600
+    MEDIA_CACHE_SIZE = 512
+
     def __init__(
         self,
         phone_id: str,
         access_token: str,
         api_version: str = "v18.0",
+        transport: Optional[httpx.AsyncBaseTransport] = None,
     ) -> None:
         self.phone_id = phone_id
         self.access_token = access_token
         self.api_version = api_version
         self.base_url = f"https://graph.facebook.com/{api_version}/{phone_id}/messages"
+        self.media_url = f"https://graph.facebook.com/{api_version}/{phone_id}/media"
+        # Permite apuntar a una Graph API simulada (benchmarks de carga)
+        self.transport = transport
+        # cache_key (id_remito) -> (media_id, timestamp de subida)
+        self._media_cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
 
     async def send_text(self, to: str, text: str) -> dict:
         """Envía un mensaje de texto por WhatsApp."""
@@ -35,18 +49,22 @@ class WhatsAppService:
     async def send_image(
         self,
         to: str,
-        image_url: str,
+        image_url: Optional[str] = None,
         caption: Optional[str] = None,
+        *,
+        media_id: Optional[str] = None,
     ) -> dict:
-        """Envía una imagen por WhatsApp."""
+        """Envía una imagen por WhatsApp, por link público o por media id."""
+        if not image_url and not media_id:
+            raise ValueError("Se requiere image_url o media_id para enviar una imagen")
+
+        image = {"id": media_id} if media_id else {"link": image_url}
         payload = {
             "messaging_product": "whatsapp",
             "recipient_type": "individual",
             "to": to,
             "type": "image",
-            "image": {
-                "link": image_url,
-            },
+            "image": image,
         }
 
         if caption:
@@ -54,16 +72,97 @@ class WhatsAppService:
 
         return await self._send_request(payload)
 
+    async def upload_media(
+        self,
+        data: bytes,
+        *,
+        mime_type: str = "image/png",
+        filename: str = "remito.png",
+    ) -> str:
+        """Sube bytes al endpoint /media y retorna el media id asignado por Meta."""
+        outcome = "error"
+        try:
+            with observe_stage(STAGE_WHATSAPP_UPLOAD):
+                async with httpx.AsyncClient(timeout=30.0, transport=self.transport) as client:
+                    response = await client.post(
+                        self.media_url,
+                        data={"messaging_product": "whatsapp", "type": mime_type},
+                        files={"file": (filename, data, mime_type)},
+                        headers={"Authorization": f"Bearer {self.access_token}"},
+                    )
+                    response.raise_for_status()
+                    media_id = response.json().get("id")
+            outcome = "ok"
+        finally:
+            WHATSAPP_REQUESTS.labels(kind="media_upload", outcome=outcome).inc()
+
+        if not media_id:
+            raise RuntimeError("La API de WhatsApp no devolvió un media id")
+        return media_id
+
+    async def send_image_bytes(
+        self,
+        to: str,
+        data: bytes,
+        *,
+        cache_key: Optional[str] = None,
+        caption: Optional[str] = None,
+        mime_type: str = "image/png",
+    ) -> dict:
+        """
+        Envía una imagen en memoria: la sube una sola vez y la envía por media id.
+
+        Si se indica cache_key (por ejemplo el id del remito) el media id se
+        reutiliza en reenvíos posteriores sin volver a subir la imagen.
+        """
+        media_id = self.get_cached_media_id(cache_key) if cache_key else None
+        if not media_id:
+            filename = f"{cache_key}.png" if cache_key else "remito.png"
+            media_id = await self.upload_media(data, mime_type=mime_type, filename=filename)
+            if cache_key:
+                self._remember_media_id(cache_key, media_id)
+
+        return await self.send_image(to=to, caption=caption, media_id=media_id)
+
+    def get_cached_media_id(self, cache_key: str) -> Optional[str]:
+        entry = self._media_cache.get(cache_key)
+        if not entry:
+            return None
+
+        media_id, uploaded_at = entry
+        if time.monotonic() - uploaded_at > self.MEDIA_ID_TTL_SECONDS:
+            self._media_cache.pop(cache_key, None)
+            return None
+
+        self._media_cache.move_to_end(cache_key)
+        return media_id
+
+    def forget_media_id(self, cache_key: str) -> None:
+        self._media_cache.pop(cache_key, None)
+
+    def _remember_media_id(self, cache_key: str, media_id: str) -> None:
+        self._media_cache[cache_key] = (media_id, time.monotonic())
+        self._media_cache.move_to_end(cache_key)
+        while len(self._media_cache) > self.MEDIA_CACHE_SIZE:
+            self._media_cache.popitem(last=False)
+
     async def _send_request(self, payload: dict) -> dict:
         """Envía una petición a la API de WhatsApp."""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                self.base_url,
-                json=payload,
-                headers={
-                    "Authorization": f"Bearer {self.access_token}",
-                    "Content-Type": "application/json",
-                },
-            )
-            response.raise_for_status()
-            return response.json()
+        outcome = "error"
+        try:
+            with observe_stage(STAGE_WHATSAPP_SEND):
+                async with httpx.AsyncClient(timeout=30.0, transport=self.transport) as client:
+                    response = await client.post(
+                        self.base_url,
+                        json=payload,
+                        headers={
+                            "Authorization": f"Bearer {self.access_token}",
+                            "Content-Type": "application/json",
+                        },
+                    )
+                    response.raise_for_status()
+                    result = response.json()
+            outcome = "ok"
+            return result
+        finally:
+            WHATSAPP_REQUESTS.labels(kind=payload.get("type", "unknown"), outcome=outcome).inc()
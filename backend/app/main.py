@@ -1,12 +1,59 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api import router as api_router
+from app.core.settings import get_settings
+
+logger = logging.getLogger("remibot.startup")
+
+
+async def _warm_up() -> None:
+    """
+    Prepara el camino del webhook después de que la app ya escucha: los
+    imports pesados en un hilo (el loop sigue respondiendo health checks) y
+    la construcción de los servicios en el loop, donde se usan.
+    """
+    started = time.perf_counter()
+    try:
+        settings = get_settings()
+        if not settings.startup_warmup:
+            return
+        await asyncio.to_thread(settings.preload_modules)
+        settings.warm_up()
+    except Exception:
+        # Sin warm-up todo se construye con el primer pedido; el error vuelve a aparecer ahí
+        logger.exception("Falló el precalentamiento del arranque")
+        return
+    logger.info("Camino del webhook precalentado en %.0f ms", (time.perf_counter() - started) * 1000)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # En segundo plano: el arranque no espera al warm-up (STARTUP_WARMUP)
+    app.state.warmup = asyncio.create_task(_warm_up())
+    prober = None
+    try:
+        prober = get_settings().health_prober
+        prober.start()
+    except Exception:
+        # Sin configuración válida /readyz queda en 503; el error se repite en cada pedido que usa Settings
+        logger.exception("No se pudo iniciar el prober de salud")
+    try:
+        yield
+    finally:
+        app.state.warmup.cancel()
+        if prober is not None:
+            await prober.stop()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="RemiBOT Backend", version="0.1.0")
-    
+    app = FastAPI(title="RemiBOT Backend", version="0.1.0", lifespan=lifespan)
+
     # Configurar CORS para permitir requests del frontend
     app.add_middleware(
         CORSMiddleware,
@@ -14,13 +61,15 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # El frontend lee el ETag para mandar If-None-Match en el próximo GET
+        expose_headers=["ETag", "Last-Modified"],
     )
-    
+
     # Health check endpoint para Railway
     @app.get("/")
     async def health_check():
         return {"status": "ok", "service": "RemiBOT Backend"}
-    
+
     app.include_router(api_router)
     return app
 
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -40,3 +40,44 @@ class Remito(RemitoBase):
     id_remito: str
     qr_url: Optional[str] = None
     timestamp_creacion: datetime
+
+
+class RemitoBulkItem(BaseModel):
+    """Resultado de un remito dentro de una carga masiva."""
+
+    indice: int = Field(..., description="Posición del remito en la lista enviada")
+    ok: bool
+    remito: Optional[Remito] = None
+    error: Optional[str] = None
+
+
+class RemitoBulkResponse(BaseModel):
+    creados: int
+    fallidos: int
+    resultados: List[RemitoBulkItem]
+
+
+class RemitoResumenGrupo(BaseModel):
+    """Totales de un grupo; solo vienen las columnas de las dimensiones pedidas."""
+
+    dia: Optional[date] = None
+    mes: Optional[str] = None
+    id_empresa: Optional[str] = None
+    nombre_empresa: Optional[str] = None
+    id_establecimiento: Optional[str] = None
+    nombre_establecimiento: Optional[str] = None
+    id_chacra: Optional[str] = None
+    nombre_chacra: Optional[str] = None
+    id_destino: Optional[str] = None
+    nombre_destino: Optional[str] = None
+    cantidad: int
+    toneladas: float
+
+
+class RemitoResumen(BaseModel):
+    desde: Optional[date] = None
+    hasta: Optional[date] = None
+    agrupar: List[str]
+    cantidad: int
+    toneladas: float
+    grupos: List[RemitoResumenGrupo]
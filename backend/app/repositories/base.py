@@ -1,123 +1,102 @@
 from __future__ import annotations
 
-import asyncio
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar
+from typing import Any, Callable, Dict, Generic, List, Optional, Type, TypeVar
 
 from supabase import Client
 
+from app.core.data_access import DataAccess
+
 T = TypeVar("T")
 
 
 class BaseRepository(Generic[T]):
-    """Repositorio base para eliminar duplicación en acceso a datos."""
-
-    def __init__(self, supabase_client: Client, table_name: str, model_class: Type[T]):
+    """
+    Repositorio base para eliminar duplicación en acceso a datos.
+
+    Las operaciones genéricas usan DataAccess (cliente PostgREST async si está
+    configurado). Los repositorios hijos que todavía tienen closures sync
+    pueden seguir usando _async_call mientras migran a _execute.
+    """
+
+    def __init__(
+        self,
+        supabase_client: Client,
+        table_name: str,
+        model_class: Type[T],
+        data_access: Optional[DataAccess] = None,
+    ):
         self.supabase = supabase_client
         self.table_name = table_name
         self.model_class = model_class
+        self.db = data_access or DataAccess(supabase_client)
 
     async def get_by_id(self, id_value: str, id_field: str = "id") -> Optional[T]:
         """Obtiene un registro por ID."""
-        def _get_sync() -> Optional[Dict[str, Any]]:
-            response = (
-                self.supabase.table(self.table_name)
-                .select("*")
-                .eq(id_field, id_value)
-                .limit(1)
-                .execute()
-            )
-            return response.data[0] if response.data else None
-
-        record = await asyncio.to_thread(_get_sync)
-        return self._record_to_model(record) if record else None
+        return await self.get_by_field(id_field, id_value)
 
     async def get_by_field(self, field_name: str, field_value: Any) -> Optional[T]:
         """Obtiene un registro por cualquier campo."""
-        def _get_sync() -> Optional[Dict[str, Any]]:
-            response = (
-                self.supabase.table(self.table_name)
-                .select("*")
-                .eq(field_name, field_value)
-                .limit(1)
-                .execute()
-            )
-            return response.data[0] if response.data else None
-
-        record = await asyncio.to_thread(_get_sync)
+        response = await self._execute(
+            lambda c: c.table(self.table_name).select("*").eq(field_name, field_value).limit(1)
+        )
+        record = response.data[0] if response.data else None
         return self._record_to_model(record) if record else None
 
     async def get_all(self, order_by: Optional[str] = None, limit: Optional[int] = None) -> List[T]:
         """Obtiene todos los registros."""
-        def _get_all_sync() -> List[Dict[str, Any]]:
-            query = self.supabase.table(self.table_name).select("*")
-            
+        def _build(client: Any) -> Any:
+            query = client.table(self.table_name).select("*")
             if order_by:
                 query = query.order(order_by)
             if limit:
                 query = query.limit(limit)
-                
-            response = query.execute()
-            return response.data or []
+            return query
 
-        records = await asyncio.to_thread(_get_all_sync)
-        return [self._record_to_model(record) for record in records]
+        response = await self._execute(_build)
+        return [self._record_to_model(record) for record in response.data or []]
 
     async def create(self, data: Dict[str, Any]) -> T:
         """Crea un nuevo registro."""
-        def _create_sync() -> Dict[str, Any]:
-            response = self.supabase.table(self.table_name).insert(data).execute()
-            return response.data[0] if response.data else data
-
-        record = await asyncio.to_thread(_create_sync)
+        response = await self._execute(lambda c: c.table(self.table_name).insert(data))
+        record = response.data[0] if response.data else data
         return self._record_to_model(record)
 
     async def update(self, id_value: str, data: Dict[str, Any], id_field: str = "id") -> Optional[T]:
         """Actualiza un registro existente."""
-        def _update_sync() -> Optional[Dict[str, Any]]:
-            response = (
-                self.supabase.table(self.table_name)
-                .update(data)
-                .eq(id_field, id_value)
-                .execute()
-            )
-            return response.data[0] if response.data else None
-
-        record = await asyncio.to_thread(_update_sync)
+        response = await self._execute(
+            lambda c: c.table(self.table_name).update(data).eq(id_field, id_value)
+        )
+        record = response.data[0] if response.data else None
         return self._record_to_model(record) if record else None
 
     async def delete(self, id_value: str, id_field: str = "id") -> bool:
         """Elimina un registro (soft delete si tiene campo activo)."""
-        def _delete_sync() -> bool:
-            response = (
-                self.supabase.table(self.table_name)
-                .update({"activo": False})
-                .eq(id_field, id_value)
-                .execute()
-            )
-            return bool(response.data)
-
-        result = await asyncio.to_thread(_delete_sync)
-        return result
+        response = await self._execute(
+            lambda c: c.table(self.table_name).update({"activo": False}).eq(id_field, id_value)
+        )
+        return bool(response.data)
 
     async def get_or_create(self, data: Dict[str, Any], unique_fields: List[str]) -> T:
         """Obtiene o crea un registro basado en campos únicos."""
-        # Buscar por campos únicos
-        query = self.supabase.table(self.table_name).select("*")
-        
-        for field in unique_fields:
-            if field in data:
-                query = query.eq(field, data[field])
-        
-        def _get_or_create_sync() -> Dict[str, Any]:
-            response = query.limit(1).execute()
-            if response.data:
-                return response.data[0]
-            
-            created = self.supabase.table(self.table_name).insert(data).execute()
-            return created.data[0] if created.data else data
-
-        record = await asyncio.to_thread(_get_or_create_sync)
-        return self._record_to_model(record)
+        def _build_lookup(client: Any) -> Any:
+            query = client.table(self.table_name).select("*")
+            for field in unique_fields:
+                if field in data:
+                    query = query.eq(field, data[field])
+            return query.limit(1)
+
+        response = await self._execute(_build_lookup)
+        if response.data:
+            return self._record_to_model(response.data[0])
+        return await self.create(data)
+
+    async def _execute(self, build: Callable[[Any], Any]) -> Any:
+        """Ejecuta un request builder de PostgREST sobre el cliente configurado."""
+        return await self.db.execute(build)
+
+    async def _async_call(self, fn: Callable[[], Any]) -> Any:
+        """Ejecuta una closure sync (basada en self.supabase) sin bloquear el event loop."""
+        return await self.db.run_sync(fn)
 
     def _record_to_model(self, record: Dict[str, Any]) -> T:
         """Convierte un registro de Supabase al modelo correspondiente."""
@@ -2,14 +2,15 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
 
+from app.core.data_access import DataAccess
 from app.repositories.base import BaseRepository
 
 
 class DestinoRepository(BaseRepository[Dict[str, Any]]):
     """Repositorio para gestionar destinos."""
 
-    def __init__(self, supabase_client) -> None:
-        super().__init__(supabase_client, "destinos", dict)
+    def __init__(self, supabase_client, data_access: Optional[DataAccess] = None) -> None:
+        super().__init__(supabase_client, "destinos", dict, data_access)
 
     async def get_by_name(self, nombre: str) -> Optional[Dict[str, Any]]:
         """Obtiene un destino por su nombre."""
@@ -2,14 +2,15 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
 
+from app.core.data_access import DataAccess
 from app.repositories.base import BaseRepository
 
 
 class EstablecimientoRepository(BaseRepository[Dict[str, Any]]):
     """Repositorio para gestionar establecimientos."""
 
-    def __init__(self, supabase_client) -> None:
-        super().__init__(supabase_client, "establecimientos", dict)
+    def __init__(self, supabase_client, data_access: Optional[DataAccess] = None) -> None:
+        super().__init__(supabase_client, "establecimientos", dict, data_access)
 
     async def get_by_name_and_empresa(self, nombre: str, empresa_id: str) -> Optional[Dict[str, Any]]:
         """Obtiene un establecimiento por nombre y empresa."""
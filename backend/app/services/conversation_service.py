@@ -1,13 +1,26 @@
 from __future__ import annotations
 
 import json
-import re
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from app.core.conversation_store import ConversationStore
+from app.core.conversation_store import ConversationBackend
+from app.core.driver_profiles import DriverProfileCache
+from app.core.json_extractor import REMITO_FORBIDDEN_FIELDS, REMITO_REQUIRED_KEYS, extract_remito_json
 from app.core.llm_service import LLMService
+from app.core.llm_tools import CREATE_REMITO_SPEC, CREATE_REMITO_TOOL, SLOT_UPDATE_SPEC, UPDATE_SLOTS_TOOL, LLMReply
 from app.core.log_service import LogService
+from app.core.metrics import (
+    JSON_EXTRACTION,
+    LLM_REPLY_FORMAT,
+    REMITO_VALIDATION,
+    STAGE_JSON_EXTRACTION,
+    STAGE_LLM,
+    STAGE_VALIDATION,
+    TURNS_PER_REMITO,
+    observe_stage,
+)
 from app.core.prompts import load_system_prompt
+from app.services.slot_state import SLOT_LABELS, SLOT_ROLE, SlotState
 from app.services.validation_service import RemitoValidator
 
 
@@ -17,22 +30,39 @@ class ConversationService:
     def __init__(
         self,
         llm_service: LLMService,
-        conversation_store: ConversationStore,
+        conversation_store: ConversationBackend,
         log_service: LogService,
+        structured_output: bool = False,
+        slot_state: bool = False,
+        profile_cache: Optional[DriverProfileCache] = None,
     ) -> None:
         self.llm_service = llm_service
         self.conversation_store = conversation_store
         self.log_service = log_service
+        # Con salida estructurada el remito llega como llamada a create_remito
+        # en lugar de un JSON escrito dentro del texto
+        self.structured_output = structured_output
+        # Con estado de slots el LLM recibe solo los datos ya validados y el
+        # último mensaje (prompt de tamaño constante); requiere salida estructurada
+        self.slot_state = slot_state and structured_output
+        self._slot_instructions = load_system_prompt("slot_state") or ""
+        # Perfil del último remito del teléfono para precargar el estado
+        self.profile_cache = profile_cache
 
     async def process_message(
         self,
         phone: str,
         message: str,
         system_prompt: str,
+        empresa_ids: Sequence[str] = (),
     ) -> Tuple[str, Optional[Dict[str, Any]]]:
         """
         Procesa un mensaje de WhatsApp.
-        
+
+        empresa_ids son las empresas actuales del teléfono. Sin empresas (no
+        registrado) solo conversa: sin slots ni herramienta de remito, nunca
+        retorna datos de remito.
+
         Returns:
             Tuple de (respuesta_texto, datos_json_opcional)
         """
@@ -44,26 +74,59 @@ class ConversationService:
             self.conversation_store.clear(phone)
             return "Proceso cancelado. Escribe 'crear remito' cuando quieras empezar de nuevo.", None
 
+        if not empresa_ids:
+            return await self._process_unregistered(phone, message, system_prompt)
+
+        if self.slot_state:
+            return await self._process_with_slots(phone, message, system_prompt, empresa_ids)
+
         # Obtener historial de conversación
-        history = self.conversation_store.get_recent(phone, limit=20)
+        history = [
+            entry
+            for entry in self.conversation_store.get_recent(phone, limit=20)
+            if entry["role"] != SLOT_ROLE
+        ]
 
         # Generar respuesta del LLM
-        llm_response = await self.llm_service.run_dialogue(
-            system_prompt=system_prompt,
-            user_message=message,
-            conversation_history=history,
-        )
+        mode = "tools" if self.structured_output else "text"
+        with observe_stage(STAGE_LLM):
+            if self.structured_output:
+                reply = await self.llm_service.run_structured(
+                    tool=CREATE_REMITO_SPEC,
+                    system_prompt=system_prompt,
+                    user_message=message,
+                    conversation_history=history,
+                )
+            else:
+                reply = LLMReply(
+                    text=await self.llm_service.run_dialogue(
+                        system_prompt=system_prompt,
+                        user_message=message,
+                        conversation_history=history,
+                    )
+                )
 
-        # Guardar respuesta del asistente
-        self.conversation_store.append(phone, "assistant", llm_response)
+        # Obtener el remito: primero de la herramienta, si no del texto
+        with observe_stage(STAGE_JSON_EXTRACTION):
+            json_data, kind = self._remito_from_reply(reply)
+        JSON_EXTRACTION.labels(outcome="found" if json_data else "not_found").inc()
+        LLM_REPLY_FORMAT.labels(mode=mode, kind=kind).inc()
 
-        # Detectar si la respuesta es JSON
-        json_data = self._extract_json(llm_response)
+        # Guardar respuesta del asistente (el historial es solo texto, así que
+        # una llamada a la herramienta se guarda como su JSON)
+        llm_response = reply.text
+        if kind == "tool_call":
+            llm_response = json.dumps(reply.tool_call.arguments, ensure_ascii=False)
+        self.conversation_store.append(phone, "assistant", llm_response)
 
         if json_data:
             # Validar el JSON antes de retornarlo
-            validation_result = RemitoValidator.validate_json_remito(json_data)
+            with observe_stage(STAGE_VALIDATION):
+                validation_result = RemitoValidator.validate_json_remito(json_data)
+            REMITO_VALIDATION.labels(outcome="valid" if validation_result.is_valid else "invalid").inc()
             if validation_result.is_valid:
+                user_turns = sum(1 for entry in history if entry.get("role") == "user")
+                TURNS_PER_REMITO.labels(mode=mode).observe(max(user_turns, 1))
                 return "", validation_result.normalized_data
             else:
                 # Si hay errores de validación, informar al usuario
@@ -73,6 +136,119 @@ class ConversationService:
 
         return llm_response, None
 
+    async def _process_unregistered(
+        self,
+        phone: str,
+        message: str,
+        system_prompt: str,
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Turno de un teléfono sin empresa: quién crea remitos lo decide el código, no el prompt."""
+        history = [
+            entry
+            for entry in self.conversation_store.get_recent(phone, limit=20)
+            if entry["role"] != SLOT_ROLE
+        ]
+        with observe_stage(STAGE_LLM):
+            response = await self.llm_service.run_dialogue(
+                system_prompt=system_prompt,
+                user_message=message,
+                conversation_history=history,
+            )
+        LLM_REPLY_FORMAT.labels(mode="unregistered", kind="text").inc()
+        self.conversation_store.append(phone, "assistant", response)
+        return response, None
+
+    async def _process_with_slots(
+        self,
+        phone: str,
+        message: str,
+        system_prompt: str,
+        empresa_ids: Sequence[str],
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Turno en modo estado de slots: actualiza los datos validados y pide el resto."""
+        state = self.get_slot_state(phone)
+        if state.turns == 0 and self.profile_cache is not None:
+            # Viaje repetido: con los datos del último remito alcanza con confirmar,
+            # siempre que ese remito sea de una empresa a la que el teléfono sigue asociado
+            profile = await self.profile_cache.get(phone)
+            if profile is not None and profile.belongs_to(empresa_ids):
+                state.values = profile.as_slots()
+                state.prefilled = True
+        state.turns += 1
+        prompt = f"{system_prompt}\n\n{self._slot_instructions}\n\n{state.to_prompt()}"
+
+        with observe_stage(STAGE_LLM):
+            reply = await self.llm_service.run_structured(
+                tool=SLOT_UPDATE_SPEC,
+                system_prompt=prompt,
+                user_message=message,
+                conversation_history=[],
+            )
+
+        # Equivalente a _remito_from_reply en este modo: los datos llegan como
+        # argumentos de update_slots
+        updates: Dict[str, Any] = {}
+        with observe_stage(STAGE_JSON_EXTRACTION):
+            if reply.tool_call is not None and reply.tool_call.name == UPDATE_SLOTS_TOOL:
+                updates = reply.tool_call.arguments
+                kind = "slot_update"
+            else:
+                kind = "invalid_json" if reply.malformed else "text"
+        LLM_REPLY_FORMAT.labels(mode="slots", kind=kind).inc()
+
+        # La confirmación solo cuenta si el resumen ya se mostró y este turno
+        # no cambió ningún dato (apply() la invalida si hubo correcciones)
+        with observe_stage(STAGE_VALIDATION):
+            errors = state.apply(updates)
+        confirmed = bool(updates.get("confirmado")) and state.confirmation_requested and not errors
+
+        if state.complete and confirmed:
+            remito_data = dict(state.values)
+            with observe_stage(STAGE_VALIDATION):
+                validation_result = RemitoValidator.validate_json_remito(remito_data)
+            REMITO_VALIDATION.labels(outcome="valid" if validation_result.is_valid else "invalid").inc()
+            if validation_result.is_valid:
+                JSON_EXTRACTION.labels(outcome="found").inc()
+                TURNS_PER_REMITO.labels(mode="slots").observe(state.turns)
+                self._save_slot_state(phone, state)
+                # normalized_data no incluye la zorra: se conserva la del estado
+                return "", {**remito_data, **validation_result.normalized_data}
+            errors = validation_result.errors
+
+        JSON_EXTRACTION.labels(outcome="not_found").inc()
+        if state.complete and not errors:
+            # Este turno mostró (o repitió) el resumen: el próximo puede confirmarlo
+            state.confirmation_requested = True
+
+        response = reply.text or self._next_question(state)
+        if errors:
+            response = self._build_slot_error_message(errors) + (f"\n\n{reply.text}" if reply.text else "")
+        self._save_slot_state(phone, state)
+        self.conversation_store.append(phone, "assistant", response)
+        return response, None
+
+    def get_slot_state(self, phone: str) -> SlotState:
+        """Último estado de slots guardado para el contacto (vacío si no hay)."""
+        for entry in reversed(self.conversation_store.get_recent(phone, limit=4)):
+            if entry["role"] == SLOT_ROLE:
+                return SlotState.from_json(entry["content"])
+        return SlotState()
+
+    def _save_slot_state(self, phone: str, state: SlotState) -> None:
+        self.conversation_store.append(phone, SLOT_ROLE, state.to_json())
+
+    @staticmethod
+    def _next_question(state: SlotState) -> str:
+        if state.complete:
+            return "Tengo todos los datos del remito. ¿Confirmás que está todo correcto? ✅"
+        return "📝 Para crear el remito me falta: " + ", ".join(SLOT_LABELS[name] for name in state.missing)
+
+    @staticmethod
+    def _build_slot_error_message(errors: List[str]) -> str:
+        message = "❌ *Hay datos para corregir:*\n\n"
+        message += "".join(f"• {error}\n" for error in errors)
+        return message.rstrip()
+
     def clear_conversation(self, phone: str) -> None:
         """Limpia la conversación para un número específico."""
         self.conversation_store.clear(phone)
@@ -93,29 +269,28 @@ class ConversationService:
 
     def _extract_json(self, text: str) -> Optional[Dict[str, Any]]:
         """Extrae y valida JSON de una respuesta de texto."""
-        # Buscar bloques JSON en el texto
-        json_pattern = r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}'
-        matches = re.findall(json_pattern, text, re.DOTALL)
-
-        for match in matches:
-            try:
-                data = json.loads(match)
-                # Verificar que tenga los campos esperados de un remito
-                if isinstance(data, dict) and "nombre_empresa" in data and "peso_estimado_tn" in data:
-                    # Limpiar campos que no deben venir del LLM
-                    unwanted_fields = [
-                        "id_remito", "qr_url", "timestamp_creacion", 
-                        "id_chacra", "id_establecimiento", "id_empresa", "id_destino",
-                        "estado_remito", "activo", "raw_payload"
-                    ]
-                    for field in unwanted_fields:
-                        data.pop(field, None)
-                    
-                    return data
-            except json.JSONDecodeError:
-                continue
-
-        return None
+        return extract_remito_json(text)
+
+    def _remito_from_reply(self, reply: LLMReply) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Retorna (datos del remito o None, forma de la respuesta).
+
+        La forma es tool_call, text_json (JSON escrito en el texto), text
+        (respuesta conversacional) o invalid_json (se intentó un remito pero
+        no se pudo leer).
+        """
+        if reply.tool_call is not None and reply.tool_call.name == CREATE_REMITO_TOOL:
+            data = dict(reply.tool_call.arguments)
+            for field in REMITO_FORBIDDEN_FIELDS:
+                data.pop(field, None)
+            return data, "tool_call"
+
+        json_data = self._extract_json(reply.text)
+        if json_data:
+            return json_data, "text_json"
+        if reply.malformed or any(f'"{key}"' in reply.text for key in REMITO_REQUIRED_KEYS):
+            return None, "invalid_json"
+        return None, "text"
 
     def _build_validation_error_message(self, validation_result: RemitoValidator.ValidationResult) -> str:
         """Construye un mensaje de error amigable para el usuario."""
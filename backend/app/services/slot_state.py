@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.core.llm_tools import REMITO_LLM_FIELDS
+from app.services.validation_service import RemitoValidator
+
+# Rol con el que el estado se guarda en el almacén de conversación: así viaja
+# con el mismo backend (memoria, SQLite o Supabase) y se borra junto con él
+SLOT_ROLE = "slots"
+
+SLOT_LABELS = {
+    "nombre_empresa": "Empresa",
+    "nombre_establecimiento": "Establecimiento",
+    "nombre_chacra": "Chacra",
+    "nombre_conductor": "Conductor",
+    "cedula_conductor": "Cédula",
+    "matricula_camion": "Matrícula camión",
+    "matricula_zorra": "Matrícula zorra",
+    "peso_estimado_tn": "Peso estimado",
+    "nombre_destino": "Destino",
+}
+
+
+@dataclass
+class SlotState:
+    """
+    Datos del remito conocidos hasta el momento para un contacto.
+
+    Cada valor entra ya validado y normalizado por RemitoValidator, así que
+    los errores se detectan en el turno en que llega el dato. values solo
+    contiene los campos conocidos; matricula_zorra puede estar con None
+    ("sin zorra").
+    """
+
+    values: Dict[str, Any] = field(default_factory=dict)
+    turns: int = 0
+    # El usuario ya vio el resumen completo; recién entonces vale su confirmación
+    confirmation_requested: bool = False
+    # Los valores iniciales vienen del último remito del mismo teléfono
+    prefilled: bool = False
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def missing(self) -> List[str]:
+        return [name for name in REMITO_LLM_FIELDS if name not in self.values]
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing
+
+    def apply(self, updates: Dict[str, Any]) -> List[str]:
+        """
+        Incorpora los campos informados en el turno (los None se ignoran).
+
+        Retorna los errores de validación; un valor inválido no pisa el que
+        ya estaba.
+        """
+        self.errors = []
+        self.warnings = []
+        for name in REMITO_LLM_FIELDS:
+            if name not in updates or updates[name] is None:
+                continue
+            result = RemitoValidator.validate_field(name, updates[name])
+            if result.has_errors:
+                self.errors.extend(f"{SLOT_LABELS[name]}: {error}" for error in result.errors)
+                continue
+            self.warnings.extend(result.warnings)
+            value = result.normalized_data[name]
+            if self.values.get(name, object()) != value:
+                # Un dato corregido invalida el resumen que ya se había mostrado
+                self.confirmation_requested = False
+            self.values[name] = value
+        return self.errors
+
+    def to_prompt(self) -> str:
+        """Bloque de estado para el prompt: una línea por campo, en formato estable."""
+        lines = [f"ESTADO DEL REMITO (turno {self.turns}):"]
+        for name in REMITO_LLM_FIELDS:
+            if name not in self.values:
+                lines.append(f"- {name}: (falta)")
+            elif self.values[name] is None:
+                lines.append(f"- {name}: ninguna")
+            else:
+                lines.append(f"- {name}: {self.values[name]}")
+
+        if self.prefilled:
+            lines.append("Precargado: datos del último viaje de este número (confirmá si se repiten)")
+        if self.errors:
+            lines.append("Errores del turno anterior: " + "; ".join(self.errors))
+        if not self.complete:
+            lines.append("Faltan: " + ", ".join(SLOT_LABELS[name] for name in self.missing))
+        elif self.confirmation_requested:
+            lines.append("Confirmación: pendiente (el usuario ya vio el resumen)")
+        else:
+            lines.append("Confirmación: todavía no se mostró el resumen")
+        return "\n".join(lines)
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "values": self.values,
+                "turns": self.turns,
+                "confirmation_requested": self.confirmation_requested,
+                "prefilled": self.prefilled,
+                "errors": self.errors,
+            },
+            ensure_ascii=False,
+        )
+
+    @classmethod
+    def from_json(cls, raw: Optional[str]) -> "SlotState":
+        if not raw:
+            return cls()
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            return cls()
+        return cls(
+            values={k: v for k, v in (data.get("values") or {}).items() if k in SLOT_LABELS},
+            turns=int(data.get("turns") or 0),
+            confirmation_requested=bool(data.get("confirmation_requested")),
+            prefilled=bool(data.get("prefilled")),
+            errors=list(data.get("errors") or []),
+        )
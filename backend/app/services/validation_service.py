@@ -107,6 +107,42 @@ class RemitoValidator:
             normalized_data=normalized_data if len(errors) == 0 else None
         )
 
+    @staticmethod
+    def validate_field(field: str, value: Any) -> ValidationResult:
+        """
+        Valida un solo campo del remito con las mismas reglas que validate_json_remito.
+
+        normalized_data queda como {field: valor_normalizado}; sirve para
+        validar los datos a medida que llegan en la conversación.
+        """
+        if field == 'matricula_zorra':
+            text = str(value).strip() if value is not None else ''
+            if not text or text.lower() in ['null', 'ninguna', 'no tiene', 'sin zorra']:
+                return ValidationResult(True, [], [], {field: None})
+            zorra_result = RemitoValidator.validate_matricula(text)
+            if zorra_result.has_errors:
+                return ValidationResult(True, [], [f"Matrícula zorra: {zorra_result.errors[0]}"], {field: text})
+            return ValidationResult(True, [], [], {field: zorra_result.normalized_data['matricula']})
+
+        if value is None or str(value).strip() == '':
+            return ValidationResult(False, ["El valor no puede estar vacío"], [], None)
+
+        text = str(value).strip()
+        if field == 'cedula_conductor':
+            result, key = RemitoValidator.validate_cedula(text), 'cedula'
+        elif field == 'matricula_camion':
+            result, key = RemitoValidator.validate_matricula(text), 'matricula'
+        elif field == 'peso_estimado_tn':
+            result, key = RemitoValidator.validate_peso(value), 'peso'
+        else:
+            if len(text) < 2:
+                return ValidationResult(False, ["Debe tener al menos 2 caracteres"], [], None)
+            return ValidationResult(True, [], [], {field: text})
+
+        if result.has_errors:
+            return result
+        return ValidationResult(True, [], [], {field: result.normalized_data[key]})
+
     @staticmethod
     def validate_cedula(cedula: str) -> ValidationResult:
         """Valida y normaliza una cédula uruguaya."""
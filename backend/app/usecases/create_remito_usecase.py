@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Sequence
 
 from app.core.catalog_service import CatalogService
+from app.core.driver_profiles import DriverProfileCache
 from app.core.log_service import LogService
+from app.core.metrics import STAGE_CATALOG_RESOLUTION, STAGE_REMITO_CREATE, observe_stage
 from app.core.qrcode_service import QRCodeService
 from app.core.remito_service import RemitoService
 from app.models.remito import Remito, RemitoCreate
@@ -19,16 +21,19 @@ class CreateRemitoUseCase:
         catalog_service: CatalogService,
         qrcode_service: QRCodeService,
         log_service: LogService,
+        profile_cache: Optional[DriverProfileCache] = None,
     ) -> None:
         self.remito_service = remito_service
         self.catalog_service = catalog_service
         self.qrcode_service = qrcode_service
         self.log_service = log_service
+        self.profile_cache = profile_cache
 
     async def execute(
         self,
         remito_data: Dict[str, Any],
         contact: str,
+        empresa_ids: Sequence[str],
     ) -> Remito:
         """
         Ejecuta la creación de un remito completo.
@@ -36,34 +41,37 @@ class CreateRemitoUseCase:
         Args:
             remito_data: Datos del remito desde el LLM
             contact: Número de teléfono del usuario
+            empresa_ids: Empresas del teléfono; la del remito tiene que ser una de ellas
             
         Returns:
             El remito creado con QR y todos los datos
         """
         try:
             # 1. Crear o obtener entidades del catálogo
-            empresa = await self._get_or_create_empresa(remito_data["nombre_empresa"])
-            establecimiento = await self._get_or_create_establecimiento(
-                remito_data["nombre_establecimiento"], 
-                empresa["id_empresa"]
-            )
-            chacra = await self._get_or_create_chacra(
-                remito_data["nombre_chacra"],
-                establecimiento["id_establecimiento"],
-                empresa["id_empresa"],
-            )
-            destino = await self._get_or_create_destino(remito_data["nombre_destino"])
-
-            # 2. Crear payload del remito
+            with observe_stage(STAGE_CATALOG_RESOLUTION):
+                empresa = await self._get_phone_empresa(remito_data["nombre_empresa"], empresa_ids)
+                establecimiento = await self._get_or_create_establecimiento(
+                    remito_data["nombre_establecimiento"], 
+                    empresa["id_empresa"]
+                )
+                chacra = await self._get_or_create_chacra(
+                    remito_data["nombre_chacra"],
+                    establecimiento["id_establecimiento"],
+                    empresa["id_empresa"],
+                )
+                destino = await self._get_or_create_destino(remito_data["nombre_destino"])
+
+            # 2. Crear payload del remito (con los nombres del catálogo, que
+            # pueden diferir de los que escribió el usuario)
             remito_payload = RemitoCreate(
                 id_chacra=chacra["id_chacra"],
-                nombre_chacra=remito_data["nombre_chacra"],
+                nombre_chacra=chacra["nombre_chacra"],
                 id_establecimiento=establecimiento["id_establecimiento"],
-                nombre_establecimiento=remito_data["nombre_establecimiento"],
+                nombre_establecimiento=establecimiento["nombre"],
                 id_empresa=empresa["id_empresa"],
-                nombre_empresa=remito_data["nombre_empresa"],
+                nombre_empresa=empresa["nombre"],
                 id_destino=destino["id_destino"],
-                nombre_destino=remito_data["nombre_destino"],
+                nombre_destino=destino["nombre"],
                 nombre_conductor=remito_data["nombre_conductor"],
                 cedula_conductor=remito_data["cedula_conductor"],
                 matricula_camion=remito_data["matricula_camion"],
@@ -73,7 +81,12 @@ class CreateRemitoUseCase:
             )
 
             # 3. Crear remito en Supabase (incluye generación de QR)
-            remito = await self.remito_service.create_remito(remito_payload)
+            with observe_stage(STAGE_REMITO_CREATE):
+                remito = await self.remito_service.create_remito(remito_payload)
+
+            # El próximo viaje de este teléfono arranca con estos datos precargados
+            if self.profile_cache is not None:
+                self.profile_cache.remember(contact, remito.model_dump())
 
             # 4. Registrar log de creación exitosa
             await self.log_service.write_log(
@@ -100,9 +113,11 @@ class CreateRemitoUseCase:
             )
             raise
 
-    async def _get_or_create_empresa(self, nombre: str) -> Dict[str, Any]:
-        """Obtiene o crea una empresa."""
-        empresa = await self.catalog_service.get_or_create_empresa(nombre)
+    async def _get_phone_empresa(self, nombre: str, empresa_ids: Sequence[str]) -> Dict[str, Any]:
+        """Obtiene la empresa entre las del teléfono; un chofer no crea empresas ni usa las de otros."""
+        empresa = await self.catalog_service.find_empresa(nombre, empresa_ids)
+        if empresa is None:
+            raise ValueError(f"El teléfono no está habilitado para crear remitos de la empresa {nombre}")
         await self.log_service.write_log(
             tipo="DEBUG",
             detalle=f"Empresa procesada: {nombre} -> {empresa['id_empresa']}",
@@ -0,0 +1,113 @@
+"""
+Carga masiva de remitos: POST /remitos/bulk contra N llamadas a POST /remitos/.
+
+Levanta la app real contra los fakes de la prueba de carga (PostgREST en
+memoria y Storage con latencia) y crea el mismo lote de remitos de las dos
+formas, cada una sobre una base recién sembrada. Reporta tiempo total,
+pedidos a PostgREST y subidas a Storage de cada modo.
+
+Uso:
+    python -m benchmarks.bench_bulk_remitos
+    python -m benchmarks.bench_bulk_remitos --items 100 --db-median-ms 20 --storage-median-ms 60
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.load_test import LoadHarness, Scenario
+
+
+def build_payloads(harness: LoadHarness, items: int) -> List[Dict[str, Any]]:
+    """Remitos repartidos entre las chacras sembradas, rotando destinos."""
+    establecimientos = {row["id_establecimiento"]: row for row in harness.establecimientos}
+    empresas = {row["id_empresa"]: row for row in harness.empresas}
+    chacras = harness.db.rows("chacras")
+    destinos = harness.db.rows("destinos")
+    payloads = []
+    for index in range(items):
+        chacra = chacras[index % len(chacras)]
+        establecimiento = establecimientos[chacra["id_establecimiento"]]
+        destino = destinos[index % len(destinos)]
+        payloads.append(
+            {
+                "id_chacra": chacra["id_chacra"],
+                "nombre_chacra": chacra["nombre_chacra"],
+                "id_establecimiento": establecimiento["id_establecimiento"],
+                "nombre_establecimiento": establecimiento["nombre"],
+                "id_empresa": chacra["id_empresa"],
+                "nombre_empresa": empresas[chacra["id_empresa"]]["nombre"],
+                "id_destino": destino["id_destino"],
+                "nombre_destino": destino["nombre"],
+                "nombre_conductor": f"Chofer {index}",
+                "cedula_conductor": str(4_000_000 + index),
+                "matricula_camion": f"SAB{index:04d}",
+                "peso_estimado_tn": 28.5,
+            }
+        )
+    return payloads
+
+
+async def run_mode(mode: str, scenario: Scenario, items: int) -> Dict[str, Any]:
+    harness = LoadHarness(scenario)
+    harness.build_app()
+    harness.seed_catalog()
+    payloads = build_payloads(harness, items)
+    requests_before = harness.db.requests
+
+    transport = httpx.ASGITransport(app=harness.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://backend", timeout=None) as client:
+        started = time.perf_counter()
+        if mode == "bulk":
+            response = await client.post("/remitos/bulk", json=payloads)
+            response.raise_for_status()
+            created = response.json()["creados"]
+        else:
+            created = 0
+            for payload in payloads:
+                response = await client.post("/remitos/", json=payload)
+                created += response.status_code == 201
+        elapsed = time.perf_counter() - started
+
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "ms_per_remito": round(elapsed * 1000 / items, 1),
+        "created": created,
+        "postgrest_requests": harness.db.requests - requests_before,
+        "storage_uploads": harness.storage.uploads,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--empresas", type=int, default=2, help="Cada empresa siembra 15 chacras")
+    parser.add_argument("--db-median-ms", type=float, default=10.0)
+    parser.add_argument("--storage-median-ms", type=float, default=30.0)
+    args = parser.parse_args()
+
+    scenario = Scenario(
+        conversations=0,
+        warmup=0,
+        empresas=args.empresas,
+        db_median_ms=args.db_median_ms,
+        storage_median_ms=args.storage_median_ms,
+    )
+    sequential = asyncio.run(run_mode("sequential", scenario, args.items))
+    bulk = asyncio.run(run_mode("bulk", scenario, args.items))
+    report = {
+        "items": args.items,
+        "sequential": sequential,
+        "bulk": bulk,
+        "speedup": round(sequential["elapsed_s"] / bulk["elapsed_s"], 2) if bulk["elapsed_s"] else None,
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Throughput de acceso a Supabase con contactos concurrentes.
+
+Compara el camino histórico (cliente sync de supabase-py en asyncio.to_thread)
+contra el cliente PostgREST async con pool, usando un PostgREST simulado con
+latencia fija. Cada contacto simulado ejecuta las consultas de un turno típico:
+resolución de teléfono, lectura de configuración y dos logs.
+
+Uso:
+    python -m benchmarks.bench_db_concurrency --contacts 100 --latency-ms 20
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any, Dict, List
+
+import httpx
+from postgrest import SyncPostgrestClient
+
+from app.core.config_store import ConfigStore
+from app.core.data_access import DataAccess, build_async_postgrest_client
+from app.core.log_service import LogService
+from app.core.phone_service import PhoneService
+
+BASE_URL = "http://postgrest.local/rest/v1"
+
+
+def _response_for(request: httpx.Request) -> httpx.Response:
+    path = request.url.path
+    if path.endswith("/telefonos_empresa"):
+        return httpx.Response(200, json=[{"id_empresa": "emp-1"}])
+    if path.endswith("/configuraciones"):
+        return httpx.Response(200, json=[{"id": 1, "llm_prompt": None}])
+    return httpx.Response(201, json=[{}])
+
+
+def build_sync_data_access(latency: float) -> DataAccess:
+    def handler(request: httpx.Request) -> httpx.Response:
+        time.sleep(latency)
+        return _response_for(request)
+
+    client = SyncPostgrestClient(BASE_URL)
+    client.session = httpx.Client(base_url=BASE_URL, transport=httpx.MockTransport(handler))
+    return DataAccess(client)
+
+
+def build_async_data_access(latency: float, pool_size: int) -> DataAccess:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        return _response_for(request)
+
+    client = build_async_postgrest_client(
+        "http://postgrest.local",
+        "bench-key",
+        pool_size=pool_size,
+        transport=httpx.MockTransport(handler),
+    )
+    return DataAccess(None, client)
+
+
+async def _simulate_contact(db: DataAccess, contact: int, latencies: List[float]) -> None:
+    phone_service = PhoneService(None, data_access=db)  # type: ignore[arg-type]
+    config_store = ConfigStore(None, data_access=db)  # type: ignore[arg-type]
+    log_service = LogService(None, data_access=db)  # type: ignore[arg-type]
+
+    started = time.perf_counter()
+    await log_service.write_log("WEBHOOK", "bench", {"contact": contact})
+    await phone_service.find_empresas_by_phone(f"59899{contact:06d}")
+    await config_store.read()
+    await log_service.write_log("WEBHOOK", "bench reply", {"contact": contact})
+    latencies.append(time.perf_counter() - started)
+
+
+async def run_scenario(db: DataAccess, contacts: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    started = time.perf_counter()
+    await asyncio.gather(*(_simulate_contact(db, i, latencies) for i in range(contacts)))
+    elapsed = time.perf_counter() - started
+    await db.aclose()
+
+    latencies.sort()
+    return {
+        "contacts": contacts,
+        "elapsed_s": round(elapsed, 3),
+        "turns_per_s": round(contacts / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contacts", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--pool-size", type=int, default=20)
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    results = {
+        "to_thread": asyncio.run(run_scenario(build_sync_data_access(latency), args.contacts)),
+        "async_pool": asyncio.run(
+            run_scenario(build_async_data_access(latency, args.pool_size), args.contacts)
+        ),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
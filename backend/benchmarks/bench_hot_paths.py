@@ -0,0 +1,402 @@
+"""
+Micro-benchmarks de los caminos calientes que corren en CPU.
+
+Cubre la validación del remito, la extracción del JSON de la respuesta del
+LLM, el armado del catálogo para el prompt, la resolución de nombres contra
+el catálogo, la conversión de filas de la base a modelos y el render del QR,
+con fixtures del tamaño que vemos en producción o peor (catálogos grandes,
+respuestas largas, listados de 10k remitos).
+
+Cada caso se calibra con timeit hasta durar ~0,2 s por muestra y se repite
+--repeat veces; se reportan mínimo, mediana y desvío por llamada. Con --save
+se guarda el resultado como línea base y con --compare se contrasta contra
+una línea base anterior (falla con código 1 si algún caso empeora más que
+--max-regression).
+
+Uso:
+    python -m benchmarks.bench_hot_paths
+    python -m benchmarks.bench_hot_paths --save benchmarks/baselines/hot_paths.json
+    python -m benchmarks.bench_hot_paths --compare benchmarks/baselines/hot_paths.json --max-regression 1.3
+    python -m benchmarks.bench_hot_paths --only extract_json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import re
+import statistics
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.empresa_context_service import EmpresaContextService
+from app.core.name_index import NameIndex
+from app.core.qrcode_service import QRCodeService
+from app.core.remito_service import RemitoService
+from app.services.conversation_service import ConversationService
+from app.services.validation_service import RemitoValidator
+
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "hot_paths.json"
+
+# Semilla fija: las fixtures tienen que ser idénticas entre corridas para que
+# la comparación contra la línea base tenga sentido
+SEED = 20240611
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def _remito_json(rng: random.Random, index: int) -> Dict[str, Any]:
+    return {
+        "nombre_empresa": "Forestal del Este S.A.",
+        "nombre_establecimiento": f"Establecimiento {index % 200}",
+        "nombre_chacra": f"Chacra {index}",
+        "nombre_conductor": f"Conductor Apellido {index}",
+        "cedula_conductor": f"{rng.randint(1_000_000, 9_999_999)}",
+        "matricula_camion": f"SBA {rng.randint(1000, 9999)}",
+        "matricula_zorra": f"STU {rng.randint(1000, 9999)}" if index % 3 else None,
+        "peso_estimado_tn": round(rng.uniform(18.0, 32.0), 2),
+        "nombre_destino": "Planta UPM Fray Bentos",
+    }
+
+
+def build_large_catalog(rng: random.Random, establecimientos: int = 200, chacras: int = 2000) -> Dict[str, Any]:
+    ests = [
+        {"id_establecimiento": f"EST-{i:04d}", "nombre": f"Establecimiento {i} - Paraje {rng.randint(1, 99)}"}
+        for i in range(establecimientos)
+    ]
+    chacra_rows = []
+    for i in range(chacras):
+        est = ests[i % establecimientos]
+        chacra_rows.append(
+            {
+                "id_chacra": f"CH-{i:05d}",
+                "nombre_chacra": f"Chacra {i} Lote {rng.randint(1, 40)}",
+                "id_establecimiento": est["id_establecimiento"],
+                "establecimientos": {"nombre": est["nombre"]},
+            }
+        )
+    return {
+        "empresa": {"id_empresa": "EMP-0001", "nombre": "Forestal del Este S.A."},
+        "establecimientos": ests,
+        "chacras": chacra_rows,
+    }
+
+
+def build_long_llm_output(rng: random.Random, paragraphs: int = 60) -> str:
+    """Respuesta verbosa con llaves sueltas en el texto y el JSON del remito al final."""
+    prose = []
+    for i in range(paragraphs):
+        prose.append(
+            f"Paso {i}: revisé los datos {{chacra}} y {{destino}} que indicaste. "
+            f"El formato esperado es {{\"campo\": valor}} pero faltan {{algunos}} detalles "
+            f"del conductor; recordá que la matrícula va como ABC 1234 y el peso en toneladas."
+        )
+    payload = json.dumps(_remito_json(rng, 7), ensure_ascii=False, indent=2)
+    return "\n\n".join(prose) + f"\n\nResumen final:\n```json\n{payload}\n```\n¿Confirmás?"
+
+
+def build_adversarial_llm_output(depth: int = 2000) -> str:
+    """Llaves abiertas sin cerrar: el escáner mantiene la pila entera y no encuentra nada."""
+    return "Te dejo el esquema: " + "{ " * depth + "sin cerrar y sin JSON válido."
+
+
+def build_brace_groups_output(groups: int = 5000) -> str:
+    """Muchos grupos {...} cortos que no son JSON: cada uno es un candidato para json.loads."""
+    return "Plantilla: " + " ".join(f"{{campo_{i}: valor}}" for i in range(groups))
+
+
+def build_stray_brace_output(rng: random.Random, depth: int = 500) -> str:
+    """Llaves sueltas sin cerrar antes del JSON real, que además trae un objeto anidado de 3 niveles."""
+    remito = {**_remito_json(rng, 9), "detalle": {"carga": {"especie": "eucalyptus", "largo_m": 2.4}}}
+    return "Usá {campo} así: { " * depth + json.dumps(remito, ensure_ascii=False)
+
+
+def build_stray_quote_output(rng: random.Random, groups: int = 200) -> str:
+    """Prosa con llave y comilla sueltas ({campo: "valor}) antes del JSON en bloque ```: el escáner debe retroceder."""
+    prose = " ".join(f'Ejemplo {i}: {{"campo": valor}} y {{nombre: "texto}}.' for i in range(groups))
+    payload = json.dumps(_remito_json(rng, 11), ensure_ascii=False, indent=2)
+    return prose + f"\n\n```json\n{payload}\n```\n¿Confirmás?"
+
+
+def build_nested_quote_output(rng: random.Random, groups: int = 200, repeats: int = 300) -> str:
+    """
+    Caso encontrado comparando contra el patrón anterior con texto aleatorio:
+    llaves y comillas (una escapada) entrelazadas antes del JSON, repetidas
+    hasta agotar el presupuesto de retrocesos (termina en el patrón de respaldo).
+    """
+    prose = " ".join(f"Paso {i}: completá {{campo}} y {{valor}}." for i in range(groups))
+    payload = json.dumps(_remito_json(rng, 13), ensure_ascii=False)
+    return prose + ' {"{{\\"  ' * repeats + payload + "`{{ }`{a\\},"
+
+
+# Patrón con el que se extraía el JSON antes del escáner de una sola pasada;
+# se conserva como referencia para comparar
+LEGACY_JSON_PATTERN = re.compile(r"\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}", re.DOTALL)
+
+
+def legacy_extract_json(text: str) -> Optional[Dict[str, Any]]:
+    for match in LEGACY_JSON_PATTERN.findall(text):
+        try:
+            data = json.loads(match)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict) and "nombre_empresa" in data and "peso_estimado_tn" in data:
+            return data
+    return None
+
+
+def build_remito_records(rng: random.Random, count: int = 10_000) -> List[Dict[str, Any]]:
+    base = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    records = []
+    for i in range(count):
+        data = _remito_json(rng, i)
+        created = base + timedelta(minutes=7 * i)
+        records.append(
+            {
+                **data,
+                "id_remito": f"CH-{i:05d}-{created:%Y%m%d%H%M%S}",
+                "id_chacra": f"CH-{i:05d}",
+                "id_establecimiento": f"EST-{i % 200:04d}",
+                "id_empresa": "EMP-0001",
+                "id_destino": "DEST-01",
+                "peso_estimado_tn": str(data["peso_estimado_tn"]),
+                "estado_remito": "despachado",
+                "activo": True,
+                "qr_url": f"https://storage.example/remitos/CH-{i:05d}.png",
+                # Mitad con sufijo Z y mitad con offset, como devuelve PostgREST
+                "timestamp_creacion": created.isoformat().replace("+00:00", "Z") if i % 2 else created.isoformat(),
+                "raw_payload": {"mensaje": f"remito {i}"},
+            }
+        )
+    return records
+
+
+def build_qr_metadata(rng: random.Random) -> Tuple[str, Dict[str, Any]]:
+    metadata = {
+        **_remito_json(rng, 42),
+        "id_remito": "CH-00042-20240611143015",
+        "nombre_establecimiento": "Establecimiento Los Eucaliptos del Norte - Paraje Arroyo Grande",
+        "nombre_chacra": "Chacra 42 Lote 17 (sector bajo)",
+        "matricula_zorra": "STU 4821",
+        "timestamp": "2024-06-11T14:30:15-03:00",
+    }
+    return QRCodeService._compose_text(metadata), metadata
+
+
+# ---------------------------------------------------------------------------
+# Casos
+# ---------------------------------------------------------------------------
+
+def build_cases() -> Dict[str, Tuple[Callable[[], Any], str]]:
+    """Nombre del caso -> (función sin argumentos, descripción de la fixture)."""
+    rng = random.Random(SEED)
+
+    valid_remito = _remito_json(rng, 1)
+    invalid_remito = {**_remito_json(rng, 2), "cedula_conductor": "12ab", "matricula_camion": "???", "peso_estimado_tn": "90"}
+    catalog = build_large_catalog(rng)
+    long_output = build_long_llm_output(rng)
+    adversarial_output = build_adversarial_llm_output()
+    brace_groups_output = build_brace_groups_output()
+    stray_brace_output = build_stray_brace_output(rng)
+    stray_quote_output = build_stray_quote_output(rng)
+    nested_quote_output = build_nested_quote_output(rng)
+    records = build_remito_records(rng)
+    qr_text, qr_metadata = build_qr_metadata(rng)
+
+    # Solo se usa _extract_json, que no toca las dependencias del servicio
+    conversation = ConversationService(llm_service=None, conversation_store=None, log_service=None)  # type: ignore[arg-type]
+    qr_service = QRCodeService(supabase_client=None)  # type: ignore[arg-type]
+    # Peor caso de resolución: todas las chacras en un mismo índice (en
+    # producción hay un índice por establecimiento)
+    chacra_index = NameIndex(catalog["chacras"], "nombre_chacra")
+    establecimiento_index = NameIndex(catalog["establecimientos"], "nombre")
+    typo_chacra = catalog["chacras"][1234]["nombre_chacra"].upper().replace("CHACRA", "Chakra")
+
+    return {
+        "validate_json_remito.valid": (
+            lambda: RemitoValidator.validate_json_remito(valid_remito),
+            "remito completo con zorra",
+        ),
+        "validate_json_remito.invalid": (
+            lambda: RemitoValidator.validate_json_remito(invalid_remito),
+            "cédula, matrícula y peso inválidos",
+        ),
+        "extract_json.long_output": (
+            lambda: conversation._extract_json(long_output),
+            f"{len(long_output)} caracteres con llaves sueltas",
+        ),
+        "extract_json.adversarial": (
+            lambda: conversation._extract_json(adversarial_output),
+            f"{len(adversarial_output)} caracteres de llaves sin cerrar",
+        ),
+        "extract_json.brace_groups": (
+            lambda: conversation._extract_json(brace_groups_output),
+            f"{len(brace_groups_output)} caracteres en grupos {{...}} que no son JSON",
+        ),
+        "extract_json.stray_brace": (
+            lambda: conversation._extract_json(stray_brace_output),
+            "llaves sin cerrar antes de un JSON anidado",
+        ),
+        "extract_json.stray_quote": (
+            lambda: conversation._extract_json(stray_quote_output),
+            "llaves con comillas sin cerrar antes del JSON",
+        ),
+        "extract_json.nested_quote": (
+            lambda: conversation._extract_json(nested_quote_output),
+            "llaves y comillas entrelazadas antes del JSON (agota los retrocesos)",
+        ),
+        "extract_json_regex.long_output": (
+            lambda: legacy_extract_json(long_output),
+            "patrón anterior, misma fixture que extract_json.long_output",
+        ),
+        "extract_json_regex.adversarial": (
+            lambda: legacy_extract_json(adversarial_output),
+            "patrón anterior, misma fixture que extract_json.adversarial",
+        ),
+        "extract_json_regex.brace_groups": (
+            lambda: legacy_extract_json(brace_groups_output),
+            "patrón anterior, misma fixture que extract_json.brace_groups",
+        ),
+        "extract_json_regex.stray_brace": (
+            lambda: legacy_extract_json(stray_brace_output),
+            "patrón anterior (no encuentra el JSON anidado)",
+        ),
+        "extract_json_regex.stray_quote": (
+            lambda: legacy_extract_json(stray_quote_output),
+            "patrón anterior, misma fixture que extract_json.stray_quote",
+        ),
+        "extract_json_regex.nested_quote": (
+            lambda: legacy_extract_json(nested_quote_output),
+            "patrón anterior, misma fixture que extract_json.nested_quote",
+        ),
+        "build_catalog_text.large": (
+            lambda: EmpresaContextService.build_catalog_text(catalog),
+            f"{len(catalog['establecimientos'])} establecimientos, {len(catalog['chacras'])} chacras",
+        ),
+        "name_index.build": (
+            lambda: NameIndex(catalog["chacras"], "nombre_chacra"),
+            f"{len(catalog['chacras'])} chacras",
+        ),
+        "name_index.exact": (
+            lambda: chacra_index.exact(f"  {catalog['chacras'][1234]['nombre_chacra'].lower()} "),
+            "mayúsculas y espacios distintos, clave exacta",
+        ),
+        "name_index.similar": (
+            lambda: chacra_index.similar(typo_chacra),
+            f"{len(catalog['chacras'])} chacras en un índice, nombre con error de tipeo",
+        ),
+        "name_index.duplicate_groups": (
+            lambda: establecimiento_index.duplicate_groups(),
+            f"{len(catalog['establecimientos'])} establecimientos",
+        ),
+        "record_to_model.10k": (
+            lambda: [RemitoService._record_to_model(record) for record in records],
+            f"{len(records)} filas de remitos",
+        ),
+        "build_qr_bytes.with_metadata": (
+            lambda: qr_service._build_qr_bytes(qr_text, qr_metadata),
+            "QR con 7 líneas de metadata",
+        ),
+        "build_qr_bytes.plain": (
+            lambda: qr_service._build_qr_bytes(qr_text),
+            "QR sin texto",
+        ),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Medición
+# ---------------------------------------------------------------------------
+
+def measure(fn: Callable[[], Any], repeat: int, min_sample_seconds: float) -> Dict[str, Any]:
+    timer = timeit.Timer(fn)
+    # autorange busca loops tal que la muestra dure al menos 0,2 s; escalamos
+    # para respetar min_sample_seconds
+    loops, elapsed = timer.autorange()
+    if elapsed < min_sample_seconds:
+        loops = max(1, int(loops * min_sample_seconds / max(elapsed, 1e-9)))
+    samples = [total / loops * 1e6 for total in timer.repeat(repeat=repeat, number=loops)]
+    return {
+        "loops": loops,
+        "repeat": repeat,
+        "min_us": round(min(samples), 3),
+        "median_us": round(statistics.median(samples), 3),
+        "stdev_us": round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+    }
+
+
+def run(only: Optional[str], repeat: int, min_sample_seconds: float) -> Dict[str, Any]:
+    results = {}
+    for name, (fn, fixture) in build_cases().items():
+        if only and only not in name:
+            continue
+        fn()  # calentamiento (fuentes, regex compiladas, caches de PIL)
+        results[name] = {"fixture": fixture, **measure(fn, repeat, min_sample_seconds)}
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Razón mediana actual / mediana base por caso (>1 es más lento)."""
+    comparison = {}
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        comparison[name] = {
+            "baseline_median_us": base["median_us"],
+            "median_us": result["median_us"],
+            "ratio": round(result["median_us"] / base["median_us"], 3) if base["median_us"] else None,
+        }
+    return comparison
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", help="Corre solo los casos cuyo nombre contenga este texto")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-sample-seconds", type=float, default=0.2)
+    parser.add_argument("--save", nargs="?", const=str(DEFAULT_BASELINE), help="Guarda el resultado como línea base")
+    parser.add_argument("--compare", nargs="?", const=str(DEFAULT_BASELINE), help="Línea base contra la cual comparar")
+    parser.add_argument("--max-regression", type=float, default=None, help="Razón máxima aceptada (ej. 1.3)")
+    args = parser.parse_args()
+
+    current = run(args.only, args.repeat, args.min_sample_seconds)
+    output: Dict[str, Any] = {"results": current["results"]}
+
+    failures = []
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        comparison = compare(current, baseline)
+        output["comparison"] = comparison
+        if args.max_regression is not None:
+            failures = [
+                f"{name} {entry['ratio']}x > {args.max_regression}x"
+                for name, entry in comparison.items()
+                if entry["ratio"] is not None and entry["ratio"] > args.max_regression
+            ]
+            output["failures"] = failures
+
+    if args.save:
+        path = Path(args.save)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(current, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        output["saved_to"] = str(path)
+
+    print(json.dumps(output, indent=2, ensure_ascii=False))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
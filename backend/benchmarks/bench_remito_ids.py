@@ -0,0 +1,140 @@
+"""
+Prueba de concurrencia de los ids de remito.
+
+1. Generador: varios hilos piden ids a la vez; verifica que no se repitan,
+   que cada hilo los reciba en orden y mide ids por segundo.
+2. Remitos: crea miles de remitos de una misma chacra con
+   RemitoService.create_remito concurrentes contra el PostgREST en memoria
+   (sin latencia y con QR ya resuelto, para medir el camino del id y el
+   insert). Cuenta conflictos de clave primaria y, como referencia, cuántos
+   habría tenido el formato anterior chacra + segundo.
+
+Termina con código 1 si hay ids repetidos o conflictos.
+
+Uso:
+    python -m benchmarks.bench_remito_ids
+    python -m benchmarks.bench_remito_ids --threads 8 --ids-per-thread 50000 --remitos 5000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from benchmarks.load_test import LoadHarness, Scenario
+
+
+def run_generator(threads: int, ids_per_thread: int) -> Dict[str, Any]:
+    from app.core.remito_ids import RemitoIdGenerator
+
+    generator = RemitoIdGenerator()
+    results: List[List[str]] = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads)
+
+    def _worker(slot: int) -> None:
+        barrier.wait()
+        results[slot] = [generator.allocate()[0] for _ in range(ids_per_thread)]
+
+    workers = [threading.Thread(target=_worker, args=(slot,)) for slot in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    all_ids = [remito_id for ids in results for remito_id in ids]
+    return {
+        "ids": len(all_ids),
+        "duplicates": len(all_ids) - len(set(all_ids)),
+        "unordered_threads": sum(1 for ids in results if ids != sorted(ids)),
+        "ids_per_s": round(len(all_ids) / elapsed),
+        "example": all_ids[0],
+    }
+
+
+async def run_remitos(count: int, concurrency: int) -> Dict[str, Any]:
+    harness = LoadHarness(Scenario(conversations=0, warmup=0, empresas=1, db_median_ms=0, db_sigma=0))
+    harness.build_app()
+    harness.seed_catalog()
+
+    from app.models.remito import RemitoCreate
+
+    chacra = harness.db.rows("chacras")[0]
+    establecimiento = next(
+        row for row in harness.establecimientos if row["id_establecimiento"] == chacra["id_establecimiento"]
+    )
+    destino = harness.db.rows("destinos")[0]
+    service = harness.settings.remito_service
+    # Sin log_service: se mide el id y el insert, no las escrituras de logs
+    service.log_service = None
+
+    def _payload(index: int) -> RemitoCreate:
+        return RemitoCreate(
+            id_chacra=chacra["id_chacra"],
+            nombre_chacra=chacra["nombre_chacra"],
+            id_establecimiento=establecimiento["id_establecimiento"],
+            nombre_establecimiento=establecimiento["nombre"],
+            id_empresa=chacra["id_empresa"],
+            nombre_empresa=harness.empresas[0]["nombre"],
+            id_destino=destino["id_destino"],
+            nombre_destino=destino["nombre"],
+            nombre_conductor=f"Chofer {index}",
+            cedula_conductor=str(4_000_000 + index),
+            matricula_camion=f"SAB{index % 10_000:04d}",
+            peso_estimado_tn=30,
+            qr_url="https://storage.fake/remibot-qrs/precargado.png",
+        )
+
+    semaphore = asyncio.Semaphore(concurrency)
+    conflicts = 0
+    created: List[Any] = []
+
+    async def _create(index: int) -> None:
+        nonlocal conflicts
+        async with semaphore:
+            try:
+                created.append(await service.create_remito(_payload(index)))
+            except Exception:
+                conflicts += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_create(index) for index in range(count)))
+    elapsed = time.perf_counter() - started
+
+    legacy_ids = Counter(f"{r.id_chacra}-{r.timestamp_creacion:%Y%m%d%H%M%S}" for r in created)
+    return {
+        "remitos": count,
+        "created": len(created),
+        "conflicts": conflicts,
+        "remitos_per_s": round(len(created) / elapsed),
+        "legacy_format_collisions": sum(n - 1 for n in legacy_ids.values()),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ids-per-thread", type=int, default=20_000)
+    parser.add_argument("--remitos", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    report = {
+        "generator": run_generator(args.threads, args.ids_per_thread),
+        "remitos_one_chacra": asyncio.run(run_remitos(args.remitos, args.concurrency)),
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    generator, remitos = report["generator"], report["remitos_one_chacra"]
+    if generator["duplicates"] or generator["unordered_threads"] or remitos["conflicts"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
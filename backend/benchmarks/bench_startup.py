@@ -0,0 +1,182 @@
+"""
+Tiempo de arranque del backend en procesos nuevos.
+
+Cada corrida lanza un intérprete limpio (sin módulos en cache) que importa
+app.main, ejecuta el lifespan de la app y mide:
+
+- import_ms: `import app.main` (lo que paga uvicorn antes de escuchar).
+- startup_ms: entrada del lifespan.
+- first_response_ms: primer GET / (el health check de Railway).
+- settings_ms: primer pedido que necesita Settings (GET /health/executors).
+- critical_path_ms: construir el flujo del webhook y sus servicios.
+- process_ms: todo lo anterior más el arranque del intérprete, visto desde afuera.
+
+Se corre sin y con STARTUP_WARMUP; con warm-up el camino crítico se mide
+después de que terminó el precalentamiento. Con --top, además lista los
+módulos que más tardan en importarse (python -X importtime).
+
+Uso:
+    python -m benchmarks.bench_startup --runs 5 --top 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+METRICS = ("import_ms", "startup_ms", "first_response_ms", "settings_ms", "critical_path_ms", "process_ms")
+
+
+async def _asgi_get(app: Any, path: str) -> int:
+    """GET mínimo por ASGI, sin cliente HTTP (no suma imports a la medición)."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    status = 0
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def _child() -> None:
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+    import app.main  # noqa: F401
+
+    timings["import_ms"] = (time.perf_counter() - started) * 1000
+
+    async def measure() -> None:
+        fastapi_app = app.main.app
+        began = time.perf_counter()
+        async with fastapi_app.router.lifespan_context(fastapi_app):
+            timings["startup_ms"] = (time.perf_counter() - began) * 1000
+
+            began = time.perf_counter()
+            assert await _asgi_get(fastapi_app, "/") == 200
+            timings["first_response_ms"] = (time.perf_counter() - began) * 1000
+
+            began = time.perf_counter()
+            assert await _asgi_get(fastapi_app, "/health/executors") == 200
+            timings["settings_ms"] = (time.perf_counter() - began) * 1000
+
+            warmup = getattr(fastapi_app.state, "warmup", None)
+            if warmup is not None:
+                await warmup
+
+            from app.core.settings import get_settings
+
+            began = time.perf_counter()
+            get_settings().remito_flow_v2_refactored
+            timings["critical_path_ms"] = (time.perf_counter() - began) * 1000
+
+    asyncio.run(measure())
+    print(json.dumps(timings))
+
+
+def _run_child(env: Dict[str, str]) -> Dict[str, float]:
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["process_ms"] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def _top_imports(env: Dict[str, str], top: int) -> List[Dict[str, Any]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Solo los primeros niveles de anidamiento, para que el listado no repita submódulos
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if 1 <= depth <= 3:
+            modules.append({"module": name.strip(), "cumulative_ms": int(cumulative_us) / 1000, "self_ms": int(self_us) / 1000})
+    modules.sort(key=lambda item: item["cumulative_ms"], reverse=True)
+    return modules[:top]
+
+
+def run(runs: int, top: int) -> Dict[str, Any]:
+    # Solo en el proceso que coordina: el hijo mide sus imports desde cero
+    from benchmarks.load_test import FAKE_ENV
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    base_env = {**os.environ, **FAKE_ENV, "PYTHONPATH": backend_dir}
+    report: Dict[str, Any] = {"runs": runs}
+    for label, warmup in (("cold", "false"), ("warmup", "true")):
+        env = {**base_env, "STARTUP_WARMUP": warmup}
+        _run_child(env)  # descarta la primera: compila .pyc si hace falta
+        samples = [_run_child(env) for _ in range(runs)]
+        report[label] = {
+            metric: round(statistics.median(sample[metric] for sample in samples), 1)
+            for metric in METRICS
+            if all(metric in sample for sample in samples)
+        }
+    if top:
+        report["top_imports"] = _top_imports(base_env, top)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Procesos por escenario (se reporta la mediana)")
+    parser.add_argument("--top", type=int, default=0, help="Listar los N módulos más lentos de importar")
+    parser.add_argument("--max-import-ms", type=float, default=None, help="Falla si import_ms supera este valor")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child()
+        return
+
+    report = run(args.runs, args.top)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(text)
+    if args.max_import_ms is not None and report["cold"]["import_ms"] > args.max_import_ms:
+        print(f"import_ms {report['cold']['import_ms']} > {args.max_import_ms}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
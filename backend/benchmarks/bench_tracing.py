@@ -0,0 +1,115 @@
+"""
+Overhead del tracing por span.
+
+Mide el costo de abrir y cerrar un span dentro de una traza activa, el de un
+span fuera de traza (no-op) y el de observe_stage (métrica + span), y falla
+con código 1 si alguno supera el presupuesto fijo por span.
+
+Uso:
+    python -m benchmarks.bench_tracing --spans 200000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from typing import Callable, Dict
+
+from app.core.metrics import observe_stage
+from app.core.tracing import Tracer
+
+# Presupuesto por span en microsegundos. Un turno típico abre ~40 spans, así
+# que con estos valores el tracing agrega menos de 1 ms a un turno de segundos.
+SPAN_BUDGET_US = 15.0
+NOOP_BUDGET_US = 2.0
+
+
+def _per_call_us(fn: Callable[[int], None], iterations: int) -> float:
+    fn(min(iterations, 1000))  # calentamiento
+    started = time.perf_counter()
+    fn(iterations)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def run(iterations: int) -> Dict[str, float]:
+    # Buffer grande y sin límite de spans para no medir descartes
+    tracer = Tracer(buffer_size=10, max_spans_per_trace=iterations * 2 + 10)
+
+    def baseline(n: int) -> None:
+        for _ in range(n):
+            pass
+
+    def noop_span(n: int) -> None:
+        for _ in range(n):
+            with tracer.span("noop"):
+                pass
+
+    def traced_span(n: int) -> None:
+        with tracer.start_trace("bench"):
+            for _ in range(n):
+                with tracer.span("db", method="GET", path="/remitos"):
+                    pass
+
+    def nested_span(n: int) -> None:
+        # Spans anidados de a 2 para simular etapa -> consulta
+        with tracer.start_trace("bench"):
+            for _ in range(n // 2):
+                with tracer.span("stage"):
+                    with tracer.span("db"):
+                        pass
+
+    base = _per_call_us(baseline, iterations)
+    results = {
+        "noop_span_us": _per_call_us(noop_span, iterations) - base,
+        "traced_span_us": _per_call_us(traced_span, iterations) - base,
+        "nested_span_us": _per_call_us(nested_span, iterations) - base,
+    }
+
+    # observe_stage usa el tracer global; medimos la etapa completa (histograma + span)
+    from app.core import tracing
+
+    previous = tracing._tracer
+    tracing._tracer = tracer
+    try:
+        def stage(n: int) -> None:
+            with tracer.start_trace("bench"):
+                for _ in range(n):
+                    with observe_stage("bench"):
+                        pass
+
+        results["observe_stage_us"] = _per_call_us(stage, iterations) - base
+    finally:
+        tracing._tracer = previous
+
+    # Tiempo de armar la cascada de una traza de tamaño típico
+    with tracer.start_trace("waterfall") as root:
+        for _ in range(40):
+            with tracer.span("db"):
+                pass
+    started = time.perf_counter()
+    root.trace.to_waterfall()
+    results["waterfall_40_spans_ms"] = (time.perf_counter() - started) * 1000
+
+    return {key: round(value, 3) for key, value in results.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spans", type=int, default=200_000)
+    args = parser.parse_args()
+
+    results = run(args.spans)
+    failures = []
+    if results["traced_span_us"] > SPAN_BUDGET_US:
+        failures.append(f"traced_span_us {results['traced_span_us']} > {SPAN_BUDGET_US}")
+    if results["noop_span_us"] > NOOP_BUDGET_US:
+        failures.append(f"noop_span_us {results['noop_span_us']} > {NOOP_BUDGET_US}")
+
+    print(json.dumps({"results": results, "budget_us": SPAN_BUDGET_US, "failures": failures}, indent=2))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
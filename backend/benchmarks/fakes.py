@@ -0,0 +1,605 @@
+"""
+Dobles en proceso de los servicios externos para correr el backend sin red.
+
+- FakePostgREST: tablas en memoria detrás de un transport httpx que entiende
+  el subconjunto de PostgREST que usan los servicios (select con embebidos,
+  eq/ilike/gte/lt/or (también sobre col->>clave), order, limit, insert, upsert, update)
+  y las funciones RPC que devuelven filas (remitos_buscar).
+- FakeStorage: reemplazo de `supabase.storage` para el bucket de QRs.
+- ScriptedLLM: API de Anthropic Messages que arma el remito a partir de los
+  pares "campo: valor" que manda el chofer, con latencia configurable.
+- FakeGraphAPI: endpoints /messages y /media de WhatsApp Cloud API.
+
+Todos registran latencias simuladas con asyncio.sleep (o time.sleep en las
+llamadas sync), así que el costo medido es el del backend, no el de los fakes.
+"""
+from __future__ import annotations
+
+import asyncio
+import copy
+import itertools
+import json
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+import httpx
+
+
+@dataclass
+class LatencyModel:
+    """Latencia log-normal: la mediana es median_ms y sigma controla la cola."""
+
+    median_ms: float = 0.0
+    sigma: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        if self.sigma <= 0:
+            return self.median_ms / 1000
+        return rng.lognormvariate(0.0, self.sigma) * self.median_ms / 1000
+
+
+# Clave primaria por tabla; las que no traen valor se generan como en la migración
+PRIMARY_KEYS = {
+    "empresas": "id_empresa",
+    "establecimientos": "id_establecimiento",
+    "chacras": "id_chacra",
+    "destinos": "id_destino",
+    "remitos": "id_remito",
+    "telefonos_empresa": "id",
+    "configuraciones": "id",
+    "logs": "id",
+}
+SERIAL_TABLES = {"logs"}
+DEFAULT_COLUMNS = {
+    "remitos": {"estado_remito": "despachado", "activo": True},
+    "telefonos_empresa": {"activo": True},
+}
+TIMESTAMP_COLUMNS = {"logs": "timestamp", "telefonos_empresa": "created_at"}
+
+
+class FakePostgREST:
+    """Tablas en memoria servidas con la semántica mínima de PostgREST."""
+
+    def __init__(self, latency: Optional[LatencyModel] = None, seed: int = 7) -> None:
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.latency = latency or LatencyModel()
+        self.requests = 0
+        # Tablas de solo escritura (ej. logs) que no se guardan, para no inflar la memoria
+        self.discard_tables: set = set()
+        self._rng = random.Random(seed)
+        self._serial = itertools.count(1)
+        self.functions: Dict[str, Callable[[Dict[str, Any]], List[Dict[str, Any]]]] = {
+            "remitos_buscar": self._remitos_buscar,
+        }
+
+    # -- transports -------------------------------------------------------
+
+    def async_transport(self) -> httpx.MockTransport:
+        async def handler(request: httpx.Request) -> httpx.Response:
+            delay = self.latency.sample(self._rng)
+            if delay:
+                await asyncio.sleep(delay)
+            return self.handle(request)
+
+        return httpx.MockTransport(handler)
+
+    def sync_transport(self) -> httpx.MockTransport:
+        def handler(request: httpx.Request) -> httpx.Response:
+            delay = self.latency.sample(self._rng)
+            if delay:
+                time.sleep(delay)
+            return self.handle(request)
+
+        return httpx.MockTransport(handler)
+
+    # -- datos ------------------------------------------------------------
+
+    def seed(self, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self._insert_row(table, row) for row in rows]
+
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        return self.tables.setdefault(table, [])
+
+    # -- request handling -------------------------------------------------
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        path = request.url.path.split("/rest/v1/", 1)[-1].strip("/")
+        params = parse_qsl(request.url.query.decode(), keep_blank_values=True)
+        try:
+            if path.startswith("rpc/"):
+                function = self.functions.get(path[4:])
+                if function is None:
+                    return httpx.Response(404, json={"message": f"RPC {path[4:]} no disponible en el fake"})
+                # Como en PostgREST, los filtros y el orden se aplican sobre las filas de la función
+                rows = function(json.loads(request.content or b"{}"))
+                return self._select(path, params, request, rows)
+            if request.method == "GET":
+                return self._select(path, params, request)
+            if request.method == "POST":
+                return self._insert(path, params, request)
+            if request.method == "PATCH":
+                return self._update(path, params, request)
+            if request.method == "DELETE":
+                return self._delete(path, params)
+        except _Conflict as exc:
+            return httpx.Response(409, json={"code": "23505", "message": str(exc)})
+        return httpx.Response(405, json={"message": "Método no soportado"})
+
+    def _select(
+        self,
+        table: str,
+        params: List[Tuple[str, str]],
+        request: httpx.Request,
+        source: Optional[List[Dict[str, Any]]] = None,
+    ) -> httpx.Response:
+        select = "*"
+        order: Optional[str] = None
+        limit: Optional[int] = None
+        offset = 0
+        filters = []
+        for key, value in params:
+            if key == "select":
+                select = value
+            elif key == "order":
+                order = value
+            elif key == "limit":
+                limit = int(value)
+            elif key == "offset":
+                offset = int(value)
+            else:
+                filters.append((key, value))
+
+        rows = [row for row in (self.rows(table) if source is None else source) if _matches(row, filters)]
+        total = len(rows)
+        if order:
+            for part in reversed(order.split(",")):
+                column, _, direction = part.partition(".")
+                rows.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=direction.startswith("desc"))
+        rows = rows[offset:]
+        if limit is not None:
+            rows = rows[:limit]
+
+        data = [self._project(table, row, select) for row in rows]
+        headers = {}
+        if "count=exact" in request.headers.get("prefer", ""):
+            headers["content-range"] = f"0-{max(len(data) - 1, 0)}/{total}"
+        return httpx.Response(200, json=data, headers=headers)
+
+    def _insert(self, table: str, params: List[Tuple[str, str]], request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content or b"[]")
+        rows = payload if isinstance(payload, list) else [payload]
+        upsert = "resolution=merge-duplicates" in request.headers.get("prefer", "")
+        created = []
+        existing = len(self.rows(table))
+        try:
+            for row in rows:
+                if upsert:
+                    created.append(self._upsert_row(table, row))
+                else:
+                    created.append(self._insert_row(table, row))
+        except _Conflict:
+            # Como en Postgres, un insert de varias filas es atómico
+            if not upsert:
+                del self.rows(table)[existing:]
+            raise
+        return httpx.Response(201, json=created)
+
+    def _update(self, table: str, params: List[Tuple[str, str]], request: httpx.Request) -> httpx.Response:
+        changes = json.loads(request.content or b"{}")
+        updated = []
+        for row in self.rows(table):
+            if _matches(row, params):
+                row.update(changes)
+                updated.append(copy.copy(row))
+        return httpx.Response(200, json=updated)
+
+    def _delete(self, table: str, params: List[Tuple[str, str]]) -> httpx.Response:
+        kept, deleted = [], []
+        for row in self.rows(table):
+            (deleted if _matches(row, params) else kept).append(row)
+        self.tables[table] = kept
+        return httpx.Response(200, json=deleted)
+
+    def _insert_row(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        row = {**DEFAULT_COLUMNS.get(table, {}), **row}
+        pk = PRIMARY_KEYS.get(table)
+        if pk and row.get(pk) is None:
+            row[pk] = next(self._serial) if table in SERIAL_TABLES else str(uuid.uuid4())
+        elif pk and any(existing.get(pk) == row[pk] for existing in self.rows(table)):
+            raise _Conflict(f"duplicate key value violates unique constraint \"{table}_pkey\"")
+        timestamp_column = TIMESTAMP_COLUMNS.get(table)
+        if timestamp_column and timestamp_column not in row:
+            row[timestamp_column] = datetime.now(timezone.utc).isoformat()
+        if table not in self.discard_tables:
+            self.rows(table).append(row)
+        return copy.copy(row)
+
+    def _upsert_row(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        pk = PRIMARY_KEYS.get(table)
+        for existing in self.rows(table):
+            if pk and existing.get(pk) == row.get(pk):
+                existing.update(row)
+                return copy.copy(existing)
+        return self._insert_row(table, row)
+
+    def _remitos_buscar(self, args: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Aproximación de remitos_buscar (migración 0008): coincide si el texto
+        aparece en las columnas de búsqueda o si todas sus palabras están;
+        primero los que tienen más palabras completas, después los más nuevos.
+        """
+        text = str(args.get("p_q") or "").strip().lower()
+        if not text:
+            return []
+        words = text.split()
+        scored = []
+        for row in self.rows("remitos"):
+            haystack = " ".join(
+                str(row.get(column) or "")
+                for column in (
+                    "id_remito",
+                    "nombre_destino",
+                    "nombre_establecimiento",
+                    "nombre_chacra",
+                    "nombre_conductor",
+                    "matricula_camion",
+                    "matricula_zorra",
+                    "cedula_conductor",
+                )
+            ).lower()
+            tokens = set(haystack.split())
+            if text in haystack or all(word in haystack for word in words):
+                scored.append((sum(word in tokens for word in words), str(row.get("timestamp_creacion")), row))
+        scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return [row for _, _, row in scored]
+
+    def _project(self, table: str, row: Dict[str, Any], select: str) -> Dict[str, Any]:
+        columns = _split_top_level(select)
+        result: Dict[str, Any] = {}
+        for column in columns:
+            column = column.strip()
+            embed = re.match(r"^(\w+)\((.*)\)$", column)
+            if embed:
+                related, inner = embed.groups()
+                fk = PRIMARY_KEYS.get(related)
+                match = next((r for r in self.rows(related) if fk and r.get(fk) == row.get(fk)), None)
+                result[related] = self._project(related, match, inner) if match else None
+            elif column == "*":
+                result.update(row)
+            elif column:
+                result[column] = row.get(column)
+        return result
+
+
+class _Conflict(Exception):
+    pass
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Separa por comas ignorando las que están dentro de paréntesis."""
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append("".join(current))
+    return parts
+
+
+def _matches(row: Dict[str, Any], filters: List[Tuple[str, str]]) -> bool:
+    for column, expression in filters:
+        if column == "or":
+            options = _split_top_level(expression.strip("()"))
+            if not any(_matches(row, [tuple(option.split(".", 1))]) for option in options):
+                return False
+            continue
+        if not _compare(_column_value(row, column), expression):
+            return False
+    return True
+
+
+def _column_value(row: Dict[str, Any], column: str) -> Any:
+    """Valor de una columna o de una ruta JSON de PostgREST (col->>clave)."""
+    if "->" not in column:
+        return row.get(column)
+    base, *path = re.split(r"->>?", column)
+    value: Any = row.get(base)
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _compare(value: Any, expression: str) -> bool:
+    operator, _, operand = expression.partition(".")
+    if operator == "eq":
+        if isinstance(value, bool):
+            return str(value).lower() == operand.lower()
+        return value is not None and str(value) == operand
+    if operator == "neq":
+        return value is None or str(value) != operand
+    if operator == "ilike":
+        return value is not None and re.match(_like_regex(operand), str(value), re.IGNORECASE | re.DOTALL) is not None
+    if operator in {"gte", "gt", "lte", "lt"}:
+        if value is None:
+            return False
+        left, right = str(value), operand
+        return {
+            "gte": left >= right,
+            "gt": left > right,
+            "lte": left <= right,
+            "lt": left < right,
+        }[operator]
+    if operator == "is":
+        return (value is None) if operand == "null" else str(value).lower() == operand
+    if operator == "in":
+        return str(value) in {item.strip('"') for item in operand.strip("()").split(",")}
+    raise ValueError(f"Operador no soportado por el fake: {operator}")
+
+
+def _like_regex(pattern: str) -> str:
+    """LIKE de Postgres a regex: % y * (alias de PostgREST) son .*, _ es ., \\ escapa."""
+    parts = ["^"]
+    chars = iter(pattern)
+    for char in chars:
+        if char == "\\":
+            parts.append(re.escape(next(chars, "\\")))
+        elif char in "%*":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    parts.append("$")
+    return "".join(parts)
+
+
+@dataclass
+class _Bucket:
+    name: str
+
+
+class FakeStorage:
+    """Reemplazo de `supabase.storage` con latencia de subida simulada."""
+
+    def __init__(self, latency: Optional[LatencyModel] = None, seed: int = 11) -> None:
+        self.latency = latency or LatencyModel()
+        self.buckets: Dict[str, Dict[str, bytes]] = {}
+        self.uploads = 0
+        self.bytes_uploaded = 0
+        self._rng = random.Random(seed)
+
+    def list_buckets(self) -> List[_Bucket]:
+        return [_Bucket(name) for name in self.buckets]
+
+    def create_bucket(self, name: str, options: Optional[Dict[str, Any]] = None) -> None:
+        self.buckets.setdefault(name, {})
+
+    def update_bucket(self, name: str, options: Dict[str, Any]) -> None:
+        return None
+
+    def from_(self, name: str) -> "_FakeBucketApi":
+        return _FakeBucketApi(self, name)
+
+
+class _FakeBucketApi:
+    def __init__(self, storage: FakeStorage, name: str) -> None:
+        self.storage = storage
+        self.name = name
+
+    def upload(self, file: bytes, path: str, file_options: Optional[Dict[str, Any]] = None) -> None:
+        delay = self.storage.latency.sample(self.storage._rng)
+        if delay:
+            time.sleep(delay)
+        self.storage.buckets.setdefault(self.name, {})[path] = file
+        self.storage.uploads += 1
+        self.storage.bytes_uploaded += len(file)
+
+    def get_public_url(self, path: str) -> str:
+        return f"https://storage.fake/{self.name}/{path}"
+
+
+class FakeSupabaseClient:
+    """Lo único que usa QRCodeService del cliente de supabase-py es `.storage`."""
+
+    def __init__(self, storage: FakeStorage) -> None:
+        self.storage = storage
+
+
+# Campos que el LLM simulado necesita para devolver el JSON del remito
+REMITO_FIELDS = (
+    "nombre_empresa",
+    "nombre_establecimiento",
+    "nombre_chacra",
+    "nombre_conductor",
+    "cedula_conductor",
+    "matricula_camion",
+    "matricula_zorra",
+    "peso_estimado_tn",
+    "nombre_destino",
+)
+_PAIR_PATTERN = re.compile(r"(\w+)\s*:\s*([^;\n]+)")
+_SLOT_LINE_PATTERN = re.compile(r"^- (\w+): (.*)$", re.MULTILINE)
+
+
+@dataclass
+class ScriptedLLM:
+    """
+    Imita la API de Anthropic Messages.
+
+    Recorre los mensajes del usuario en el historial buscando pares
+    "campo: valor"; mientras falten campos pide el siguiente y, cuando están
+    todos, responde con el bloque JSON del remito como haría el modelo real.
+    Si el pedido ofrece herramientas, el remito se entrega como tool_use; con
+    la herramienta forzada de slots lee el ESTADO DEL REMITO del prompt y
+    devuelve solo los campos del último mensaje.
+    """
+
+    latency: LatencyModel = field(default_factory=lambda: LatencyModel(median_ms=800, sigma=0.4))
+    seed: int = 13
+    calls: int = 0
+
+    def __post_init__(self) -> None:
+        self._rng = random.Random(self.seed)
+
+    def transport(self) -> httpx.MockTransport:
+        async def handler(request: httpx.Request) -> httpx.Response:
+            self.calls += 1
+            delay = self.latency.sample(self._rng)
+            if delay:
+                await asyncio.sleep(delay)
+            payload = json.loads(request.content)
+            input_tokens = (len(payload.get("system", "")) + sum(len(m["content"]) for m in payload["messages"])) // 4
+            tools = payload.get("tools") or []
+            text, remito = self.reply(payload.get("messages", []))
+            if (payload.get("tool_choice") or {}).get("type") == "tool":
+                content = [
+                    {
+                        "type": "tool_use",
+                        "id": f"toolu_{self.calls}",
+                        "name": tools[0]["name"],
+                        "input": self.slot_update(payload.get("system", ""), payload["messages"][-1]["content"]),
+                    }
+                ]
+            elif remito is not None and tools:
+                content = [
+                    {"type": "text", "text": "Listo, genero el remito."},
+                    {"type": "tool_use", "id": f"toolu_{self.calls}", "name": payload["tools"][0]["name"], "input": remito},
+                ]
+            elif remito is not None:
+                text = "Listo, genero el remito:\n```json\n" + json.dumps(remito, ensure_ascii=False) + "\n```"
+                content = [{"type": "text", "text": text}]
+            else:
+                content = [{"type": "text", "text": text}]
+            return httpx.Response(
+                200,
+                json={
+                    "id": f"msg_{self.calls}",
+                    "type": "message",
+                    "role": "assistant",
+                    "content": content,
+                    "usage": {"input_tokens": input_tokens, "output_tokens": len(json.dumps(content)) // 4},
+                },
+            )
+
+        return httpx.MockTransport(handler)
+
+    def slot_update(self, system: str, message: str) -> Dict[str, Any]:
+        """Argumentos de actualizar_remito para el último mensaje, según el estado del prompt."""
+        known = {
+            key: value
+            for key, value in _SLOT_LINE_PATTERN.findall(system)
+            if key in REMITO_FIELDS and value != "(falta)"
+        }
+        updates: Dict[str, Any] = {name: None for name in REMITO_FIELDS}
+        for key, value in _PAIR_PATTERN.findall(message):
+            if key in REMITO_FIELDS:
+                updates[key] = value.strip()
+                known[key] = value.strip()
+
+        missing = [name for name in REMITO_FIELDS if name not in known]
+        if missing:
+            mensaje = f"Perfecto. ¿Me pasás {missing[0].replace('_', ' ')}?"
+        else:
+            mensaje = "📋 *RESUMEN DEL REMITO*\n" + "\n".join(f"• {k}: {v}" for k, v in known.items()) + "\n¿Todo correcto? ✅"
+        if updates["peso_estimado_tn"] is not None:
+            updates["peso_estimado_tn"] = float(updates["peso_estimado_tn"])
+        return {"mensaje": mensaje, **updates, "confirmado": "confirmo" in message.lower()}
+
+    def reply(self, messages: List[Dict[str, str]]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Retorna (texto, remito); el remito es None mientras falten campos."""
+        collected: Dict[str, str] = {}
+        for message in messages:
+            if message.get("role") != "user":
+                continue
+            for key, value in _PAIR_PATTERN.findall(message.get("content", "")):
+                if key in REMITO_FIELDS:
+                    collected[key] = value.strip()
+
+        missing = [name for name in REMITO_FIELDS if name not in collected]
+        if missing:
+            return f"Perfecto. ¿Me pasás {missing[0].replace('_', ' ')}?", None
+
+        data: Dict[str, Any] = dict(collected)
+        data["peso_estimado_tn"] = float(data["peso_estimado_tn"])
+        return "", data
+
+
+class FakeGraphAPI:
+    """Endpoints /messages y /media de WhatsApp Cloud API."""
+
+    def __init__(self, latency: Optional[LatencyModel] = None, seed: int = 17) -> None:
+        self.latency = latency or LatencyModel()
+        self.sent: Dict[str, int] = {}
+        self.uploads = 0
+        self._rng = random.Random(seed)
+        self._ids = itertools.count(1)
+
+    def transport(self) -> httpx.MockTransport:
+        async def handler(request: httpx.Request) -> httpx.Response:
+            delay = self.latency.sample(self._rng)
+            if delay:
+                await asyncio.sleep(delay)
+            if request.url.path.endswith("/media"):
+                self.uploads += 1
+                return httpx.Response(200, json={"id": f"media-{next(self._ids)}"})
+            payload = json.loads(request.content)
+            kind = payload.get("type", "unknown")
+            self.sent[kind] = self.sent.get(kind, 0) + 1
+            return httpx.Response(
+                200,
+                json={
+                    "messaging_product": "whatsapp",
+                    "contacts": [{"input": payload.get("to"), "wa_id": payload.get("to")}],
+                    "messages": [{"id": f"wamid.{next(self._ids)}"}],
+                },
+            )
+
+        return httpx.MockTransport(handler)
+
+
+def whatsapp_webhook_payload(from_number: str, body: str, message_id: Optional[str] = None) -> Dict[str, Any]:
+    """Payload de webhook tal como lo envía Meta para un mensaje de texto."""
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [
+            {
+                "id": "fake-waba",
+                "changes": [
+                    {
+                        "field": "messages",
+                        "value": {
+                            "messaging_product": "whatsapp",
+                            "metadata": {"phone_number_id": "fake-phone-id"},
+                            "messages": [
+                                {
+                                    "from": from_number,
+                                    "id": message_id or f"wamid.{uuid.uuid4().hex}",
+                                    "timestamp": str(int(time.time())),
+                                    "type": "text",
+                                    "text": {"body": body},
+                                }
+                            ],
+                        },
+                    }
+                ],
+            }
+        ],
+    }
+
@@ -0,0 +1,493 @@
+"""
+Prueba de carga offline del webhook de WhatsApp.
+
+Levanta la app FastAPI real contra dobles en proceso (PostgREST en memoria,
+LLM con guion y latencia configurable, Graph API y Storage simulados) y
+reproduce miles de conversaciones sintéticas de choferes a través de
+POST /webhook/whatsapp. Cada conversación termina en un remito con QR.
+
+Reporta throughput, p50/p95/p99 por etapa (a partir de las trazas de
+app.core.tracing) y crecimiento de memoria. Con --thresholds compara contra
+límites de regresión y termina con código 1 si alguno se supera.
+
+Uso:
+    python -m benchmarks.load_test --conversations 2000 --concurrency 200
+    python -m benchmarks.load_test --thresholds benchmarks/load_thresholds.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+# La configuración se lee del entorno al importar la app: apuntar todo a los fakes
+# antes de cualquier import de app.*
+FAKE_ENV = {
+    "SUPABASE_URL": "http://supabase.fake",
+    "SUPABASE_SERVICE_ROLE_KEY": "fake.service.key",
+    "SUPABASE_ANON_KEY": "fake.anon.key",
+    "CLAUDE_API_KEY": "fake-claude-key",
+    "OPENAI_API_KEY": "",
+    "WHATSAPP_TOKEN": "fake-token",
+    "WHATSAPP_PHONE_ID": "fake-phone-id",
+    "CLUSTER_MODE": "false",
+    "CONVERSATION_BACKEND": "memory",
+    "TRACING_ENABLED": "true",
+    "TRACING_BUFFER_SIZE": "50",
+}
+
+import httpx  # noqa: E402
+
+from benchmarks.fakes import (  # noqa: E402
+    FakeGraphAPI,
+    FakePostgREST,
+    FakeStorage,
+    FakeSupabaseClient,
+    LatencyModel,
+    ScriptedLLM,
+    whatsapp_webhook_payload,
+)
+
+# Etapas que se reportan, en el orden del pipeline
+REPORTED_STAGES = (
+    "whatsapp.message",
+    "contact_lock.wait",
+    "prompt_build",
+    "phone_resolution",
+    "context_load",
+    "llm",
+    "json_extraction",
+    "validation",
+    "catalog_resolution",
+    "remito_create",
+    "qr_render",
+    "qr_upload",
+    "remito_insert",
+    "whatsapp_upload",
+    "whatsapp_send",
+    "db",
+)
+
+
+class StageCollector:
+    """Exportador de trazas que acumula duraciones por nombre de span."""
+
+    def __init__(self) -> None:
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+        self.traces = 0
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def export(self, trace: Any) -> None:
+        self.traces += 1
+        for span in trace.spans:
+            self.durations[span.name].append(span.duration_ms)
+            if span.status == "error":
+                self.errors[span.name] += 1
+
+    def close(self) -> None:
+        return None
+
+    def reset(self) -> None:
+        self.durations.clear()
+        self.errors.clear()
+        self.traces = 0
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for name in REPORTED_STAGES:
+            values = sorted(self.durations.get(name, []))
+            if not values:
+                continue
+            result[name] = {
+                "count": len(values),
+                "p50_ms": round(_percentile(values, 50), 2),
+                "p95_ms": round(_percentile(values, 95), 2),
+                "p99_ms": round(_percentile(values, 99), 2),
+                "max_ms": round(values[-1], 2),
+                "errors": self.errors.get(name, 0),
+            }
+        return result
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status", encoding="utf-8") as handle:
+            for line in handle:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@dataclass
+class Scenario:
+    conversations: int = 1000
+    concurrency: int = 100
+    warmup: int = 50
+    empresas: int = 20
+    llm_median_ms: float = 300.0
+    llm_sigma: float = 0.5
+    db_median_ms: float = 5.0
+    db_sigma: float = 0.3
+    graph_median_ms: float = 40.0
+    storage_median_ms: float = 30.0
+    sync_db: bool = False
+    # Pedir el remito como JSON dentro del texto en lugar de tool use
+    text_json: bool = False
+    # Estado de slots (prompt constante); agrega un turno de confirmación
+    slot_state: bool = True
+    # Cada chofer ya hizo un viaje antes de la medición: el remito medido
+    # sale del perfil precargado (saludo + confirmación)
+    repeat_trips: bool = False
+    # Control de admisión del webhook activo: los mensajes rechazados no crean remito
+    admission: bool = False
+    seed: int = 42
+
+
+class LoadHarness:
+    def __init__(self, scenario: Scenario) -> None:
+        self.scenario = scenario
+        self.rng = random.Random(scenario.seed)
+        self.db = FakePostgREST(LatencyModel(scenario.db_median_ms, scenario.db_sigma), seed=scenario.seed)
+        # Los logs no se releen: descartarlos evita medir la memoria del fake
+        self.db.discard_tables.add("logs")
+        self.storage = FakeStorage(LatencyModel(scenario.storage_median_ms, 0.3), seed=scenario.seed + 1)
+        self.llm = ScriptedLLM(LatencyModel(scenario.llm_median_ms, scenario.llm_sigma), seed=scenario.seed + 2)
+        self.graph = FakeGraphAPI(LatencyModel(scenario.graph_median_ms, 0.3), seed=scenario.seed + 3)
+        self.collector = StageCollector()
+        self.settings: Any = None
+        self.app: Any = None
+
+    @property
+    def uses_slots(self) -> bool:
+        return self.scenario.slot_state and not self.scenario.text_json
+
+    def build_app(self) -> None:
+        for key, value in FAKE_ENV.items():
+            os.environ[key] = value
+        os.environ["SUPABASE_ASYNC_DB"] = "false" if self.scenario.sync_db else "true"
+        os.environ["LLM_STRUCTURED_OUTPUT"] = "false" if self.scenario.text_json else "true"
+        os.environ["CONVERSATION_SLOT_STATE"] = "true" if self.uses_slots else "false"
+        os.environ["ADMISSION_CONTROL"] = "true" if self.scenario.admission else "false"
+
+        from postgrest import SyncPostgrestClient
+
+        from app.core.data_access import build_async_postgrest_client
+        from app.core.settings import get_settings
+        from app.core.tracing import get_tracer
+        from app.main import create_app
+
+        get_settings.cache_clear()
+        settings = get_settings()
+
+        rest_url = f"{FAKE_ENV['SUPABASE_URL']}/rest/v1"
+        sync_client = SyncPostgrestClient(rest_url)
+        sync_client.session = httpx.Client(base_url=rest_url, transport=self.db.sync_transport())
+        settings.data_access.sync_client = sync_client
+        if settings.data_access.async_client is not None:
+            settings.data_access.async_client = build_async_postgrest_client(
+                FAKE_ENV["SUPABASE_URL"],
+                FAKE_ENV["SUPABASE_SERVICE_ROLE_KEY"],
+                pool_size=settings.supabase_pool_size,
+                transport=self.db.async_transport(),
+            )
+        settings.qrcode_service.supabase = FakeSupabaseClient(self.storage)
+        settings.llm_service.transport = self.llm.transport()
+        settings.whatsapp_service.transport = self.graph.transport()
+        get_tracer().exporter = self.collector
+
+        self.settings = settings
+        self.app = create_app()
+
+    def seed_catalog(self) -> None:
+        from app.core.phone_service import PhoneService
+
+        self.db.seed("configuraciones", [{"id": 1, "llm_prompt": None}])
+        self.empresas = self.db.seed(
+            "empresas", [{"nombre": f"Agro {index:03d}"} for index in range(self.scenario.empresas)]
+        )
+        self.establecimientos = []
+        for empresa in self.empresas:
+            for index in range(3):
+                (establecimiento,) = self.db.seed(
+                    "establecimientos",
+                    [{"nombre": f"Estancia {empresa['nombre'][-3:]}-{index}", "id_empresa": empresa["id_empresa"]}],
+                )
+                self.establecimientos.append(establecimiento)
+                self.db.seed(
+                    "chacras",
+                    [
+                        {
+                            "nombre_chacra": f"Potrero {chacra}",
+                            "id_establecimiento": establecimiento["id_establecimiento"],
+                            "id_empresa": empresa["id_empresa"],
+                        }
+                        for chacra in range(5)
+                    ],
+                )
+        self.db.seed("destinos", [{"nombre": f"Planta {index}"} for index in range(5)])
+
+        total = self.scenario.conversations + self.scenario.warmup
+        self.db.seed(
+            "telefonos_empresa",
+            [
+                {
+                    "numero": self._phone(index),
+                    "numero_normalizado": PhoneService.normalize_phone(self._phone(index)),
+                    "id_empresa": self.empresas[index % len(self.empresas)]["id_empresa"],
+                }
+                for index in range(total)
+            ],
+        )
+
+    @staticmethod
+    def _phone(index: int) -> str:
+        return f"5989{index:07d}"
+
+    def script_for(self, index: int, repeat: bool = False) -> List[str]:
+        """Mensajes del chofer; los datos van como "campo: valor" para el LLM con guion."""
+        if repeat and self.uses_slots:
+            return ["Hola, quiero hacer un remito", "Sí, confirmo"]
+        empresa = self.empresas[index % len(self.empresas)]
+        establecimientos = [e for e in self.establecimientos if e["id_empresa"] == empresa["id_empresa"]]
+        establecimiento = establecimientos[index % len(establecimientos)]
+        # Chacras sembradas, compartidas entre choferes concurrentes (el nombre
+        # se escribe distinto para pasar por la resolución del catálogo)
+        chacra = f"potrero {index % 5}"
+        script = [
+            "Hola, quiero hacer un remito",
+            f"nombre_empresa: {empresa['nombre']}; nombre_establecimiento: {establecimiento['nombre']}; "
+            f"nombre_chacra: {chacra}",
+            f"nombre_conductor: Chofer {index}; cedula_conductor: {4_000_000 + index}; "
+            f"matricula_camion: SAB{index % 10_000:04d}; matricula_zorra: ninguna",
+            f"peso_estimado_tn: {self.rng.randint(10, 35)}; nombre_destino: Planta {index % 5}",
+        ]
+        if self.uses_slots:
+            # Con slots el remito se crea recién cuando se confirma el resumen
+            script.append("Sí, confirmo")
+        return script
+
+    async def _run_conversation(
+        self, client: httpx.AsyncClient, index: int, stats: Dict[str, Any], repeat: bool
+    ) -> None:
+        phone = self._phone(index)
+        for body in self.script_for(index, repeat):
+            response = await client.post("/webhook/whatsapp", json=whatsapp_webhook_payload(phone, body))
+            stats["messages"] += 1
+            if response.status_code != 200 or response.json().get("status") != "ok":
+                stats["webhook_errors"] += 1
+
+    async def _run_batch(self, start: int, count: int, repeat: bool = False) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"messages": 0, "webhook_errors": 0}
+        semaphore = asyncio.Semaphore(self.scenario.concurrency)
+        transport = httpx.ASGITransport(app=self.app)
+
+        async def _guarded(index: int) -> None:
+            async with semaphore:
+                await self._run_conversation(client, index, stats, repeat)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://backend", timeout=None) as client:
+            await asyncio.gather(*(_guarded(index) for index in range(start, start + count)))
+        return stats
+
+    def _admission_report(self) -> Optional[Dict[str, Any]]:
+        controller = self.settings.admission_controller
+        if controller is None:
+            return None
+        from app.core.metrics import WEBHOOK_SHED
+
+        shed: Dict[str, float] = {}
+        for metric in WEBHOOK_SHED.collect():
+            for sample in metric.samples:
+                if sample.name.endswith("_total"):
+                    reply = sample.labels["reply"]
+                    shed[reply] = shed.get(reply, 0) + sample.value
+        return {**controller.stats(), "shed": shed}
+
+    async def run(self) -> Dict[str, Any]:
+        self.build_app()
+        self.seed_catalog()
+
+        await self._run_batch(self.scenario.conversations, self.scenario.warmup)
+        if self.scenario.repeat_trips:
+            # Primer viaje de cada chofer medido: deja su perfil en el cache
+            await self._run_batch(0, self.scenario.conversations)
+        self.collector.reset()
+        remitos_before = len(self.db.rows("remitos"))
+        gc.collect()
+        rss_start = _rss_mb()
+
+        started = time.perf_counter()
+        stats = await self._run_batch(0, self.scenario.conversations, repeat=self.scenario.repeat_trips)
+        elapsed = time.perf_counter() - started
+
+        gc.collect()
+        rss_end = _rss_mb()
+        remitos = len(self.db.rows("remitos")) - remitos_before
+        failed_remitos = self.scenario.conversations - remitos
+
+        from app.core.executors import get_executors
+
+        return {
+            "scenario": self.scenario.__dict__,
+            "throughput": {
+                "elapsed_s": round(elapsed, 2),
+                "messages": stats["messages"],
+                "messages_per_s": round(stats["messages"] / elapsed, 1),
+                "conversations_per_s": round(self.scenario.conversations / elapsed, 2),
+            },
+            "errors": {
+                "webhook_errors": stats["webhook_errors"],
+                "remitos_missing": failed_remitos,
+                "error_rate": round((stats["webhook_errors"] + failed_remitos) / max(stats["messages"], 1), 4),
+            },
+            "stages": self.collector.summary(),
+            "memory": {
+                "rss_start_mb": round(rss_start, 1),
+                "rss_end_mb": round(rss_end, 1),
+                "growth_mb": round(rss_end - rss_start, 1),
+                "growth_kb_per_conversation": round((rss_end - rss_start) * 1024 / self.scenario.conversations, 2),
+                "conversation_contacts": len(self.settings.conversation_store.contacts()),
+            },
+            "fakes": {
+                "postgrest_requests": self.db.requests,
+                "llm_calls": self.llm.calls,
+                "whatsapp_sent": dict(self.graph.sent),
+                "whatsapp_uploads": self.graph.uploads,
+                "storage_uploads": self.storage.uploads,
+            },
+            "executors": get_executors().stats(),
+            "admission": self._admission_report(),
+            "llm_output": _llm_output_summary(),
+        }
+
+
+def _llm_output_summary() -> Dict[str, Any]:
+    """Formas de respuesta del LLM y turnos por remito (incluye el calentamiento)."""
+    from app.core.metrics import LLM_REPLY_FORMAT, TURNS_PER_REMITO
+
+    formats: Dict[str, float] = {}
+    for metric in LLM_REPLY_FORMAT.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_total"):
+                key = f"{sample.labels['mode']}.{sample.labels['kind']}"
+                formats[key] = formats.get(key, 0) + sample.value
+
+    turns: Dict[str, Dict[str, float]] = {}
+    for metric in TURNS_PER_REMITO.collect():
+        for sample in metric.samples:
+            entry = turns.setdefault(sample.labels["mode"], {})
+            if sample.name.endswith("_sum"):
+                entry["sum"] = sample.value
+            elif sample.name.endswith("_count"):
+                entry["count"] = sample.value
+    avg_turns = {mode: round(entry["sum"] / entry["count"], 2) for mode, entry in turns.items() if entry.get("count")}
+    return {"reply_formats": formats, "avg_turns_per_remito": avg_turns}
+
+
+def check_thresholds(report: Dict[str, Any], thresholds: Dict[str, Any]) -> List[str]:
+    """Lista de límites superados; vacía si el run pasa."""
+    failures = []
+    throughput = report["throughput"]["messages_per_s"]
+    if "min_messages_per_s" in thresholds and throughput < thresholds["min_messages_per_s"]:
+        failures.append(f"messages_per_s {throughput} < {thresholds['min_messages_per_s']}")
+
+    error_rate = report["errors"]["error_rate"]
+    if "max_error_rate" in thresholds and error_rate > thresholds["max_error_rate"]:
+        failures.append(f"error_rate {error_rate} > {thresholds['max_error_rate']}")
+
+    growth = report["memory"]["growth_kb_per_conversation"]
+    if "max_memory_kb_per_conversation" in thresholds and growth > thresholds["max_memory_kb_per_conversation"]:
+        failures.append(f"memory growth {growth} KB/conversación > {thresholds['max_memory_kb_per_conversation']}")
+
+    for stage, limits in thresholds.get("stages", {}).items():
+        measured = report["stages"].get(stage)
+        if measured is None:
+            failures.append(f"{stage}: sin mediciones")
+            continue
+        for metric, limit in limits.items():
+            if measured.get(metric, 0) > limit:
+                failures.append(f"{stage}.{metric} {measured[metric]} > {limit}")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    defaults = Scenario()
+    parser.add_argument("--conversations", type=int, default=defaults.conversations)
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency)
+    parser.add_argument("--warmup", type=int, default=defaults.warmup)
+    parser.add_argument("--empresas", type=int, default=defaults.empresas)
+    parser.add_argument("--llm-median-ms", type=float, default=defaults.llm_median_ms)
+    parser.add_argument("--llm-sigma", type=float, default=defaults.llm_sigma)
+    parser.add_argument("--db-median-ms", type=float, default=defaults.db_median_ms)
+    parser.add_argument("--graph-median-ms", type=float, default=defaults.graph_median_ms)
+    parser.add_argument("--storage-median-ms", type=float, default=defaults.storage_median_ms)
+    parser.add_argument("--sync-db", action="store_true", help="Cliente supabase sync en hilos en vez del pool async")
+    parser.add_argument("--text-json", action="store_true", help="Remito como JSON en el texto en vez de tool use")
+    parser.add_argument("--no-slot-state", action="store_true", help="Enviar el historial completo en vez del estado de slots")
+    parser.add_argument(
+        "--repeat-trips", action="store_true", help="Medir viajes repetidos (perfil de conductor precargado)"
+    )
+    parser.add_argument(
+        "--admission", action="store_true", help="Con control de admisión (reporta mensajes rechazados y límite final)"
+    )
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--thresholds", help="JSON con límites de regresión")
+    parser.add_argument("--output", help="Guardar el reporte completo en este archivo")
+    args = parser.parse_args()
+
+    scenario = Scenario(
+        conversations=args.conversations,
+        concurrency=args.concurrency,
+        warmup=args.warmup,
+        empresas=args.empresas,
+        llm_median_ms=args.llm_median_ms,
+        llm_sigma=args.llm_sigma,
+        db_median_ms=args.db_median_ms,
+        graph_median_ms=args.graph_median_ms,
+        storage_median_ms=args.storage_median_ms,
+        sync_db=args.sync_db,
+        text_json=args.text_json,
+        slot_state=not args.no_slot_state,
+        repeat_trips=args.repeat_trips,
+        admission=args.admission,
+        seed=args.seed,
+    )
+    report = asyncio.run(LoadHarness(scenario).run())
+
+    failures: List[str] = []
+    if args.thresholds:
+        with open(args.thresholds, encoding="utf-8") as handle:
+            failures = check_thresholds(report, json.load(handle))
+        report["threshold_failures"] = failures
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(output)
+    print(output)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+-- Tiempo de las consultas de búsqueda de remitos sobre un millón de filas.
+--
+-- Corre contra una base con las migraciones aplicadas (Supabase local o un
+-- proyecto de prueba, nunca producción). Todo ocurre dentro de una
+-- transacción que se revierte al final: no deja datos ni cambia índices.
+--
+-- 1. Borra los índices de la migración 0008 e inserta 1.000.000 de remitos
+--    sintéticos (50 destinos, 200 chacras, 5.000 conductores).
+-- 2. Mide las consultas sin índices (lo que hacían los ILIKE '%x%' de GET /remitos).
+-- 3. Vuelve a aplicar 0008 (crea los índices) y mide las mismas consultas.
+--
+-- Uso (desde backend/):
+--     psql "$DATABASE_URL" -f benchmarks/sql/bench_remitos_busqueda.sql
+--
+-- Cada consulta imprime su plan con "Execution Time"; comparar el mismo
+-- número de consulta entre las dos secciones.
+
+\set ON_ERROR_STOP on
+\pset pager off
+
+BEGIN;
+
+-- El resumen diario (0007) no interviene en la búsqueda y haría más lenta la carga
+ALTER TABLE remitos DISABLE TRIGGER trg_remitos_resumen;
+
+DROP INDEX IF EXISTS idx_remitos_busqueda, idx_remitos_busqueda_trgm,
+    idx_remitos_nombre_destino_trgm, idx_remitos_nombre_establecimiento_trgm,
+    idx_remitos_nombre_chacra_trgm, idx_remitos_matricula_camion_trgm,
+    idx_remitos_matricula_zorra_trgm, idx_remitos_cedula_conductor_trgm,
+    idx_remitos_id_destino, idx_remitos_id_establecimiento, idx_remitos_id_chacra;
+
+CREATE TEMP TABLE bench_nombres (n integer PRIMARY KEY, destino text, establecimiento text);
+INSERT INTO bench_nombres
+SELECT n,
+       (ARRAY['Planta', 'Silo', 'Molino', 'Puerto', 'Terminal'])[n % 5 + 1] || ' ' ||
+       (ARRAY['Nueva Palmira', 'Fray Bentos', 'Young', 'Dolores', 'Mercedes', 'Paysandú',
+              'Montevideo', 'Durazno', 'Tacuarembó', 'Salto'])[n / 5 + 1],
+       'Estancia ' || (ARRAY['La Aurora', 'El Ombú', 'San Pedro', 'Los Talas', 'La Esperanza',
+                             'Santa Clara', 'El Tala', 'La Paloma', 'Don Bosco', 'Las Rosas'])[n % 10 + 1]
+FROM generate_series(0, 49) AS n;
+
+INSERT INTO empresas (id_empresa, nombre)
+VALUES ('00000000-0000-0000-0000-00000000be00', 'Agro Benchmark');
+
+INSERT INTO establecimientos (id_establecimiento, nombre, id_empresa)
+SELECT ('00000000-0000-0000-0001-' || lpad(n::text, 12, '0'))::uuid, establecimiento,
+       '00000000-0000-0000-0000-00000000be00'
+FROM bench_nombres WHERE n < 10;
+
+INSERT INTO chacras (id_chacra, nombre_chacra, id_establecimiento, id_empresa)
+SELECT ('00000000-0000-0000-0002-' || lpad(n::text, 12, '0'))::uuid, 'Potrero ' || (n / 10),
+       ('00000000-0000-0000-0001-' || lpad((n % 10)::text, 12, '0'))::uuid,
+       '00000000-0000-0000-0000-00000000be00'
+FROM generate_series(0, 199) AS n;
+
+INSERT INTO destinos (id_destino, nombre)
+SELECT ('00000000-0000-0000-0003-' || lpad(n::text, 12, '0'))::uuid, destino
+FROM bench_nombres;
+
+INSERT INTO remitos (
+    id_remito, id_chacra, id_destino, id_establecimiento, id_empresa,
+    nombre_chacra, nombre_establecimiento, nombre_empresa, nombre_destino,
+    nombre_conductor, cedula_conductor, matricula_camion, matricula_zorra,
+    peso_estimado_tn, timestamp_creacion
+)
+SELECT
+    'BENCH-' || lpad(i::text, 8, '0'),
+    ('00000000-0000-0000-0002-' || lpad((i % 200)::text, 12, '0'))::uuid,
+    ('00000000-0000-0000-0003-' || lpad((i % 50)::text, 12, '0'))::uuid,
+    ('00000000-0000-0000-0001-' || lpad((i % 10)::text, 12, '0'))::uuid,
+    '00000000-0000-0000-0000-00000000be00',
+    'Potrero ' || (i % 200 / 10),
+    e.establecimiento,
+    'Agro Benchmark',
+    d.destino,
+    'Conductor ' || (i % 5000),
+    (1000000 + i % 900000)::text,
+    'SA' || chr(65 + i % 26) || lpad((i % 10000)::text, 4, '0'),
+    CASE WHEN i % 3 = 0 THEN NULL ELSE 'ZA' || chr(65 + i % 26) || lpad((i % 7919)::text, 4, '0') END,
+    20 + (i % 150) / 10.0,
+    timezone('utc', now()) - (i || ' minutes')::interval
+FROM generate_series(1, 1000000) AS i
+JOIN bench_nombres d ON d.n = i % 50
+JOIN bench_nombres e ON e.n = i % 10;
+
+ANALYZE remitos;
+
+\echo
+\echo '===== Sin índices de búsqueda ====='
+\echo '-- 1. Filtro por nombre de destino (ILIKE %palmira%)'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT * FROM remitos WHERE nombre_destino ILIKE '%palmira%' ORDER BY timestamp_creacion DESC;
+\echo '-- 2. Filtro por matrícula (ILIKE %SAB1234%)'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT * FROM remitos WHERE matricula_camion ILIKE '%SAB1234%' ORDER BY timestamp_creacion DESC;
+\echo '-- 3. Filtro por cédula (ILIKE %1012345%)'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT * FROM remitos WHERE cedula_conductor ILIKE '%1012345%' ORDER BY timestamp_creacion DESC;
+\echo '-- 4. Búsqueda q=SAB1234 (primeros 50)'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT * FROM remitos_buscar('SAB1234') LIMIT 50;
+\echo '-- 5. Búsqueda q=conductor 4321 (primeros 50)'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT * FROM remitos_buscar('conductor 4321') LIMIT 50;
+\echo '-- 6. Búsqueda con error de tipeo q=condutor 4321 (primeros 50)'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT * FROM remitos_buscar('condutor 4321') LIMIT 50;
+
+-- Vuelve a aplicar la migración: las columnas ya existen, crea los índices
+\ir ../../../infra/supabase/migrations/0008_remitos_busqueda.sql
+ANALYZE remitos;
+
+\echo
+\echo '===== Con índices de la migración 0008 ====='
+\echo '-- 1. Filtro por nombre de destino (ILIKE %palmira%)'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT * FROM remitos WHERE nombre_destino ILIKE '%palmira%' ORDER BY timestamp_creacion DESC;
+\echo '-- 2. Filtro por matrícula (ILIKE %SAB1234%)'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT * FROM remitos WHERE matricula_camion ILIKE '%SAB1234%' ORDER BY timestamp_creacion DESC;
+\echo '-- 3. Filtro por cédula (ILIKE %1012345%)'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT * FROM remitos WHERE cedula_conductor ILIKE '%1012345%' ORDER BY timestamp_creacion DESC;
+\echo '-- 4. Búsqueda q=SAB1234 (primeros 50)'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT * FROM remitos_buscar('SAB1234') LIMIT 50;
+\echo '-- 5. Búsqueda q=conductor 4321 (primeros 50)'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT * FROM remitos_buscar('conductor 4321') LIMIT 50;
+\echo '-- 6. Búsqueda con error de tipeo q=condutor 4321 (primeros 50)'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT * FROM remitos_buscar('condutor 4321') LIMIT 50;
+
+ROLLBACK;
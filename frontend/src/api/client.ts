@@ -1,8 +1,31 @@
-import axios from "axios";
+import axios, { AxiosRequestConfig } from "axios";
 
-const BASE_URL = import.meta.env.VITE_BACKEND_BASE_URL ?? "http://localhost:8000";
+export const BASE_URL = import.meta.env.VITE_BACKEND_BASE_URL ?? "http://localhost:8000";
 
 export const apiClient = axios.create({
   baseURL: BASE_URL,
   timeout: 10_000
 });
+
+// Última versión recibida de cada GET (URL con parámetros). Se manda su ETag en
+// If-None-Match: si no cambió, el backend responde 304 sin cuerpo y se reutiliza.
+const etagCache = new Map<string, { etag: string; data: unknown }>();
+
+export async function getCached<T>(url: string, config: AxiosRequestConfig = {}): Promise<T> {
+  const key = apiClient.getUri({ ...config, url });
+  const cached = etagCache.get(key);
+  const response = await apiClient.get<T>(url, {
+    ...config,
+    headers: { ...config.headers, ...(cached ? { "If-None-Match": cached.etag } : {}) },
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304
+  });
+
+  if (response.status === 304 && cached) {
+    return cached.data as T;
+  }
+  const etag = response.headers["etag"];
+  if (typeof etag === "string") {
+    etagCache.set(key, { etag, data: response.data });
+  }
+  return response.data;
+}
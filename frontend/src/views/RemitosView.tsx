@@ -1,4 +1,6 @@
-import { useMemo } from "react";
+import { useCallback, useEffect, useState } from "react";
+
+import { BASE_URL, getCached } from "../api/client";
 
 interface Remito {
   id_remito: string;
@@ -9,10 +11,41 @@ interface Remito {
   activo: boolean;
 }
 
-const mockRemitos: Remito[] = [];
+interface RemitoEvent {
+  tipo: "creado" | "actualizado";
+  remito: Remito;
+}
 
 export function RemitosView(): JSX.Element {
-  const remitos = useMemo(() => mockRemitos, []);
+  const [remitos, setRemitos] = useState<Remito[]>([]);
+
+  const loadRemitos = useCallback(async () => {
+    try {
+      setRemitos(await getCached<Remito[]>("/remitos/"));
+    } catch (error) {
+      console.error("Error cargando remitos:", error);
+    }
+  }, []);
+
+  // Lista inicial y después solo eventos del backend (GET /remitos/events), sin polling
+  useEffect(() => {
+    loadRemitos();
+    const source = new EventSource(`${BASE_URL}/remitos/events`);
+    source.addEventListener("remito", (message) => {
+      const { remito } = JSON.parse((message as MessageEvent<string>).data) as RemitoEvent;
+      setRemitos((current) => {
+        const rest = current.filter((item) => item.id_remito !== remito.id_remito);
+        return current.length === rest.length
+          ? [remito, ...current]
+          : current.map((item) => (item.id_remito === remito.id_remito ? remito : item));
+      });
+    });
+    // Eventos perdidos (cliente atrasado o reconexión sin historial): recargar la lista
+    source.addEventListener("resync", () => {
+      loadRemitos();
+    });
+    return () => source.close();
+  }, [loadRemitos]);
 
   return (
     <section>
@@ -0,0 +1,33 @@
+-- Migración: Historial de conversaciones persistido
+-- Usado por SupabaseConversationStore (CONVERSATION_BACKEND=supabase) para que
+-- las conversaciones sobrevivan a redeploys y se compartan entre réplicas.
+
+CREATE TABLE IF NOT EXISTS conversation_turns (
+  id bigserial PRIMARY KEY,
+  contacto text NOT NULL,
+  role text NOT NULL CHECK (role IN ('user', 'assistant')),
+  message text NOT NULL,
+  created_at timestamptz NOT NULL DEFAULT timezone('utc', now())
+);
+
+-- Lectura de los últimos N turnos por contacto
+CREATE INDEX IF NOT EXISTS idx_conversation_turns_contacto ON conversation_turns(contacto, id DESC);
+
+-- Limpieza de conversaciones abandonadas (ejecutar periódicamente, por ejemplo con pg_cron)
+CREATE OR REPLACE FUNCTION purge_idle_conversation_turns(idle interval DEFAULT interval '6 hours')
+RETURNS integer AS $$
+DECLARE
+    deleted integer;
+BEGIN
+    DELETE FROM conversation_turns
+    WHERE contacto IN (
+        SELECT contacto FROM conversation_turns
+        GROUP BY contacto
+        HAVING max(created_at) < timezone('utc', now()) - idle
+    );
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+    RETURN deleted;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE conversation_turns IS 'Últimos turnos de conversación por contacto de WhatsApp';
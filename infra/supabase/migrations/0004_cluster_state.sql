@@ -0,0 +1,86 @@
+-- Migración: Estado compartido para correr varias réplicas del backend (CLUSTER_MODE=true)
+-- Deduplicación de mensajes, invalidación de caches y locks por contacto.
+
+CREATE TABLE IF NOT EXISTS cluster_dedup (
+  key text PRIMARY KEY,
+  expires_at timestamptz NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_cluster_dedup_expires ON cluster_dedup(expires_at);
+
+CREATE TABLE IF NOT EXISTS cluster_invalidations (
+  id bigserial PRIMARY KEY,
+  scope text NOT NULL,
+  key text,
+  origin text NOT NULL,
+  created_at timestamptz NOT NULL DEFAULT timezone('utc', now())
+);
+
+CREATE TABLE IF NOT EXISTS cluster_locks (
+  key text PRIMARY KEY,
+  owner text NOT NULL,
+  expires_at timestamptz NOT NULL
+);
+
+-- Retorna true si la clave no había sido vista (o ya expiró)
+CREATE OR REPLACE FUNCTION cluster_mark_seen(p_key text, p_ttl_seconds integer)
+RETURNS boolean AS $$
+DECLARE
+    inserted boolean;
+BEGIN
+    INSERT INTO cluster_dedup (key, expires_at)
+    VALUES (p_key, now() + make_interval(secs => p_ttl_seconds))
+    ON CONFLICT (key) DO UPDATE
+        SET expires_at = EXCLUDED.expires_at
+        WHERE cluster_dedup.expires_at < now()
+    RETURNING true INTO inserted;
+    RETURN coalesce(inserted, false);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Toma (o renueva) el lease de un contacto. El advisory lock de transacción
+-- serializa los intentos concurrentes sobre la misma clave; el lease en la
+-- tabla es lo que sobrevive entre llamadas de PostgREST.
+CREATE OR REPLACE FUNCTION cluster_try_lock(p_key text, p_owner text, p_ttl_seconds integer)
+RETURNS boolean AS $$
+DECLARE
+    current_owner text;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('remibot:' || p_key));
+
+    SELECT owner INTO current_owner
+    FROM cluster_locks
+    WHERE key = p_key AND expires_at > now();
+
+    IF current_owner IS NOT NULL AND current_owner <> p_owner THEN
+        RETURN false;
+    END IF;
+
+    INSERT INTO cluster_locks (key, owner, expires_at)
+    VALUES (p_key, p_owner, now() + make_interval(secs => p_ttl_seconds))
+    ON CONFLICT (key) DO UPDATE
+        SET owner = EXCLUDED.owner, expires_at = EXCLUDED.expires_at;
+    RETURN true;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION cluster_unlock(p_key text, p_owner text)
+RETURNS void AS $$
+BEGIN
+    DELETE FROM cluster_locks WHERE key = p_key AND owner = p_owner;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Limpieza periódica (por ejemplo con pg_cron)
+CREATE OR REPLACE FUNCTION cluster_purge_expired()
+RETURNS void AS $$
+BEGIN
+    DELETE FROM cluster_dedup WHERE expires_at < now();
+    DELETE FROM cluster_locks WHERE expires_at < now();
+    DELETE FROM cluster_invalidations WHERE created_at < timezone('utc', now()) - interval '1 day';
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE cluster_dedup IS 'Claves de deduplicación compartidas entre réplicas (ej. ids de mensajes de WhatsApp)';
+COMMENT ON TABLE cluster_invalidations IS 'Eventos de invalidación de caches locales, leídos por polling';
+COMMENT ON TABLE cluster_locks IS 'Leases por contacto para que un teléfono se procese en un solo nodo a la vez';
@@ -0,0 +1,8 @@
+-- Migración: Estado de slots del remito en el historial de conversación
+-- ConversationService (CONVERSATION_SLOT_STATE=true) guarda en cada turno los
+-- datos del remito ya validados como un turno con role 'slots', así el estado
+-- se comparte entre réplicas y se borra junto con la conversación.
+
+ALTER TABLE conversation_turns DROP CONSTRAINT IF EXISTS conversation_turns_role_check;
+ALTER TABLE conversation_turns
+  ADD CONSTRAINT conversation_turns_role_check CHECK (role IN ('user', 'assistant', 'slots'));
@@ -0,0 +1,7 @@
+-- Migración: Índice para el perfil de conductor por teléfono
+-- DriverProfileCache busca el último remito activo de un contacto
+-- (raw_payload->>'contacto') para precargar los datos de un viaje repetido.
+
+CREATE INDEX IF NOT EXISTS idx_remitos_contacto_fecha
+  ON remitos ((raw_payload->>'contacto'), timestamp_creacion DESC)
+  WHERE activo = TRUE;
@@ -0,0 +1,96 @@
+-- Migración: Totales diarios de remitos mantenidos por trigger
+-- GET /remitos/summary lee esta tabla en lugar de recorrer remitos: una fila
+-- por (día, empresa, establecimiento, chacra, destino) con cantidad y
+-- toneladas de los remitos activos. El día es el de Montevideo.
+
+-- Columnas que el backend ya escribe en cada remito y la migración inicial no declaraba
+ALTER TABLE remitos ADD COLUMN IF NOT EXISTS id_establecimiento uuid;
+ALTER TABLE remitos ADD COLUMN IF NOT EXISTS id_empresa uuid;
+ALTER TABLE remitos ADD COLUMN IF NOT EXISTS nombre_destino text;
+
+CREATE TABLE IF NOT EXISTS remitos_resumen_diario (
+  id bigserial PRIMARY KEY,
+  dia date NOT NULL,
+  id_empresa uuid,
+  id_establecimiento uuid,
+  id_chacra uuid NOT NULL,
+  id_destino uuid NOT NULL,
+  nombre_empresa text,
+  nombre_establecimiento text,
+  nombre_chacra text,
+  nombre_destino text,
+  cantidad integer NOT NULL DEFAULT 0,
+  toneladas numeric(14,2) NOT NULL DEFAULT 0,
+  updated_at timestamptz NOT NULL DEFAULT timezone('utc', now())
+);
+
+-- Remitos anteriores pueden no tener empresa/establecimiento: NULL cuenta como un valor más
+CREATE UNIQUE INDEX IF NOT EXISTS uq_remitos_resumen_diario_clave
+  ON remitos_resumen_diario (dia, id_empresa, id_establecimiento, id_chacra, id_destino) NULLS NOT DISTINCT;
+CREATE INDEX IF NOT EXISTS idx_remitos_resumen_diario_empresa_dia
+  ON remitos_resumen_diario (id_empresa, dia);
+
+-- Suma (signo = 1) o resta (signo = -1) un remito de su fila de totales
+CREATE OR REPLACE FUNCTION remitos_resumen_aplicar(r remitos, signo integer)
+RETURNS void AS $$
+BEGIN
+    INSERT INTO remitos_resumen_diario AS t (
+        dia, id_empresa, id_establecimiento, id_chacra, id_destino,
+        nombre_empresa, nombre_establecimiento, nombre_chacra, nombre_destino,
+        cantidad, toneladas
+    )
+    VALUES (
+        (r.timestamp_creacion AT TIME ZONE 'America/Montevideo')::date,
+        r.id_empresa, r.id_establecimiento, r.id_chacra, r.id_destino,
+        r.nombre_empresa, r.nombre_establecimiento, r.nombre_chacra, r.nombre_destino,
+        signo, signo * r.peso_estimado_tn
+    )
+    ON CONFLICT (dia, id_empresa, id_establecimiento, id_chacra, id_destino) DO UPDATE
+        SET cantidad = t.cantidad + EXCLUDED.cantidad,
+            toneladas = t.toneladas + EXCLUDED.toneladas,
+            nombre_empresa = coalesce(EXCLUDED.nombre_empresa, t.nombre_empresa),
+            nombre_establecimiento = coalesce(EXCLUDED.nombre_establecimiento, t.nombre_establecimiento),
+            nombre_chacra = coalesce(EXCLUDED.nombre_chacra, t.nombre_chacra),
+            nombre_destino = coalesce(EXCLUDED.nombre_destino, t.nombre_destino),
+            updated_at = timezone('utc', now());
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION remitos_resumen_trigger()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.activo THEN
+        PERFORM remitos_resumen_aplicar(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.activo THEN
+        PERFORM remitos_resumen_aplicar(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_remitos_resumen ON remitos;
+-- Solo las columnas que cambian los totales: un PATCH de estado o QR no toca el resumen
+CREATE TRIGGER trg_remitos_resumen
+AFTER INSERT OR DELETE OR UPDATE OF
+    activo, peso_estimado_tn, timestamp_creacion, id_empresa, id_establecimiento, id_chacra, id_destino
+ON remitos
+FOR EACH ROW EXECUTE FUNCTION remitos_resumen_trigger();
+
+-- Carga inicial con los remitos existentes
+TRUNCATE remitos_resumen_diario;
+INSERT INTO remitos_resumen_diario (
+    dia, id_empresa, id_establecimiento, id_chacra, id_destino,
+    nombre_empresa, nombre_establecimiento, nombre_chacra, nombre_destino,
+    cantidad, toneladas
+)
+SELECT
+    (timestamp_creacion AT TIME ZONE 'America/Montevideo')::date,
+    id_empresa, id_establecimiento, id_chacra, id_destino,
+    max(nombre_empresa), max(nombre_establecimiento), max(nombre_chacra), max(nombre_destino),
+    count(*), sum(peso_estimado_tn)
+FROM remitos
+WHERE activo
+GROUP BY 1, id_empresa, id_establecimiento, id_chacra, id_destino;
+
+COMMENT ON TABLE remitos_resumen_diario IS 'Cantidad y toneladas de remitos activos por día (Montevideo), empresa, establecimiento, chacra y destino';
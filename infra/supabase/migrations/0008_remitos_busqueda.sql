@@ -0,0 +1,75 @@
+-- Migración: Búsqueda de remitos con índices de texto completo y trigramas
+-- GET /remitos?q= llama a remitos_buscar; los filtros por nombre, matrícula
+-- y cédula (ILIKE '%x%') usan los índices de trigramas en lugar de recorrer
+-- la tabla completa.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Texto de búsqueda en minúsculas: trigramas para subcadenas y errores de tipeo
+ALTER TABLE remitos ADD COLUMN IF NOT EXISTS busqueda_texto text GENERATED ALWAYS AS (
+    lower(
+        id_remito || ' ' ||
+        coalesce(nombre_destino, '') || ' ' ||
+        coalesce(nombre_establecimiento, '') || ' ' ||
+        coalesce(nombre_chacra, '') || ' ' ||
+        coalesce(nombre_conductor, '') || ' ' ||
+        coalesce(matricula_camion, '') || ' ' ||
+        coalesce(matricula_zorra, '') || ' ' ||
+        coalesce(cedula_conductor, '')
+    )
+) STORED;
+
+-- Palabras completas con peso: identificadores (A) sobre lugares (B) sobre el conductor (C).
+-- Configuración 'simple': son nombres propios y matrículas, no hay raíces que extraer
+ALTER TABLE remitos ADD COLUMN IF NOT EXISTS busqueda tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple',
+        id_remito || ' ' || coalesce(matricula_camion, '') || ' ' ||
+        coalesce(matricula_zorra, '') || ' ' || coalesce(cedula_conductor, '')), 'A') ||
+    setweight(to_tsvector('simple',
+        coalesce(nombre_destino, '') || ' ' || coalesce(nombre_establecimiento, '') || ' ' ||
+        coalesce(nombre_chacra, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(nombre_conductor, '')), 'C')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_remitos_busqueda ON remitos USING gin (busqueda);
+CREATE INDEX IF NOT EXISTS idx_remitos_busqueda_trgm ON remitos USING gin (busqueda_texto gin_trgm_ops);
+
+-- Filtros individuales de GET /remitos
+CREATE INDEX IF NOT EXISTS idx_remitos_nombre_destino_trgm ON remitos USING gin (nombre_destino gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_remitos_nombre_establecimiento_trgm ON remitos USING gin (nombre_establecimiento gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_remitos_nombre_chacra_trgm ON remitos USING gin (nombre_chacra gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_remitos_matricula_camion_trgm ON remitos USING gin (matricula_camion gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_remitos_matricula_zorra_trgm ON remitos USING gin (matricula_zorra gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_remitos_cedula_conductor_trgm ON remitos USING gin (cedula_conductor gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_remitos_id_destino ON remitos (id_destino);
+CREATE INDEX IF NOT EXISTS idx_remitos_id_establecimiento ON remitos (id_establecimiento);
+CREATE INDEX IF NOT EXISTS idx_remitos_id_chacra ON remitos (id_chacra);
+
+-- Remitos que coinciden con p_q, del más relevante al menos relevante.
+-- Coincide por palabra completa (tsvector), por subcadena (ILIKE con el
+-- índice de trigramas) o por parecido de palabra (<%, tolera errores de
+-- tipeo). p_q viaja como parámetro: no se arma SQL ni filtros con su texto.
+-- Es SQL de una sola consulta, así Postgres la expande dentro de la consulta
+-- de PostgREST y los filtros que se agregan (activo, fechas...) usan índices.
+CREATE OR REPLACE FUNCTION remitos_buscar(p_q text)
+RETURNS SETOF remitos AS $$
+    WITH consulta AS (
+        SELECT
+            lower(trim(p_q)) AS texto,
+            '%' || replace(replace(replace(lower(trim(p_q)), '\', '\\'), '%', '\%'), '_', '\_') || '%' AS patron,
+            plainto_tsquery('simple', p_q) AS tsq
+    )
+    SELECT r.*
+    FROM remitos r, consulta c
+    WHERE c.texto <> ''
+      AND (
+          r.busqueda @@ c.tsq
+          OR r.busqueda_texto LIKE c.patron
+          OR c.texto <% r.busqueda_texto
+      )
+    ORDER BY
+        ts_rank(r.busqueda, c.tsq) + word_similarity(c.texto, r.busqueda_texto) DESC,
+        r.timestamp_creacion DESC
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION remitos_buscar(text) IS 'Búsqueda rankeada de remitos para GET /remitos?q=';
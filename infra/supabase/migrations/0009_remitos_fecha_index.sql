@@ -0,0 +1,10 @@
+-- Migración: Índice por fecha de creación de remitos
+-- GET /remitos filtra con un solo rango semiabierto
+-- (timestamp_creacion >= inicio AND timestamp_creacion < fin) y ordena por
+-- fecha descendente. Un btree resuelve las dos cosas: el planner recorre el
+-- índice dentro del rango en el orden pedido, sin ordenar después. (Un BRIN
+-- sería más chico, pero no sirve para el ORDER BY ni para rangos de un día
+-- sobre pocas páginas.)
+
+CREATE INDEX IF NOT EXISTS idx_remitos_timestamp_creacion
+  ON remitos (timestamp_creacion DESC);
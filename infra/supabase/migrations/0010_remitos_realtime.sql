@@ -0,0 +1,16 @@
+-- Migración: Publicar cambios de remitos en Supabase Realtime
+-- Solo se necesita con REMITO_EVENTS_REALTIME=true (varias réplicas): cada
+-- réplica se suscribe a los INSERT/UPDATE de remitos y los reenvía a sus
+-- clientes de GET /remitos/events. Con una sola réplica los eventos salen
+-- de RemitoService y esta migración no hace falta.
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_publication WHERE pubname = 'supabase_realtime')
+       AND NOT EXISTS (
+           SELECT 1 FROM pg_publication_tables
+           WHERE pubname = 'supabase_realtime' AND schemaname = 'public' AND tablename = 'remitos'
+       ) THEN
+        ALTER PUBLICATION supabase_realtime ADD TABLE remitos;
+    END IF;
+END $$;
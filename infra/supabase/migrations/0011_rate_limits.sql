@@ -0,0 +1,83 @@
+-- Migración: Límite de mensajes entrantes por teléfono y por empresa
+-- Cada empresa puede tener sus propios límites; NULL usa los valores por
+-- defecto del backend (RATE_LIMIT_*) y 0 desactiva ese límite.
+-- Con RATE_LIMIT_SHARED=true y CLUSTER_MODE=true los contadores viven en
+-- rate_limit_counters y los comparten todas las réplicas.
+
+ALTER TABLE empresas ADD COLUMN IF NOT EXISTS limite_mensajes_telefono integer
+    CHECK (limite_mensajes_telefono >= 0);
+ALTER TABLE empresas ADD COLUMN IF NOT EXISTS limite_mensajes_empresa integer
+    CHECK (limite_mensajes_empresa >= 0);
+ALTER TABLE empresas ADD COLUMN IF NOT EXISTS limite_ventana_segundos integer
+    CHECK (limite_ventana_segundos > 0);
+
+COMMENT ON COLUMN empresas.limite_mensajes_telefono IS 'Mensajes por ventana de cada teléfono de la empresa (NULL: default del backend, 0: sin límite)';
+COMMENT ON COLUMN empresas.limite_mensajes_empresa IS 'Mensajes por ventana sumando todos los teléfonos de la empresa (NULL: default del backend, 0: sin límite)';
+COMMENT ON COLUMN empresas.limite_ventana_segundos IS 'Duración de la ventana de los límites de mensajes (NULL: default del backend)';
+
+-- Ventana deslizante aproximada: contador de la ventana fija actual y de la anterior
+CREATE TABLE IF NOT EXISTS rate_limit_counters (
+  key text PRIMARY KEY,
+  window_seconds integer NOT NULL,
+  window_index bigint NOT NULL,
+  previous_count integer NOT NULL DEFAULT 0,
+  current_count integer NOT NULL DEFAULT 0,
+  updated_at timestamptz NOT NULL DEFAULT timezone('utc', now())
+);
+
+-- Cuenta un mensaje para p_key y retorna true si entra en el límite. La
+-- ventana anterior pesa según cuánto de ella sigue dentro de los últimos
+-- p_window_seconds. Un mensaje rechazado no cuenta. El FOR UPDATE serializa
+-- las réplicas que cuentan la misma clave a la vez.
+CREATE OR REPLACE FUNCTION rate_limit_hit(p_key text, p_limit integer, p_window_seconds integer)
+RETURNS boolean AS $$
+DECLARE
+    v_position double precision := extract(epoch FROM clock_timestamp()) / p_window_seconds;
+    v_index bigint := floor(v_position);
+    v_row rate_limit_counters%ROWTYPE;
+    v_previous integer := 0;
+    v_current integer := 0;
+    v_allowed boolean;
+BEGIN
+    INSERT INTO rate_limit_counters (key, window_seconds, window_index)
+    VALUES (p_key, p_window_seconds, v_index)
+    ON CONFLICT (key) DO NOTHING;
+
+    SELECT * INTO v_row FROM rate_limit_counters WHERE key = p_key FOR UPDATE;
+
+    IF v_row.window_seconds = p_window_seconds THEN
+        IF v_row.window_index = v_index THEN
+            v_previous := v_row.previous_count;
+            v_current := v_row.current_count;
+        ELSIF v_row.window_index = v_index - 1 THEN
+            v_previous := v_row.current_count;
+        END IF;
+    END IF;
+
+    v_allowed := v_previous * (1 - (v_position - v_index)) + v_current + 1 <= p_limit;
+    IF v_allowed THEN
+        v_current := v_current + 1;
+    END IF;
+
+    UPDATE rate_limit_counters
+    SET window_seconds = p_window_seconds,
+        window_index = v_index,
+        previous_count = v_previous,
+        current_count = v_current,
+        updated_at = timezone('utc', now())
+    WHERE key = p_key;
+    RETURN v_allowed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Limpieza periódica (por ejemplo con pg_cron, junto a cluster_purge_expired)
+CREATE OR REPLACE FUNCTION rate_limit_purge_expired()
+RETURNS void AS $$
+BEGIN
+    -- Pasadas dos ventanas el contador ya no pesa en ninguna decisión
+    DELETE FROM rate_limit_counters
+    WHERE updated_at < timezone('utc', now()) - make_interval(secs => 2 * window_seconds);
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE rate_limit_counters IS 'Contadores de mensajes entrantes por teléfono y por empresa compartidos entre réplicas';